@@ -0,0 +1,142 @@
+"""
+SANAL PLANNER - Asenkron Agent
+Çok sayıda eşzamanlı planner sorgusu için asyncio tabanlı agent döngüsü
+
+Tek bir AsyncAnthropic istemcisi (tek bağlantı havuzu) tüm sorgularca
+paylaşılır. Eşzamanlı API isteği sayısı semafor ile sınırlanır, her istek
+süre limitine tabidir, geçici hatalar üstel bekleme ile yeniden denenir.
+"""
+
+import asyncio
+import random
+import time
+import anthropic
+from typing import List, Optional
+
+from agent_tools import AgentDongusu, KupVeri, IstekOlcumu, Konusma, MODEL
+from izleme import aralik
+
+def _gecici_mi(hata: BaseException) -> bool:
+    """Yeniden denenecek hata mı: hız limiti (429), tüm 5xx, bağlantı/zaman aşımı
+
+    Durum kodlarına bakılır: SDK 503/529 gibi kodları InternalServerError'dan
+    türemeyen sınıflarla (ServiceUnavailableError, OverloadedError) atar.
+    """
+    if isinstance(hata, anthropic.APIStatusError):
+        return hata.status_code == 429 or hata.status_code >= 500
+    return isinstance(hata, (anthropic.APIConnectionError, asyncio.TimeoutError))
+
+
+class AsyncAgent:
+    """Paylaşılan istemci ile eşzamanlı agent çalıştırıcı
+
+    Aynı event loop içinde kullanılmalı; iş bitince kapat() çağrılmalı
+    (veya 'async with' kullanılmalı).
+    """
+
+    def __init__(self, api_key: str, max_eszamanli: int = 8,
+                 istek_zaman_asimi: float = 120.0, max_deneme: int = 4,
+                 bekleme_taban: float = 1.0, base_url: Optional[str] = None,
+                 max_bekleme: float = 60.0):
+        self.istek_zaman_asimi = istek_zaman_asimi
+        self.max_deneme = max_deneme
+        self.bekleme_taban = bekleme_taban
+        self.max_bekleme = max_bekleme
+        self._semafor = asyncio.Semaphore(max_eszamanli)
+
+        # Tek istemci = tek bağlantı havuzu (keep-alive bağlantılar paylaşılır).
+        # Yeniden deneme burada yapılır, SDK'nınki kapalı.
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            timeout=istek_zaman_asimi,
+        )
+
+    async def __aenter__(self) -> "AsyncAgent":
+        return self
+
+    async def __aexit__(self, *hata) -> None:
+        await self.kapat()
+
+    async def kapat(self) -> None:
+        await self.client.close()
+
+    def _bekleme_suresi(self, deneme: int, hata: Exception) -> float:
+        """Sunucu retry-after verdiyse ona uy, yoksa jitter'lı üstel bekleme
+
+        İkisi de max_bekleme ile sınırlı - hatalı/aşırı bir başlık sorguyu
+        dakikalarca bekletmesin.
+        """
+        yanit = getattr(hata, "response", None)
+        if yanit is not None:
+            try:
+                return max(0.0, min(self.max_bekleme, float(yanit.headers.get("retry-after"))))
+            except (TypeError, ValueError):
+                pass
+        return min(self.bekleme_taban * (2 ** deneme) * (0.5 + random.random()), self.max_bekleme)
+
+    async def _istek(self, **parametreler):
+        """Tek API isteği - semafor, süre limiti ve yeniden deneme ile"""
+        for deneme in range(self.max_deneme):
+            try:
+                async with self._semafor:
+                    return await asyncio.wait_for(
+                        self.client.messages.create(**parametreler),
+                        timeout=self.istek_zaman_asimi,
+                    )
+            except Exception as e:
+                if not _gecici_mi(e) or deneme == self.max_deneme - 1:
+                    raise
+                await asyncio.sleep(self._bekleme_suresi(deneme, e))
+
+    async def calistir(self, kup: KupVeri, kullanici_mesaji: str,
+                       olcumler: Optional[List[IstekOlcumu]] = None,
+                       konusma: Optional[Konusma] = None) -> str:
+        """agent_calistir'ın asenkron karşılığı"""
+        # Her görev kendi bağlamında çalışır: eşzamanlı sorgular ayrı iz olur
+        with aralik("agent_async") as kok:
+            dongu = AgentDongusu(kup, kullanici_mesaji, olcumler, konusma)
+            for no in dongu.turlar():
+                with aralik("iterasyon", no=no):
+                    istek = dongu.istek()
+                    # Semafor beklemesi ve yeniden denemeler de bu aralıkta
+                    with aralik("api_istegi", model=MODEL, mesaj=len(dongu.messages)) as a:
+                        baslangic = time.perf_counter()
+                        response = await self._istek(**istek)
+                        tool_bloklari = dongu.cevap_isle(response, time.perf_counter() - baslangic, a)
+                    if tool_bloklari:
+                        # Araçlar CPU işi - event loop'u bloklamadan iş parçacığında
+                        # (to_thread izleme bağlamını da taşır)
+                        await asyncio.to_thread(dongu.araclari_calistir, tool_bloklari)
+            return dongu.bitir(kok)
+
+    async def toplu_calistir(self, kup: KupVeri, mesajlar: List[str],
+                             sure_limiti: Optional[float] = None) -> List[object]:
+        """Birden çok sorguyu eşzamanlı çalıştır
+
+        Sonuçlar mesajlarla aynı sırada döner; hata veren veya sure_limiti'ni
+        aşan sorgunun yerinde istisna nesnesi bulunur, diğerleri etkilenmez.
+        """
+        async def tek(mesaj: str):
+            if sure_limiti is None:
+                return await self.calistir(kup, mesaj)
+            return await asyncio.wait_for(self.calistir(kup, mesaj), timeout=sure_limiti)
+
+        return await asyncio.gather(*[tek(m) for m in mesajlar], return_exceptions=True)
+
+
+def kategorileri_paralel_analiz(api_key: str, kup: KupVeri, kategoriler: List[str],
+                                max_eszamanli: int = 8,
+                                sure_limiti: Optional[float] = None) -> List[object]:
+    """Senkron kod için: her kategori için bir analiz sorgusunu paralel çalıştır"""
+    mesajlar = [
+        f"{kategori} kategorisini analiz et. Sorunları tespit et ve aksiyon önerileri sun."
+        for kategori in kategoriler
+    ]
+
+    async def _calistir():
+        async with AsyncAgent(api_key, max_eszamanli=max_eszamanli) as agent:
+            return await agent.toplu_calistir(kup, mesajlar, sure_limiti=sure_limiti)
+
+    return asyncio.run(_calistir())
@@ -3,57 +3,532 @@ SANAL PLANNER - Agentic Tool Calling
 Claude API ile küp verisini sorgulayan akıllı agent
 """
 
+import os
 import pandas as pd
 import numpy as np
 import json
-from typing import Optional
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
 import anthropic
 
+from onbellek import excel_oku
+from izleme import aralik, altinda, baglamda, gecerli_aralik
+from excel_okuyucu import urun_akis_oku
+from kural_motoru import KURAL_TANIMLARI, KuralVerisi, varsayilan_motor
+
+if TYPE_CHECKING:
+    from gecmis_deposu import GecmisDeposu
+
 # =============================================================================
 # KÜPÜ SİMÜLE EDEN VERİ FONKSİYONLARI
 # =============================================================================
 
+# Kompakt modda dönüştürülecek kolonlar
+KOMPAKT_KATEGORIK = ['Kategori ', 'ÜMG', 'Marka ']
+KOMPAKT_TAMSAYI = ['Anlık Depo Stok Adet', 'Anlık Mğz Stok Adet', 'TW Adet', 'LW Adet']
+KOMPAKT_TURETILMIS = ['haftalik_satis', 'toplam_stok', 'cover_hafta']
+
+
+def sku_normalize(sku_kod) -> str:
+    """SKU kodunu karşılaştırılabilir metne çevir (1032437.0 -> '1032437')"""
+    if isinstance(sku_kod, (float, np.floating)) and float(sku_kod).is_integer():
+        sku_kod = int(sku_kod)
+    metin = str(sku_kod).strip().upper()
+    if metin.endswith('.0') and metin[:-2].isdigit():
+        metin = metin[:-2]
+    return metin
+
+
+class SKUIndeks:
+    """Normalize SKU kodu -> satır pozisyonu
+    
+    Tam eşleşme sözlükten O(1), önek araması sıralı anahtarlarda ikili
+    arama ile O(log n) çalışır. Aynı kod birden çok satırdaysa ilki geçerli.
+    """
+    
+    def __init__(self, kodlar: pd.Series):
+        if pd.api.types.is_integer_dtype(kodlar):
+            anahtarlar = kodlar.astype(str).tolist()
+        else:
+            anahtarlar = [None if pd.isna(k) else sku_normalize(k) for k in kodlar.tolist()]
+        
+        # Ters sırada doldur - tekrar eden kodlarda ilk satır kalsın
+        self._pozisyon = {
+            k: i for i, k in reversed(list(enumerate(anahtarlar))) if k is not None
+        }
+        
+        sirali = sorted(self._pozisyon)
+        self._sirali = np.array(sirali, dtype=object)
+        self._sirali_pozisyon = np.array([self._pozisyon[k] for k in sirali], dtype=np.int64)
+    
+    def __len__(self) -> int:
+        return len(self._pozisyon)
+    
+    def bul(self, sku_kod) -> Optional[int]:
+        """Tam eşleşen satır pozisyonu (yoksa None)"""
+        return self._pozisyon.get(sku_normalize(sku_kod))
+    
+    def onek_ara(self, onek, limit: int = 20) -> List[int]:
+        """Kodu verilen önekle başlayan satır pozisyonları (kod sırasıyla)"""
+        onek = sku_normalize(onek)
+        bas = np.searchsorted(self._sirali, onek, side='left')
+        son = np.searchsorted(self._sirali, onek + '\uffff', side='left')
+        return self._sirali_pozisyon[bas:min(son, bas + limit)].tolist()
+
+
+_TR_ASCII = str.maketrans("çğöşüâîû", "cgosuaiu")
+
+
+def tr_normalize(metin) -> str:
+    """Türkçe büyük/küçük harf farkını yok sayan eşleştirme anahtarı
+    
+    'CİLT BAKIM', 'cilt bakım' ve 'Cilt Bakim' aynı anahtara düşer.
+    str.lower() 'İ' ve 'I' harflerini Türkçe kurallarla çevirmediği için
+    noktalı/noktasız i'ler önce tek harfe indirilir.
+    """
+    metin = str(metin).replace('İ', 'i').replace('I', 'i').replace('ı', 'i').lower()
+    return ' '.join(metin.translate(_TR_ASCII).split())
+
+
+@dataclass
+class KategoriOzet:
+    kategori: str
+    pozisyonlar: np.ndarray   # Kategorideki satırlar (orijinal sırada)
+    sku_sayisi: int
+    stok: float
+    satis: float
+    cover_medyan: float
+    umg: pd.DataFrame         # ÜMG, SKU_Sayisi, Stok, Satis
+
+
+class KategoriIndeks:
+    """Kategori ve kategori×ÜMG toplamları, yükleme anında bir kez hesaplanır
+    
+    Kategori aramaları Türkçe normalize anahtarlar üzerinden yapılır; tam
+    tablo taraması yerine birkaç düzine kategori adı içinde arama olur.
+    Birleştirilen sonuçlar küçük bir LRU'da tutulur - küp oturumlar arasında
+    paylaşıldığı ve aranan metin serbest olduğu için sınırlıdır.
+    """
+    
+    SORGU_KAPASITESI = 128
+    
+    def __init__(self, urun: pd.DataFrame):
+        self._cover = urun['cover_hafta'].to_numpy()
+        
+        # Toplamlar kompakt küpte de float64 biriksin
+        olcu = pd.DataFrame({
+            'Kategori ': urun['Kategori '],
+            'ÜMG': urun['ÜMG'],
+            'Ürün Kodu': urun['Ürün Kodu'],
+            'toplam_stok': urun['toplam_stok'].astype(np.float64),
+            'haftalik_satis': urun['haftalik_satis'].astype(np.float64),
+            'cover_hafta': urun['cover_hafta'],
+        })
+        grup = olcu.groupby('Kategori ', observed=True)
+        toplamlar = grup.agg(
+            sku_sayisi=('Kategori ', 'size'),
+            stok=('toplam_stok', 'sum'),
+            satis=('haftalik_satis', 'sum'),
+            cover_medyan=('cover_hafta', 'median'),
+        )
+        umg = olcu.groupby(['Kategori ', 'ÜMG'], observed=True).agg(
+            SKU_Sayisi=('Ürün Kodu', 'count'),
+            Stok=('toplam_stok', 'sum'),
+            Satis=('haftalik_satis', 'sum'),
+        )
+        umg_gruplari = {k: g.droplevel(0) for k, g in umg.groupby(level=0, observed=True)}
+        
+        self._sorgular: OrderedDict = OrderedDict()
+        self._sorgu_kilit = threading.Lock()
+        self.ozetler: Dict[str, KategoriOzet] = {}
+        for kategori, pozisyonlar in grup.indices.items():
+            satir = toplamlar.loc[kategori]
+            self.ozetler[tr_normalize(kategori)] = KategoriOzet(
+                kategori=kategori,
+                pozisyonlar=pozisyonlar,
+                sku_sayisi=int(satir['sku_sayisi']),
+                stok=float(satir['stok']),
+                satis=float(satir['satis']),
+                cover_medyan=float(satir['cover_medyan']),
+                umg=umg_gruplari.get(kategori, umg.iloc[:0].droplevel(0)),
+            )
+    
+    def bul(self, kategori: str) -> Optional[KategoriOzet]:
+        """Adında aranan metin geçen kategorilerin (birleşik) özeti"""
+        anahtar = tr_normalize(kategori)
+        with self._sorgu_kilit:
+            if anahtar in self._sorgular:
+                self._sorgular.move_to_end(anahtar)
+                return self._sorgular[anahtar]
+        
+        eslesen = [o for k, o in self.ozetler.items() if anahtar in k]
+        if not eslesen:
+            return None
+        if len(eslesen) == 1:
+            return eslesen[0]
+        
+        # Sadece birleştirme pahalı - onu sakla
+        ozet = self._birlestir(eslesen)
+        with self._sorgu_kilit:
+            self._sorgular[anahtar] = ozet
+            while len(self._sorgular) > self.SORGU_KAPASITESI:
+                self._sorgular.popitem(last=False)
+        return ozet
+    
+    def _birlestir(self, ozetler: List[KategoriOzet]) -> KategoriOzet:
+        """Birden çok kategori eşleşirse toplamları birleştir"""
+        pozisyonlar = np.sort(np.concatenate([o.pozisyonlar for o in ozetler]))
+        umg = pd.concat([o.umg for o in ozetler]).groupby(level=0, observed=True).sum()
+        return KategoriOzet(
+            kategori=", ".join(str(o.kategori) for o in ozetler),
+            pozisyonlar=pozisyonlar,
+            sku_sayisi=sum(o.sku_sayisi for o in ozetler),
+            stok=sum(o.stok for o in ozetler),
+            satis=sum(o.satis for o in ozetler),
+            cover_medyan=float(np.nanmedian(self._cover[pozisyonlar])),
+            umg=umg,
+        )
+
+
+class AracOnbellek:
+    """Araç sonuçları için LRU önbellek (küp başına bir tane)
+    
+    Anahtar: (araç adı, normalize argümanlar, biçim, küp sürümü, kural seti
+    sürümü) - kurallar yeniden yüklenince eski sonuçlar kullanılmaz. Yeni küp
+    yüklendiğinde yeni önbellek kurulur, eski sonuçlar taşınmaz.
+    """
+    
+    def __init__(self, kapasite: int = 256):
+        self.kapasite = kapasite
+        self.isabet = 0
+        self.iska = 0
+        self._kayitlar: OrderedDict = OrderedDict()
+        self._kilit = threading.Lock()
+    
+    def getir(self, anahtar: tuple, hesapla: Callable[[], str]) -> str:
+        """Önbellekte varsa döndür, yoksa hesaplayıp kaydet"""
+        with self._kilit:
+            if anahtar in self._kayitlar:
+                self._kayitlar.move_to_end(anahtar)
+                self.isabet += 1
+                return self._kayitlar[anahtar]
+            self.iska += 1
+        
+        sonuc = hesapla()
+        
+        with self._kilit:
+            self._kayitlar[anahtar] = sonuc
+            self._kayitlar.move_to_end(anahtar)
+            while len(self._kayitlar) > self.kapasite:
+                self._kayitlar.popitem(last=False)
+        return sonuc
+    
+    def temizle(self) -> None:
+        with self._kilit:
+            self._kayitlar.clear()
+    
+    def istatistik(self) -> Dict[str, float]:
+        toplam = self.isabet + self.iska
+        return {
+            "isabet": self.isabet,
+            "iska": self.iska,
+            "kayit": len(self._kayitlar),
+            "isabet_orani": self.isabet / toplam if toplam else 0.0,
+        }
+
+
+_kup_sayaci = itertools.count(1)
+
+
 class KupVeri:
     """Küp verisini yöneten sınıf"""
     
-    def __init__(self, trading_path: str, urun_path: str):
-        self.trading = pd.read_excel(trading_path, sheet_name='mtd')
-        self.urun = pd.read_excel(urun_path)
-        self._hazirla()
+    hafta: Optional[str] = None            # Geçmiş deposundan açıldıysa
+    gecmis: Optional[pd.DataFrame] = None  # Hafta aralığının satırları
+    
+    def __init__(self, trading_path: str, urun_path: str, akis: bool = False,
+                 kompakt: bool = False):
+        with aralik("kup_kur", akis=akis, kompakt=kompakt) as a:
+            self.trading = excel_oku(trading_path, sheet_name='mtd')
+            
+            # Hazırlanmış hali önbelleğe girer, tekrar yüklemede hesap da atlanır
+            etiket = 'kup_akis' if akis else 'kup'
+            donustur = self._hazirla
+            if kompakt:
+                etiket += '_kompakt'
+                donustur = lambda urun: self._kompaktla(self._hazirla(urun))
+            
+            # Büyük raporlar: sadece kullanılan kolonlar, sabit bellekle
+            okuyucu = urun_akis_oku if akis else None
+            self._kur(excel_oku(urun_path, etiket=etiket, donustur=donustur, okuyucu=okuyucu))
+            if a:
+                a.ekle(sku=len(self.urun))
+    
+    @classmethod
+    def tablolardan(cls, trading: pd.DataFrame, urun: pd.DataFrame,
+                    kompakt: bool = False) -> "KupVeri":
+        """Excel okumadan, bellekteki tablolardan küp kur (test/benchmark)"""
+        kup = cls.__new__(cls)
+        kup.trading = trading
+        urun = cls._hazirla(urun.copy())
+        kup._kur(cls._kompaktla(urun) if kompakt else urun)
+        return kup
+    
+    @classmethod
+    def gecmisten(cls, depo: "GecmisDeposu", hafta: Optional[str] = None,
+                  bas: Optional[str] = None, kompakt: bool = False) -> "KupVeri":
+        """Geçmiş deposundaki bir haftadan küp kur (Excel parse edilmez)
+        
+        hafta verilmezse en son hafta. bas verilirse [bas, hafta] aralığının
+        haftalık satırları da gecmis tablosuna yüklenir (haftalik_seri için);
+        araçlar her zaman haftanın kendi görüntüsü üzerinde çalışır.
+        """
+        haftalar = depo.haftalar()
+        hafta = hafta or (haftalar[-1] if haftalar else None)
+        if hafta not in haftalar:
+            raise KeyError(f"{hafta} geçmiş deposunda yok")
+        
+        with aralik("kup_kur", hafta=hafta, bas=bas, kompakt=kompakt) as a:
+            kup = cls.__new__(cls)
+            kup.trading = depo.trading_oku(hafta)
+            if bas is not None:
+                kup.gecmis = depo.urun_oku(bas=bas, bit=hafta)
+                urun = kup.gecmis[kup.gecmis['hafta'].to_numpy() == hafta]
+                urun = urun.drop(columns='hafta').reset_index(drop=True)
+            else:
+                kup.gecmis = None
+                urun = depo.urun_oku(bas=hafta, bit=hafta).drop(columns='hafta')
+            urun = cls._hazirla(urun)
+            kup._kur(cls._kompaktla(urun) if kompakt else urun)
+            kup.hafta = hafta
+            if a:
+                a.ekle(sku=len(kup.urun))
+            return kup
+    
+    def haftalik_seri(self, kategori: Optional[str] = None, sku_kod: Optional[str] = None,
+                      kolonlar: tuple = ('TW Adet', 'Anlık Depo Stok Adet', 'Anlık Mğz Stok Adet')) -> pd.DataFrame:
+        """gecmisten(bas=...) ile açılan küpte hafta bazında toplamlar"""
+        gecmis = self.gecmis
+        if gecmis is None:
+            raise ValueError("Küp hafta aralığıyla açılmadı (KupVeri.gecmisten(..., bas=...))")
+        secili = np.ones(len(gecmis), dtype=bool)
+        if kategori is not None:
+            secili &= np.asarray(gecmis['Kategori '] == kategori)
+        if sku_kod is not None:
+            kodlar = np.array([sku_normalize(k) for k in gecmis['Ürün Kodu'].tolist()], dtype=object)
+            secili &= kodlar == sku_normalize(sku_kod)
+        return gecmis[secili].groupby('hafta', observed=True)[list(kolonlar)].sum()
+    
+    def _kur(self, urun: pd.DataFrame) -> None:
+        self.urun = urun
+        
+        # SKU ve kategori aramaları her çağrıda tablo taramasın
+        self.sku_indeks = SKUIndeks(self.urun['Ürün Kodu'])
+        self.kategori_indeks = KategoriIndeks(self.urun)
+        
+        # Liste ve taramalarda boş stok 0 sayılır. SKU önerisinde (grup
+        # 'sku_oneri') sayılmaz: NaN karşılaştırması False, SKU 'Stok dengeli'
+        self.kural_verisi = self._kural_verisi(urun, bos_stok=0)
+        self.oneri_verisi = self._kural_verisi(urun, bos_stok=None)
+        
+        # Her yükleme yeni sürüm ve boş araç önbelleği demek
+        self.surum = next(_kup_sayaci)
+        self.arac_onbellegi = AracOnbellek()
     
-    def _hazirla(self):
+    @staticmethod
+    def _kural_verisi(urun: pd.DataFrame, bos_stok: Optional[float]) -> KuralVerisi:
+        """Kural motoru kolonları standart adlarıyla (ilk kullanımda hazırlanır)
+        
+        bos_stok verilirse boş depo/mağaza stoğu bu değerle doldurulur.
+        """
+        def stok(kolon: str) -> np.ndarray:
+            seri = urun[kolon]
+            return (seri if bos_stok is None else seri.fillna(bos_stok)).to_numpy()
+        
+        def magaza_cover() -> np.ndarray:
+            satis = veri.kolon("haftalik_satis")
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(satis > 0, veri.kolon("magaza_stok") / satis, 999)
+        
+        veri = KuralVerisi({
+            "depo_stok": lambda: stok('Anlık Depo Stok Adet'),
+            "magaza_stok": lambda: stok('Anlık Mğz Stok Adet'),
+            "toplam_stok": lambda: urun['toplam_stok'].to_numpy(),
+            "haftalik_satis": lambda: urun['haftalik_satis'].to_numpy(),
+            "cover_hafta": lambda: urun['cover_hafta'].to_numpy(),
+            "magaza_cover": magaza_cover,
+        })
+        return veri
+    
+    def bellek_kullanimi(self) -> int:
+        """Küpün bellekteki boyutu (bayt, metinler dahil derin ölçüm)"""
+        return int(
+            self.trading.memory_usage(deep=True).sum() +
+            self.urun.memory_usage(deep=True).sum()
+        )
+    
+    @staticmethod
+    def _hazirla(urun: pd.DataFrame) -> pd.DataFrame:
         """Veriyi hazırla"""
         # Ürün verisinde cover hesapla
-        self.urun['haftalik_satis'] = (
-            self.urun['TW Adet'].fillna(0) + self.urun['LW Adet'].fillna(0)
+        urun['haftalik_satis'] = (
+            urun['TW Adet'].fillna(0) + urun['LW Adet'].fillna(0)
         ) / 2
-        self.urun['toplam_stok'] = (
-            self.urun['Anlık Depo Stok Adet'].fillna(0) + 
-            self.urun['Anlık Mğz Stok Adet'].fillna(0)
+        urun['toplam_stok'] = (
+            urun['Anlık Depo Stok Adet'].fillna(0) + 
+            urun['Anlık Mğz Stok Adet'].fillna(0)
         )
-        self.urun['cover_hafta'] = np.where(
-            self.urun['haftalik_satis'] > 0,
-            self.urun['toplam_stok'] / self.urun['haftalik_satis'],
+        urun['cover_hafta'] = np.where(
+            urun['haftalik_satis'] > 0,
+            urun['toplam_stok'] / urun['haftalik_satis'],
             999
         )
+        return urun
+    
+    @staticmethod
+    def _kompaktla(urun: pd.DataFrame) -> pd.DataFrame:
+        """Çok oturumlu kullanım için küçük tiplere çevir
+        
+        Tekrarlı metinler kategorik, boşluksuz tam sayı kolonlar int32 (veya
+        daha küçük değil - toplamalarda taşma olmasın), geri kalanlar float32.
+        """
+        for kolon in KOMPAKT_KATEGORIK:
+            if kolon in urun.columns:
+                urun[kolon] = urun[kolon].astype('category')
+        
+        for kolon in KOMPAKT_TAMSAYI:
+            if kolon not in urun.columns or not pd.api.types.is_numeric_dtype(urun[kolon]):
+                continue
+            seri = urun[kolon]
+            if seri.notna().all() and (seri == np.floor(seri)).all():
+                kucuk = pd.to_numeric(seri.astype(np.int64), downcast='integer')
+                urun[kolon] = kucuk if kucuk.dtype.itemsize >= 4 else kucuk.astype(np.int32)
+            else:
+                urun[kolon] = seri.astype(np.float32)
+        
+        for kolon in KOMPAKT_TURETILMIS:
+            urun[kolon] = urun[kolon].astype(np.float32)
+        
+        return urun
+
+
+# =============================================================================
+# ARAÇ ÇIKTI BİÇİMLERİ
+# =============================================================================
+
+# "metin": okunabilir satırlar (varsayılan)
+# "tsv": başlık bir kez yazılır, satırlar sekmeyle ayrılır
+# "json": kolon bazlı JSON ({"kolonlar": {"kod": [...], "cover": [...]}})
+# Araç sonuçları sonraki her turda yeniden gönderildiği için kompakt
+# biçimler girdi token'ını doğrudan düşürür.
+CIKTI_BICIMLERI = ("metin", "tsv", "json")
+
+ARAC_AYARLARI = {
+    "cikti_bicimi": os.environ.get("SANAL_PLANNER_ARAC_BICIMI", "metin"),
+    "sayfa_limiti_ust": 100,  # Tek sayfada en fazla satır
+}
+
 
+def _tablo(ad: str, kolonlar: Dict[str, object], hassasiyet: Dict[str, int],
+           toplam: Optional[int] = None, baslangic: int = 0) -> dict:
+    """Kolon dizilerinden biçimden bağımsız tablo
 
-def genel_ozet(kup: KupVeri) -> str:
+    hassasiyet'teki kolonlar o kadar ondalığa yuvarlanır (0 ise tam sayı),
+    diğerleri metindir. Boş değerler None olur. toplam verilirse tablo
+    sayfalanmış kabul edilir ve toplam/baslangic bilgisi eklenir.
+    """
+    veri = {}
+    for kolon, degerler in kolonlar.items():
+        if kolon in hassasiyet:
+            basamak = hassasiyet[kolon]
+            dizi = np.round(np.asarray(degerler, dtype=np.float64), basamak)
+            veri[kolon] = [
+                None if not np.isfinite(d) else (int(d) if basamak == 0 else float(d))
+                for d in dizi
+            ]
+        else:
+            veri[kolon] = [None if pd.isna(d) else str(d) for d in list(degerler)]
+
+    tablo = {"tablo": ad}
+    if toplam is not None:
+        tablo["toplam"] = toplam
+        tablo["baslangic"] = baslangic
+    tablo["kolonlar"] = veri
+    return tablo
+
+
+def _tsv_hucre(deger) -> str:
+    if deger is None:
+        return ""
+    return str(deger).replace("\t", " ").replace("\n", " ")
+
+
+def _bicimle(tablolar: List[dict], bicim: str) -> str:
+    """Tabloları tsv veya json metnine çevir"""
+    if bicim == "json":
+        govde = tablolar[0] if len(tablolar) == 1 else tablolar
+        return json.dumps(govde, ensure_ascii=False, separators=(",", ":"))
+
+    satirlar = []
+    for tablo in tablolar:
+        bilgi = f"#{tablo['tablo']}"
+        if "toplam" in tablo:
+            bilgi += f" toplam={tablo['toplam']} baslangic={tablo['baslangic']}"
+        satirlar.append(bilgi)
+        satirlar.append("\t".join(tablo["kolonlar"]))
+        for satir in zip(*tablo["kolonlar"].values()):
+            satirlar.append("\t".join(_tsv_hucre(d) for d in satir))
+    return "\n".join(satirlar)
+
+
+def _sayfa_notu(toplam: int, baslangic: int, adet: int) -> Optional[str]:
+    """Metin biçimi için: listenin devamı varsa nasıl alınacağını söyle"""
+    if baslangic + adet >= toplam:
+        return None
+    return f"  ({baslangic + 1}-{baslangic + adet} / {toplam} gösterildi, devamı için baslangic={baslangic + adet})"
+
+
+# =============================================================================
+# ARAÇLAR
+# =============================================================================
+
+def genel_ozet(kup: KupVeri, bicim: str = "metin") -> str:
     """Genel özet - tüm kategorilerin durumu"""
     
-    sonuc = []
-    sonuc.append("=== GENEL ÖZET ===\n")
-    
+    kategoriler, sapmalar, coverlar, lfller = [], [], [], []
     for _, row in kup.trading.iterrows():
         kategori = row['Satır Etiketleri']
         if pd.isna(kategori):
             continue
             
-        butce_sapma = row.get('Achieved TY Sales Budget Value TRY', 0) or 0
-        cover = row.get('TY Store Back Cover', 0) or 0
-        lfl = row.get('LFL Sales Value TYvsLY LC%', 0) or 0
+        kategoriler.append(kategori)
+        sapmalar.append(row.get('Achieved TY Sales Budget Value TRY', 0) or 0)
+        coverlar.append(row.get('TY Store Back Cover', 0) or 0)
+        lfller.append(row.get('LFL Sales Value TYvsLY LC%', 0) or 0)
         
-        durum = "✅" if abs(butce_sapma) < 0.15 else "🔴"
+    if bicim != "metin":
+        return _bicimle([_tablo(
+            "genel_ozet",
+            {
+                "kategori": kategoriler,
+                "butce_sapma_yuzde": np.asarray(sapmalar, dtype=np.float64) * 100,
+                "cover": coverlar,
+                "lfl_yuzde": np.asarray(lfller, dtype=np.float64) * 100,
+            },
+            {"butce_sapma_yuzde": 1, "cover": 1, "lfl_yuzde": 1},
+        )], bicim)
+
+    uyari = varsayilan_motor().esikler["butce_sapma_uyari"]
+    sonuc = []
+    sonuc.append("=== GENEL ÖZET ===\n")
+
+    for kategori, butce_sapma, cover, lfl in zip(kategoriler, sapmalar, coverlar, lfller):
+        durum = "✅" if abs(butce_sapma) < uyari else "🔴"
         
         sonuc.append(f"{durum} {kategori}")
         sonuc.append(f"   Bütçe Sapma: {butce_sapma*100:.1f}% | Cover: {cover:.1f} hf | LFL: {lfl*100:.1f}%")
@@ -61,68 +536,174 @@ def genel_ozet(kup: KupVeri) -> str:
     return "\n".join(sonuc)
 
 
-def kategori_analiz(kup: KupVeri, kategori: str) -> str:
-    """Belirli bir kategorinin detaylı analizi"""
+def kategori_analiz(kup: KupVeri, kategori: str, baslangic: int = 0, limit: int = 10,
+                    bicim: str = "metin") -> str:
+    """Belirli bir kategorinin detaylı analizi
+
+    baslangic/limit yüksek cover ve sevk adayı listelerini sayfalar.
+    """
     
-    # Kategori filtrele
-    kat_urun = kup.urun[kup.urun['Kategori '].str.contains(kategori, case=False, na=False)]
+    # Önceden hesaplanmış kategori özeti
+    ozet = kup.kategori_indeks.bul(kategori)
     
-    if len(kat_urun) == 0:
-        return f"'{kategori}' kategorisi bulunamadı."
+    if ozet is None:
+        return f"'{tr_normalize(kategori)}' kategorisi bulunamadı."
+
+    umg_grup = ozet.umg.reset_index()
+    umg_grup.columns = ['ÜMG', 'SKU_Sayisi', 'Stok', 'Satis']
+    umg_grup['Cover'] = umg_grup['Stok'] / (umg_grup['Satis'] + 0.1)
+
+    # Listeler kural motorundan: küp geneli maske bir kez hesaplanır, kategoriye süzülür
+    motor = varsayilan_motor()
+    listeler = motor.maskeler("kategori_listeleri", kup.kural_verisi)
+    yuksek_cover = ozet.pozisyonlar[listeler["yuksek_cover"][ozet.pozisyonlar]]
+    sevk_adaylari = ozet.pozisyonlar[listeler["sevk_aday"][ozet.pozisyonlar]]
+
+    sayfa = slice(baslangic, baslangic + limit)
+    sorunlu = kup.urun.iloc[yuksek_cover[sayfa]]
+    sevk_aday = kup.urun.iloc[sevk_adaylari[sayfa]]
+
+    if bicim != "metin":
+        return _bicimle([
+            _tablo(
+                "kategori",
+                {
+                    "kategori": [ozet.kategori],
+                    "sku": [ozet.sku_sayisi],
+                    "stok": [ozet.stok],
+                    "satis": [ozet.satis],
+                    "cover_medyan": [ozet.cover_medyan],
+                },
+                {"sku": 0, "stok": 0, "satis": 0, "cover_medyan": 1},
+            ),
+            _tablo(
+                "umg",
+                {
+                    "umg": umg_grup['ÜMG'],
+                    "sku": umg_grup['SKU_Sayisi'],
+                    "stok": umg_grup['Stok'],
+                    "satis": umg_grup['Satis'],
+                    "cover": umg_grup['Cover'],
+                },
+                {"sku": 0, "stok": 0, "satis": 0, "cover": 1},
+            ),
+            _tablo(
+                "yuksek_cover",
+                {
+                    "kod": sorunlu['Ürün Kodu'],
+                    "cover": sorunlu['cover_hafta'],
+                    "stok": sorunlu['toplam_stok'],
+                },
+                {"cover": 0, "stok": 0},
+                toplam=len(yuksek_cover), baslangic=baslangic,
+            ),
+            _tablo(
+                "sevk_aday",
+                {
+                    "kod": sevk_aday['Ürün Kodu'],
+                    "depo": sevk_aday['Anlık Depo Stok Adet'],
+                    "mgz": sevk_aday['Anlık Mğz Stok Adet'],
+                },
+                {"depo": 0, "mgz": 0},
+                toplam=len(sevk_adaylari), baslangic=baslangic,
+            ),
+        ], bicim)
     
     sonuc = []
-    sonuc.append(f"=== {kategori.upper()} KATEGORİ ANALİZİ ===\n")
-    sonuc.append(f"Toplam SKU: {len(kat_urun)}")
-    sonuc.append(f"Toplam Stok: {kat_urun['toplam_stok'].sum():,.0f} adet")
-    sonuc.append(f"Haftalık Satış: {kat_urun['haftalik_satis'].sum():,.0f} adet")
-    sonuc.append(f"Ortalama Cover: {kat_urun['cover_hafta'].median():.1f} hafta")
+    # Başlık eşleşen kategorinin kayıtlı adıyla - önbellekteki metin yazımdan bağımsız
+    sonuc.append(f"=== {str(ozet.kategori).upper()} KATEGORİ ANALİZİ ===\n")
+    sonuc.append(f"Toplam SKU: {ozet.sku_sayisi}")
+    sonuc.append(f"Toplam Stok: {ozet.stok:,.0f} adet")
+    sonuc.append(f"Haftalık Satış: {ozet.satis:,.0f} adet")
+    sonuc.append(f"Ortalama Cover: {ozet.cover_medyan:.1f} hafta")
     
     # Alt kategori (ÜMG) bazlı kırılım
     sonuc.append("\n--- Alt Kategori Kırılımı (ÜMG) ---")
-    umg_grup = kat_urun.groupby('ÜMG').agg({
-        'Ürün Kodu': 'count',
-        'toplam_stok': 'sum',
-        'haftalik_satis': 'sum'
-    }).reset_index()
-    umg_grup.columns = ['ÜMG', 'SKU_Sayisi', 'Stok', 'Satis']
-    umg_grup['Cover'] = umg_grup['Stok'] / (umg_grup['Satis'] + 0.1)
-    
+    umg_kritik = motor.esikler["umg_cover_kritik"]
     for _, row in umg_grup.iterrows():
-        durum = "🔴" if row['Cover'] > 15 else "✅"
+        durum = "🔴" if row['Cover'] > umg_kritik else "✅"
         sonuc.append(f"{durum} {row['ÜMG']}: {row['SKU_Sayisi']} SKU, Cover: {row['Cover']:.1f} hf")
     
     # Sorunlu SKU'lar
-    sorunlu = kat_urun[kat_urun['cover_hafta'] > 20].head(10)
     if len(sorunlu) > 0:
         sonuc.append(f"\n--- Yüksek Cover'lı SKU'lar (İndirim Adayı) ---")
         for _, row in sorunlu.iterrows():
             sonuc.append(f"  {row['Ürün Kodu']} | Cover: {row['cover_hafta']:.0f} hf | Stok: {row['toplam_stok']:.0f}")
+        not_ = _sayfa_notu(len(yuksek_cover), baslangic, len(sorunlu))
+        if not_:
+            sonuc.append(not_)
     
     # Sevk gereken SKU'lar
-    sevk_aday = kat_urun[
-        (kat_urun['Anlık Depo Stok Adet'].fillna(0) > 100) &
-        (kat_urun['Anlık Mğz Stok Adet'].fillna(0) < kat_urun['haftalik_satis'] * 3)
-    ].head(10)
     if len(sevk_aday) > 0:
         sonuc.append(f"\n--- Sevk Edilmesi Gereken SKU'lar ---")
         for _, row in sevk_aday.iterrows():
             sonuc.append(f"  {row['Ürün Kodu']} | Depo: {row['Anlık Depo Stok Adet']:.0f} | Mağaza: {row['Anlık Mğz Stok Adet']:.0f}")
+        not_ = _sayfa_notu(len(sevk_adaylari), baslangic, len(sevk_aday))
+        if not_:
+            sonuc.append(not_)
     
     return "\n".join(sonuc)
 
 
-def sku_detay(kup: KupVeri, sku_kod: str) -> str:
+def _oneri(kup: KupVeri, pozisyonlar) -> np.ndarray:
+    """Satırların öneri aksiyonu (kural motoru 'sku_oneri'): INDIRIM / SEVK / OK"""
+    aksiyon, _ = varsayilan_motor().siniflandir(
+        "sku_oneri", kup.oneri_verisi, pozisyonlar=np.asarray(pozisyonlar, dtype=np.intp)
+    )
+    return aksiyon
+
+
+_ONERI_METINLERI = {
+    "INDIRIM": "🔴 Cover yüksek - İNDİRİM veya KAMPANYA önerilir",
+    "SEVK": "🟡 Mağazada stok düşük - SEVKİYAT önerilir",
+    "OK": "✅ Stok dengeli - İzlemeye devam",
+}
+
+
+def sku_detay(kup: KupVeri, sku_kod: str, bicim: str = "metin") -> str:
     """Belirli bir SKU'nun detayı"""
     
-    sku = kup.urun[kup.urun['Ürün Kodu'].astype(str) == str(sku_kod)]
+    pozisyon = kup.sku_indeks.bul(sku_kod)
     
-    if len(sku) == 0:
-        return f"SKU '{sku_kod}' bulunamadı."
+    if pozisyon is None:
+        # Kısmi kod girildiyse önekle eşleşenleri dene
+        adaylar = kup.sku_indeks.onek_ara(sku_kod, limit=10)
+        if len(adaylar) == 1:
+            pozisyon = adaylar[0]
+        elif adaylar:
+            kodlar = ", ".join(str(k) for k in kup.urun['Ürün Kodu'].iloc[adaylar])
+            return f"SKU '{sku_normalize(sku_kod)}' tam eşleşmedi. Bu önekle başlayan kodlar: {kodlar}"
+        else:
+            return f"SKU '{sku_normalize(sku_kod)}' bulunamadı."
     
-    row = sku.iloc[0]
+    row = kup.urun.iloc[pozisyon]
+
+    if bicim != "metin":
+        depo = row.get('Anlık Depo Stok Adet', 0)
+        magaza = row.get('Anlık Mğz Stok Adet', 0)
+        return _bicimle([_tablo(
+            "sku",
+            {
+                "kod": [row['Ürün Kodu']],
+                "urun": [row.get('Ürün ')],
+                "kategori": [row.get('Kategori ')],
+                "umg": [row.get('ÜMG')],
+                "marka": [row.get('Marka ')],
+                "depo": [depo],
+                "mgz": [magaza],
+                "stok": [row['toplam_stok']],
+                "tw": [row.get('TW Adet', 0)],
+                "lw": [row.get('LW Adet', 0)],
+                "satis": [row['haftalik_satis']],
+                "cover": [row['cover_hafta']],
+                "io_yuzde": [row.get('TW İO', 0) * 100],
+                "oneri": _oneri(kup, [pozisyon]),
+            },
+            {"depo": 0, "mgz": 0, "stok": 0, "tw": 0, "lw": 0, "satis": 1, "cover": 1, "io_yuzde": 0},
+        )], bicim)
     
     sonuc = []
-    sonuc.append(f"=== SKU DETAY: {sku_kod} ===\n")
+    sonuc.append(f"=== SKU DETAY: {sku_normalize(row['Ürün Kodu'])} ===\n")
     sonuc.append(f"Ürün: {row.get('Ürün ', 'N/A')}")
     sonuc.append(f"Kategori: {row.get('Kategori ', 'N/A')}")
     sonuc.append(f"ÜMG: {row.get('ÜMG', 'N/A')}")
@@ -141,53 +722,158 @@ def sku_detay(kup: KupVeri, sku_kod: str) -> str:
     
     # Öneri
     sonuc.append(f"\n--- ÖNERİ ---")
-    if row['cover_hafta'] > 20:
-        sonuc.append("🔴 Cover yüksek - İNDİRİM veya KAMPANYA önerilir")
-    elif row.get('Anlık Depo Stok Adet', 0) > 100 and row.get('Anlık Mğz Stok Adet', 0) < row['haftalik_satis'] * 2:
-        sonuc.append("🟡 Mağazada stok düşük - SEVKİYAT önerilir")
-    else:
-        sonuc.append("✅ Stok dengeli - İzlemeye devam")
+    sonuc.append(_ONERI_METINLERI.get(_oneri(kup, [pozisyon])[0], _ONERI_METINLERI["OK"]))
     
     return "\n".join(sonuc)
 
 
-def sorunlu_bul(kup: KupVeri, sorun_tipi: str = "hepsi") -> str:
+TOPLU_SKU_LIMIT = 50  # Tek çağrıda en fazla bu kadar SKU
+
+
+def sku_toplu_detay(kup: KupVeri, sku_kodlari: List[str], bicim: str = "metin") -> str:
+    """Birden çok SKU'nun özeti tek tabloda
+
+    Her SKU için ayrı sku_detay çağrısı (ve ayrı LLM turu) yerine kodlar
+    indeksten pozisyona çevrilir, satırlar tek seferde alınır ve öneri
+    kolonu vektörel hesaplanır.
+    """
+    # Tekrarlı kodları at, sırayı koru
+    kodlar = [k for k in dict.fromkeys(sku_normalize(k) for k in sku_kodlari) if k]
+    if not kodlar:
+        return "SKU kodu verilmedi."
+
+    fazla = kodlar[TOPLU_SKU_LIMIT:]
+    kodlar = kodlar[:TOPLU_SKU_LIMIT]
+
+    pozisyonlar = []
+    bulunamayan = []
+    for kod in kodlar:
+        pozisyon = kup.sku_indeks.bul(kod)
+        if pozisyon is None:
+            bulunamayan.append(kod)
+        else:
+            pozisyonlar.append(pozisyon)
+
+    tablo = kup.urun.iloc[pozisyonlar]
+    depo = tablo['Anlık Depo Stok Adet'].to_numpy(dtype=float)
+    magaza = tablo['Anlık Mğz Stok Adet'].to_numpy(dtype=float)
+    satis = tablo['haftalik_satis'].to_numpy(dtype=float)
+    cover = tablo['cover_hafta'].to_numpy(dtype=float)
+    io = tablo['TW İO'].to_numpy(dtype=float) if 'TW İO' in tablo.columns else np.zeros(len(tablo))
+    oneri = _oneri(kup, pozisyonlar)
+    kategori = tablo['Kategori '].astype(object).fillna('') if 'Kategori ' in tablo.columns else [''] * len(tablo)
+
+    if bicim != "metin":
+        tablolar = [_tablo(
+            "sku",
+            {
+                "kod": tablo['Ürün Kodu'],
+                "kategori": kategori,
+                "depo": depo,
+                "mgz": magaza,
+                "satis": satis,
+                "cover": cover,
+                "io_yuzde": io * 100,
+                "oneri": oneri,
+            },
+            {"depo": 0, "mgz": 0, "satis": 0, "cover": 1, "io_yuzde": 0},
+        )]
+        if bulunamayan:
+            tablolar.append(_tablo("bulunamayan", {"kod": bulunamayan}, {}))
+        if fazla:
+            tablolar.append(_tablo("limit_disi", {"kod": fazla}, {}))
+        return _bicimle(tablolar, bicim)
+
+    sonuc = []
+    sonuc.append(f"=== SKU TOPLU DETAY ({len(pozisyonlar)}/{len(kodlar)} bulundu) ===\n")
+
+    if pozisyonlar:
+        sonuc.append("Kod | Kategori | Depo | Mğz | Satış/hf | Cover | İO% | Öneri")
+        for kod, kat, d, m, s, c, i, o in zip(tablo['Ürün Kodu'].tolist(), kategori,
+                                              depo, magaza, satis, cover, io, oneri):
+            sonuc.append(f"{kod} | {str(kat)[:20]} | {d:.0f} | {m:.0f} | {s:.0f} | {c:.1f} | {i*100:.0f} | {o}")
+
+    if bulunamayan:
+        sonuc.append(f"\nBulunamayan: {', '.join(bulunamayan)}")
+    if fazla:
+        sonuc.append(f"\nLimit ({TOPLU_SKU_LIMIT}) aşıldı, işlenmeyen {len(fazla)} kod: {', '.join(fazla)}")
+
+    return "\n".join(sonuc)
+
+
+# Sorun tipi (kural motoru 'sorun_tarama' kuralı) -> (metin başlığı, sıralama
+# kolonu, kompakt kolonlar, hassasiyet). Başlıklardaki {eşik} güncel değerle dolar.
+SORUN_TIPLERI = {
+    "yuksek_cover": (
+        "--- Yüksek Cover (>{indirim_tetik_cover} hafta) - İndirim Adayı ---",
+        'cover_hafta',
+        {"kod": 'Ürün Kodu', "kategori": 'Kategori ', "cover": 'cover_hafta'},
+        {"cover": 0},
+    ),
+    "sevk_gerekli": (
+        "\n--- Sevk Gerekli (Depoda var, mağazada az) ---",
+        'haftalik_satis',
+        {"kod": 'Ürün Kodu', "depo": 'Anlık Depo Stok Adet', "mgz": 'Anlık Mğz Stok Adet', "satis": 'haftalik_satis'},
+        {"depo": 0, "mgz": 0, "satis": 0},
+    ),
+    "dusuk_satis": (
+        "\n--- Düşük Satış (Stok var, satış yok) ---",
+        'toplam_stok',
+        {"kod": 'Ürün Kodu', "stok": 'toplam_stok', "satis": 'haftalik_satis'},
+        {"stok": 0, "satis": 1},
+    ),
+}
+
+
+def _sorun_satiri(sorun_tipi: str, row: pd.Series) -> str:
+    if sorun_tipi == "yuksek_cover":
+        return f"  {row['Ürün Kodu']} | {str(row.get('Kategori ', ''))[:20]} | Cover: {row['cover_hafta']:.0f} hf"
+    if sorun_tipi == "sevk_gerekli":
+        return f"  {row['Ürün Kodu']} | Depo: {row['Anlık Depo Stok Adet']:.0f} | Mğz: {row['Anlık Mğz Stok Adet']:.0f} | Satış: {row['haftalik_satis']:.0f}/hf"
+    return f"  {row['Ürün Kodu']} | Stok: {row['toplam_stok']:.0f} | Satış: {row['haftalik_satis']:.1f}/hf"
+
+
+def sorunlu_bul(kup: KupVeri, sorun_tipi: str = "hepsi", baslangic: int = 0, limit: int = 15,
+                bicim: str = "metin") -> str:
     """Sorunlu SKU'ları bul
     
-    sorun_tipi: "yuksek_cover", "sevk_gerekli", "yok_satis", "hepsi"
+    sorun_tipi: "yuksek_cover", "sevk_gerekli", "dusuk_satis", "hepsi"
+    baslangic/limit her listeyi ayrı ayrı sayfalar (sıralama sabit).
     """
     
+    if sorun_tipi != "hepsi" and sorun_tipi not in SORUN_TIPLERI:
+        return f"Bilinmeyen sorun tipi: {sorun_tipi} (geçerli: {', '.join([*SORUN_TIPLERI, 'hepsi'])})"
+    tipler = list(SORUN_TIPLERI) if sorun_tipi == "hepsi" else [sorun_tipi]
+
+    motor = varsayilan_motor()
+    maskeler = motor.maskeler("sorun_tarama", kup.kural_verisi)
+
+    tablolar = []
     sonuc = []
     sonuc.append(f"=== SORUNLU SKU TARAMASI ({sorun_tipi}) ===\n")
     
-    if sorun_tipi in ["yuksek_cover", "hepsi"]:
-        yuksek = kup.urun[kup.urun['cover_hafta'] > 20].nlargest(15, 'cover_hafta')
-        sonuc.append(f"--- Yüksek Cover (>20 hafta) - İndirim Adayı ---")
-        sonuc.append(f"Toplam: {len(kup.urun[kup.urun['cover_hafta'] > 20])} SKU\n")
-        for _, row in yuksek.iterrows():
-            sonuc.append(f"  {row['Ürün Kodu']} | {row.get('Kategori ', '')[:20]} | Cover: {row['cover_hafta']:.0f} hf")
-    
-    if sorun_tipi in ["sevk_gerekli", "hepsi"]:
-        sevk = kup.urun[
-            (kup.urun['Anlık Depo Stok Adet'].fillna(0) > 200) &
-            (kup.urun['Anlık Mğz Stok Adet'].fillna(0) < kup.urun['haftalik_satis'] * 2) &
-            (kup.urun['haftalik_satis'] > 20)
-        ].nlargest(15, 'haftalik_satis')
-        sonuc.append(f"\n--- Sevk Gerekli (Depoda var, mağazada az) ---")
-        sonuc.append(f"Toplam: {len(sevk)} SKU\n")
-        for _, row in sevk.iterrows():
-            sonuc.append(f"  {row['Ürün Kodu']} | Depo: {row['Anlık Depo Stok Adet']:.0f} | Mğz: {row['Anlık Mğz Stok Adet']:.0f} | Satış: {row['haftalik_satis']:.0f}/hf")
-    
-    if sorun_tipi in ["dusuk_satis", "hepsi"]:
-        dusuk = kup.urun[
-            (kup.urun['toplam_stok'] > 500) &
-            (kup.urun['haftalik_satis'] < 5)
-        ].nlargest(15, 'toplam_stok')
-        sonuc.append(f"\n--- Düşük Satış (Stok var, satış yok) ---")
-        sonuc.append(f"Toplam: {len(dusuk)} SKU\n")
-        for _, row in dusuk.iterrows():
-            sonuc.append(f"  {row['Ürün Kodu']} | Stok: {row['toplam_stok']:.0f} | Satış: {row['haftalik_satis']:.1f}/hf")
+    for tip in tipler:
+        baslik, siralama, kolonlar, hassasiyet = SORUN_TIPLERI[tip]
+        secili = kup.urun[maskeler[tip]]
+        sayfa = secili.nlargest(baslangic + limit, siralama).iloc[baslangic:]
+    
+        if bicim != "metin":
+            tablolar.append(_tablo(
+                tip, {ad: sayfa[kaynak] for ad, kaynak in kolonlar.items()}, hassasiyet,
+                toplam=len(secili), baslangic=baslangic,
+            ))
+            continue
     
+        sonuc.append(baslik.format(**motor.esikler))
+        sonuc.append(f"Toplam: {len(secili)} SKU\n")
+        for _, row in sayfa.iterrows():
+            sonuc.append(_sorun_satiri(tip, row))
+        not_ = _sayfa_notu(len(secili), baslangic, len(sayfa))
+        if not_:
+            sonuc.append(not_)
+    
+    if bicim != "metin":
+        return _bicimle(tablolar, bicim)
     return "\n".join(sonuc)
 
 
@@ -214,6 +900,14 @@ TOOLS = [
                 "kategori": {
                     "type": "string",
                     "description": "Analiz edilecek kategori adı. Örn: 'RENKLİ KOZMETİK', 'SAÇ BAKIM', 'CİLT BAKIM'"
+                },
+                "baslangic": {
+                    "type": "integer",
+                    "description": "SKU listelerinde atlanacak satır sayısı (sayfalama). Varsayılan 0"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "SKU listelerinde gösterilecek satır sayısı. Varsayılan 10, en fazla 100"
                 }
             },
             "required": ["kategori"]
@@ -233,6 +927,21 @@ TOOLS = [
             "required": ["sku_kod"]
         }
     },
+    {
+        "name": "sku_toplu_detay",
+        "description": "Birden çok SKU'nun stok, satış, cover ve önerisini tek tabloda gösterir. Birkaç SKU'ya bakılacaksa sku_detay'ı tek tek çağırmak yerine bunu kullan.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "sku_kodlari": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "SKU kodları listesi (en fazla 50). Örn: ['1032437', '1045521']"
+                }
+            },
+            "required": ["sku_kodlari"]
+        }
+    },
     {
         "name": "sorunlu_bul",
         "description": "Belirli tipteki sorunlu SKU'ları tarar ve listeler.",
@@ -243,6 +952,14 @@ TOOLS = [
                     "type": "string",
                     "enum": ["yuksek_cover", "sevk_gerekli", "dusuk_satis", "hepsi"],
                     "description": "Aranacak sorun tipi. 'yuksek_cover': İndirim adayları, 'sevk_gerekli': Depoda var mağazada yok, 'dusuk_satis': Stok var satış yok, 'hepsi': Tüm sorunlar"
+                },
+                "baslangic": {
+                    "type": "integer",
+                    "description": "Her listede atlanacak satır sayısı (sayfalama). Varsayılan 0"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Her listede gösterilecek satır sayısı. Varsayılan 15, en fazla 100"
                 }
             },
             "required": ["sorun_tipi"]
@@ -250,7 +967,8 @@ TOOLS = [
     }
 ]
 
-SYSTEM_PROMPT = """Sen EVE Kozmetik için çalışan deneyimli bir Retail Planner'sın. Adın "Sanal Planner".
+# Kural satırları kural motorunun eşiklerinden doldurulur (bkz. sistem_promptu)
+_SISTEM_PROMPT_SABLONU = """Sen EVE Kozmetik için çalışan deneyimli bir Retail Planner'sın. Adın "Sanal Planner".
 
 Görevin haftalık verileri analiz edip şu kararları vermek:
 1. Sevkiyat stratejisi (hangi ürünler depolardan mağazalara gönderilmeli)
@@ -259,84 +977,525 @@ Görevin haftalık verileri analiz edip şu kararları vermek:
 4. SKU dağılımı önerileri
 
 Analiz yaparken şu kuralları uygula:
-- Bütçe sapması %30'un üzerindeyse KRİTİK
-- Cover 12 haftanın üzerindeyse FAZLA STOK
-- Cover 4 haftanın altındaysa STOK RİSKİ
-- Top 100 SKU'da yok satışa tolerans YOK
+- Bütçe sapması %{butce_sapma_yuzde:g}'un üzerindeyse KRİTİK
+- Cover {cover_depo_hedef:g} haftanın üzerindeyse FAZLA STOK
+- Cover {sevk_tetik_cover:g} haftanın altındaysa STOK RİSKİ
+- Top {top_sku_sayisi:g} SKU'da yok satışa tolerans YOK
 
 Çalışma şeklin:
 1. Önce genel_ozet ile büyük resme bak
 2. Sorunlu kategorileri tespit et
 3. kategori_analiz ile detaya in
-4. Gerekirse sku_detay ile SKU seviyesine in
+4. Gerekirse sku_detay ile SKU seviyesine in (birden çok SKU için sku_toplu_detay)
 5. sorunlu_bul ile sistematik tarama yap
 
 Türkçe yanıt ver. Bulgularını net ve aksiyona dönük şekilde sun."""
 
 
-def agent_calistir(api_key: str, kup: KupVeri, kullanici_mesaji: str) -> str:
-    """Agent'ı çalıştır ve sonuç al"""
-    
-    client = anthropic.Anthropic(api_key=api_key)
+def sistem_promptu(esikler: Optional[Dict] = None) -> str:
+    """Sistem prompt'u - kural satırları toplu planner ile aynı eşiklerden"""
+    esikler = esikler or varsayilan_motor().esikler
+    return _SISTEM_PROMPT_SABLONU.format(
+        butce_sapma_yuzde=round(esikler["butce_sapma_kritik"] * 100, 6),
+        cover_depo_hedef=esikler["cover_depo_hedef"],
+        sevk_tetik_cover=esikler["sevk_tetik_cover"],
+        top_sku_sayisi=esikler["top_sku_sayisi"],
+    )
+
+
+SYSTEM_PROMPT = sistem_promptu(KURAL_TANIMLARI["esikler"])
+
+
+def _kod_listesi(girdi: dict) -> List[str]:
+    """sku_kodlari tek metin gelirse (virgüllü) listeye çevir"""
+    kodlar = girdi.get("sku_kodlari", [])
+    if isinstance(kodlar, str):
+        kodlar = kodlar.split(",")
+    return list(kodlar)
+
+
+def _sayfa(girdi: dict, varsayilan_limit: int) -> tuple:
+    """(baslangic, limit) - hatalı değerlerde varsayılana dön, limiti sınırla"""
+    try:
+        baslangic = max(0, int(girdi.get("baslangic", 0)))
+    except (TypeError, ValueError):
+        baslangic = 0
+    try:
+        limit = int(girdi.get("limit", varsayilan_limit))
+    except (TypeError, ValueError):
+        limit = varsayilan_limit
+    return baslangic, min(max(limit, 1), ARAC_AYARLARI["sayfa_limiti_ust"])
+
+
+def _sorun_tipi(girdi: dict) -> str:
+    return str(girdi.get("sorun_tipi", "hepsi")).strip().lower()
+
+
+# Araç adı -> (fonksiyon, argüman normalize edici)
+ARAC_FONKSIYONLARI = {
+    "genel_ozet": (
+        lambda kup, girdi, bicim: genel_ozet(kup, bicim=bicim),
+        lambda girdi: (),
+    ),
+    "kategori_analiz": (
+        lambda kup, girdi, bicim: kategori_analiz(kup, girdi.get("kategori", ""),
+                                                  *_sayfa(girdi, 10), bicim=bicim),
+        lambda girdi: (tr_normalize(girdi.get("kategori", "")), _sayfa(girdi, 10)),
+    ),
+    "sku_detay": (
+        lambda kup, girdi, bicim: sku_detay(kup, girdi.get("sku_kod", ""), bicim=bicim),
+        lambda girdi: (sku_normalize(girdi.get("sku_kod", "")),),
+    ),
+    "sku_toplu_detay": (
+        lambda kup, girdi, bicim: sku_toplu_detay(kup, _kod_listesi(girdi), bicim=bicim),
+        lambda girdi: tuple(sku_normalize(k) for k in _kod_listesi(girdi)),
+    ),
+    "sorunlu_bul": (
+        lambda kup, girdi, bicim: sorunlu_bul(kup, _sorun_tipi(girdi), *_sayfa(girdi, 15), bicim=bicim),
+        lambda girdi: (_sorun_tipi(girdi), _sayfa(girdi, 15)),
+    ),
+}
+
+
+def arac_calistir(kup: KupVeri, tool_name: str, tool_input: dict,
+                  bicim: Optional[str] = None) -> str:
+    """Aracı çağır - aynı küpte aynı argümanlarla tekrar gelirse önbellekten
+
+    bicim verilmezse ARAC_AYARLARI["cikti_bicimi"] kullanılır.
+    """
+    if tool_name not in ARAC_FONKSIYONLARI:
+        return f"Bilinmeyen araç: {tool_name}"
     
-    messages = [{"role": "user", "content": kullanici_mesaji}]
+    bicim = bicim or ARAC_AYARLARI["cikti_bicimi"]
+    if bicim not in CIKTI_BICIMLERI:
+        bicim = "metin"
     
-    tum_cevaplar = []
-    max_iterasyon = 10
-    iterasyon = 0
+    fonksiyon, normalize = ARAC_FONKSIYONLARI[tool_name]
+    anahtar = (tool_name, normalize(tool_input), bicim, kup.surum, varsayilan_motor().guncel().surum)
     
-    while iterasyon < max_iterasyon:
-        iterasyon += 1
+    with aralik(f"arac:{tool_name}", girdi=json.dumps(tool_input, ensure_ascii=False)[:200]) as a:
+        def hesapla() -> str:
+            if a:
+                a.ekle(onbellek="iska")
+            return fonksiyon(kup, tool_input, bicim)
         
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            system=SYSTEM_PROMPT,
-            tools=TOOLS,
-            messages=messages
+        sonuc = kup.arac_onbellegi.getir(anahtar, hesapla)
+        if a:
+            a.ozellikler.setdefault("onbellek", "isabet")
+            a.ekle(karakter=len(sonuc))
+        return sonuc
+
+
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 4096
+
+# =============================================================================
+# PROMPT ÖNBELLEĞİ VE ÖLÇÜM
+# =============================================================================
+
+_ONBELLEK_ISARETI = {"type": "ephemeral"}
+
+
+def _onbellekli_sistem() -> List[dict]:
+    """Sistem prompt'u önbellek işaretiyle (araç tanımları da bu öneke dahil)"""
+    return [{"type": "text", "text": sistem_promptu(), "cache_control": _ONBELLEK_ISARETI}]
+
+
+def _onbellekli_araclar() -> List[dict]:
+    """Son araç tanımına önbellek işareti koy - tüm TOOLS listesi önek olur"""
+    return TOOLS[:-1] + [dict(TOOLS[-1], cache_control=_ONBELLEK_ISARETI)]
+
+
+def _konusma_onekini_isaretle(messages: List[dict]) -> None:
+    """Kayan önbellek noktası: sadece son mesajın son bloğu işaretli kalır
+    
+    API istek başına en fazla 4 işaret kabul eder; önceki turların işaretleri
+    silinir, böylece büyüyen konuşmanın tamamı bir sonraki istekte önbellekten
+    okunur.
+    """
+    for mesaj in messages:
+        if isinstance(mesaj["content"], list):
+            for blok in mesaj["content"]:
+                if isinstance(blok, dict):
+                    blok.pop("cache_control", None)
+    
+    son = messages[-1]
+    if isinstance(son["content"], str):
+        son["content"] = [{"type": "text", "text": son["content"]}]
+    if isinstance(son["content"][-1], dict):
+        son["content"][-1]["cache_control"] = _ONBELLEK_ISARETI
+
+
+@dataclass
+class IstekOlcumu:
+    iterasyon: int
+    girdi_token: int            # Önbelleğe girmeyen girdi
+    onbellek_okunan_token: int  # Önbellekten okunan (ucuz) girdi
+    onbellek_yazilan_token: int
+    cikti_token: int
+    sure_sn: float
+
+
+def _olcum_al(iterasyon: int, response, sure_sn: float) -> IstekOlcumu:
+    usage = response.usage
+    return IstekOlcumu(
+        iterasyon=iterasyon,
+        girdi_token=getattr(usage, "input_tokens", 0) or 0,
+        onbellek_okunan_token=getattr(usage, "cache_read_input_tokens", 0) or 0,
+        onbellek_yazilan_token=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        cikti_token=getattr(usage, "output_tokens", 0) or 0,
+        sure_sn=sure_sn,
+    )
+
+
+def _istek_izle(a, olcum: IstekOlcumu, response) -> None:
+    """API isteği aralığına token sayıları ve durma nedeni"""
+    if a:
+        a.ekle(
+            girdi_token=olcum.girdi_token,
+            onbellek_okunan_token=olcum.onbellek_okunan_token,
+            onbellek_yazilan_token=olcum.onbellek_yazilan_token,
+            cikti_token=olcum.cikti_token,
+            durma=getattr(response, "stop_reason", None),
         )
+
+
+def olcum_ozeti(olcumler: List[IstekOlcumu]) -> Dict[str, float]:
+    """Bir agent çalıştırmasının toplam token ve süre bilgisi"""
+    girdi = sum(o.girdi_token for o in olcumler)
+    okunan = sum(o.onbellek_okunan_token for o in olcumler)
+    yazilan = sum(o.onbellek_yazilan_token for o in olcumler)
+    toplam_girdi = girdi + okunan + yazilan
+    return {
+        "istek": len(olcumler),
+        "girdi_token": girdi,
+        "onbellek_okunan_token": okunan,
+        "onbellek_yazilan_token": yazilan,
+        "cikti_token": sum(o.cikti_token for o in olcumler),
+        "onbellek_orani": okunan / toplam_girdi if toplam_girdi else 0.0,
+        "sure_sn": sum(o.sure_sn for o in olcumler),
+    }
+
+
+# =============================================================================
+# KONUŞMA HAFIZASI
+# =============================================================================
+
+KONUSMA_TOKEN_BUTCESI = 30000
+
+
+def _token_tahmini(mesaj: dict) -> int:
+    """Kaba token tahmini (~3 karakter / token, Türkçe metin için)"""
+    icerik = mesaj["content"]
+    if isinstance(icerik, str):
+        return len(icerik) // 3
+    
+    karakter = 0
+    for blok in icerik:
+        if not isinstance(blok, dict):
+            blok = _blok_sozluk(blok)
+        if blok.get("type") == "text":
+            karakter += len(blok.get("text", ""))
+        elif blok.get("type") == "tool_use":
+            karakter += len(json.dumps(blok.get("input", {}), ensure_ascii=False))
+        elif blok.get("type") == "tool_result":
+            karakter += len(str(blok.get("content", "")))
+    return karakter // 3
+
+
+def _blok_sozluk(blok) -> dict:
+    """SDK içerik bloğunu tekrar gönderilebilir sözlüğe çevir"""
+    if blok.type == "text":
+        return {"type": "text", "text": blok.text}
+    if blok.type == "tool_use":
+        return {"type": "tool_use", "id": blok.id, "name": blok.name, "input": blok.input}
+    return blok.model_dump(exclude_none=True)
+
+
+def _soru_mesaji_mi(mesaj: dict) -> bool:
+    """Kullanıcının yazdığı soru mu (araç sonucu değil)?"""
+    if mesaj["role"] != "user":
+        return False
+    icerik = mesaj["content"]
+    return isinstance(icerik, str) or not any(
+        isinstance(b, dict) and b.get("type") == "tool_result" for b in icerik
+    )
+
+
+class Konusma:
+    """Oturum boyunca süren konuşma hafızası
+    
+    Takip soruları önceki araç sonuçlarını görür, agent genel_ozet'ten
+    yeniden başlamaz. Toplam boyut token_butcesi'ni aşınca önce eski araç
+    sonuçları kısaltılır, yetmezse en eski soru-cevap turları atılır.
+    Küp değişirse (yeni yükleme) hafıza sıfırlanır.
+    """
+    
+    def __init__(self, token_butcesi: int = KONUSMA_TOKEN_BUTCESI, ozet_satir: int = 6):
+        self.token_butcesi = token_butcesi
+        self.ozet_satir = ozet_satir
+        self.messages: List[dict] = []
+        self.kup_surum: Optional[int] = None
+    
+    def temizle(self) -> None:
+        self.messages = []
+    
+    def baslat(self, kup: KupVeri, kullanici_mesaji: str) -> List[dict]:
+        """Yeni soru için çalışma listesi (hafıza + yeni mesaj)"""
+        if self.kup_surum != kup.surum:
+            self.messages = []
+            self.kup_surum = kup.surum
+        
+        # Önceki çalıştırma araç sonucuyla bittiyse (iterasyon sınırı) soru yine
+        # ayrı mesaj olur: tur sınırı soru mesajıdır, sıkıştırma turu ortadan
+        # bölmesin. API art arda iki kullanıcı mesajını tek tur sayar.
+        return list(self.messages) + [{"role": "user", "content": kullanici_mesaji}]
+    
+    def kaydet(self, messages: List[dict]) -> None:
+        """Çalıştırma bitince konuşmayı hafızaya al (SDK blokları sözlüğe)"""
+        for mesaj in messages:
+            if isinstance(mesaj["content"], list):
+                mesaj["content"] = [b if isinstance(b, dict) else _blok_sozluk(b) for b in mesaj["content"]]
+        self.messages = messages
+    
+    def token_tahmini(self, messages: Optional[List[dict]] = None) -> int:
+        return sum(_token_tahmini(m) for m in (self.messages if messages is None else messages))
+    
+    def sikistir(self, messages: List[dict]) -> None:
+        """Bütçe aşıldıysa listeyi yerinde küçült (bütçenin %75'ine kadar)
+        
+        Her istekte sıkıştırma yapılıp prompt önbelleği bozulmasın diye
+        bütçenin altına pay bırakılır. Son mesaj (güncel soru / araç
+        sonuçları) hiç dokunulmaz.
+        """
+        if self.token_tahmini(messages) <= self.token_butcesi:
+            return
+        hedef = int(self.token_butcesi * 0.75)
         
-        # Tool kullanımı var mı kontrol et
-        tool_kullanimi = False
+        # 1. Eski araç sonuçlarını ilk birkaç satıra indir
+        for mesaj in messages[:-1]:
+            if mesaj["role"] != "user" or isinstance(mesaj["content"], str):
+                continue
+            for blok in mesaj["content"]:
+                if not (isinstance(blok, dict) and blok.get("type") == "tool_result"):
+                    continue
+                satirlar = str(blok.get("content", "")).split("\n")
+                # +1: daha önce kısaltılmış sonuçlar (özet + not satırı) atlanır
+                if len(satirlar) > self.ozet_satir + 1:
+                    blok["content"] = "\n".join(
+                        satirlar[:self.ozet_satir] +
+                        [f"[... {len(satirlar) - self.ozet_satir} satır kısaltıldı, gerekirse aracı tekrar çağır]"]
+                    )
+            if self.token_tahmini(messages) <= hedef:
+                return
         
+        # 2. Hâlâ büyükse en eski soru-cevap turlarını at (son tur kalır)
+        while self.token_tahmini(messages) > hedef:
+            sorular = [i for i, m in enumerate(messages) if _soru_mesaji_mi(m)]
+            if len(sorular) < 2:
+                break
+            del messages[:sorular[1]]
+
+
+# Aynı turdaki araç çağrıları için paylaşılan iş parçacığı havuzu
+_ARAC_HAVUZU = ThreadPoolExecutor(max_workers=8, thread_name_prefix="arac")
+
+
+def _arac_sonucu(kup: KupVeri, block) -> dict:
+    """Tek tool_use bloğunu çalıştırıp tool_result bloğuna çevir"""
+    try:
+        icerik = arac_calistir(kup, block.name, block.input)
+        return {"type": "tool_result", "tool_use_id": block.id, "content": icerik}
+    except Exception as e:
+        return {"type": "tool_result", "tool_use_id": block.id,
+                "content": f"Araç hatası ({block.name}): {e}", "is_error": True}
+
+
+def araclari_calistir(kup: KupVeri, tool_bloklari: list) -> List[dict]:
+    """Bir turdaki tüm araç çağrılarını paralel çalıştır
+    
+    Tur süresi araçların toplamı değil en yavaşı kadar olur. Sonuçlar
+    tool_use bloklarıyla aynı sırada döner.
+    """
+    with aralik("araclar", adet=len(tool_bloklari)):
+        if len(tool_bloklari) == 1:
+            return [_arac_sonucu(kup, tool_bloklari[0])]
+        return list(_ARAC_HAVUZU.map(baglamda(lambda block: _arac_sonucu(kup, block)), tool_bloklari))
+
+
+class AgentDongusu:
+    """Tek sorunun agent döngüsü: istek hazırlama, cevap ve araç işleme
+    
+    agent_calistir, agent_akis ve AsyncAgent.calistir aynı tur mantığını
+    kullanır; sadece API'yi nasıl çağırdıkları (tek istek, akış, asenkron)
+    ve aralıkları nasıl açtıkları farklıdır:
+    
+        for no in dongu.turlar():
+            response = client.messages.create(**dongu.istek())
+            tool_bloklari = dongu.cevap_isle(response, sure_sn)
+            if tool_bloklari:
+                dongu.araclari_calistir(tool_bloklari)
+        cevap = dongu.bitir()
+    """
+    
+    MAX_ITERASYON = 10
+    
+    def __init__(self, kup: KupVeri, kullanici_mesaji: str,
+                 olcumler: Optional[List[IstekOlcumu]] = None,
+                 konusma: Optional[Konusma] = None):
+        self.kup = kup
+        self.olcumler = olcumler
+        self.konusma = konusma
+        if konusma is not None:
+            self.messages = konusma.baslat(kup, kullanici_mesaji)
+        else:
+            self.messages = [{"role": "user", "content": kullanici_mesaji}]
+        self.sistem = _onbellekli_sistem()
+        self.araclar = _onbellekli_araclar()
+        self.cevaplar: List[str] = []
+        self.iterasyon = 0
+        self.bitti = False
+    
+    def turlar(self) -> Iterator[int]:
+        """Model araç çağırdıkça tur numaraları (en fazla MAX_ITERASYON)"""
+        while not self.bitti and self.iterasyon < self.MAX_ITERASYON:
+            self.iterasyon += 1
+            yield self.iterasyon
+    
+    def istek(self) -> dict:
+        """Sıradaki API isteğinin parametreleri - hafıza sıkıştırılır, önek işaretlenir"""
+        if self.konusma is not None:
+            self.konusma.sikistir(self.messages)
+        _konusma_onekini_isaretle(self.messages)
+        return dict(model=MODEL, max_tokens=MAX_TOKENS, system=self.sistem,
+                    tools=self.araclar, messages=self.messages)
+    
+    def cevap_isle(self, response, sure_sn: float, istek_araligi=None) -> list:
+        """Cevabı ölç, metinleri topla; çalıştırılacak tool_use blokları döner
+        
+        Araç çağrısı yoksa (veya model turu bitirdiyse) döngü biter ve boş
+        liste döner.
+        """
+        olcum = _olcum_al(self.iterasyon, response, sure_sn)
+        _istek_izle(istek_araligi, olcum, response)
+        if self.olcumler is not None:
+            self.olcumler.append(olcum)
+        
+        # Metinleri topla, araç çağrılarını ayır
+        tool_bloklari = []
         for block in response.content:
             if block.type == "text":
-                tum_cevaplar.append(block.text)
-            
+                self.cevaplar.append(block.text)
             elif block.type == "tool_use":
-                tool_kullanimi = True
-                tool_name = block.name
-                tool_input = block.input
-                tool_use_id = block.id
-                
-                # Tool'u çağır
-                if tool_name == "genel_ozet":
-                    tool_result = genel_ozet(kup)
-                elif tool_name == "kategori_analiz":
-                    tool_result = kategori_analiz(kup, tool_input.get("kategori", ""))
-                elif tool_name == "sku_detay":
-                    tool_result = sku_detay(kup, tool_input.get("sku_kod", ""))
-                elif tool_name == "sorunlu_bul":
-                    tool_result = sorunlu_bul(kup, tool_input.get("sorun_tipi", "hepsi"))
-                else:
-                    tool_result = f"Bilinmeyen araç: {tool_name}"
-                
-                # Mesajlara ekle
-                messages.append({"role": "assistant", "content": response.content})
-                messages.append({
-                    "role": "user",
-                    "content": [{
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": tool_result
-                    }]
-                })
+                tool_bloklari.append(block)
         
         # Tool kullanımı yoksa döngüden çık
-        if not tool_kullanimi or response.stop_reason == "end_turn":
-            break
+        if not tool_bloklari or response.stop_reason == "end_turn":
+            if self.konusma is not None:
+                self.messages.append({"role": "assistant", "content": response.content})
+            self.bitti = True
+            return []
+        
+        self.messages.append({"role": "assistant", "content": response.content})
+        return tool_bloklari
+    
+    def araclari_calistir(self, tool_bloklari: list) -> None:
+        """Tüm araçları paralel çalıştır, sonuçları tek mesajda ekle"""
+        self.messages.append({"role": "user", "content": araclari_calistir(self.kup, tool_bloklari)})
+    
+    def bitir(self, kok_araligi=None) -> str:
+        """Konuşmayı hafızaya al; birleşik cevap metni"""
+        if self.konusma is not None:
+            self.konusma.kaydet(self.messages)
+        if kok_araligi:
+            kok_araligi.ekle(iterasyon=self.iterasyon)
+        return "\n".join(self.cevaplar)
+
+
+def agent_calistir(api_key: str, kup: KupVeri, kullanici_mesaji: str,
+                   olcumler: Optional[List[IstekOlcumu]] = None,
+                   konusma: Optional[Konusma] = None) -> str:
+    """Agent'ı çalıştır ve sonuç al
+    
+    olcumler: Verilirse her API isteğinin token ve süre ölçümü eklenir
+    konusma: Verilirse önceki sorular ve araç sonuçları bağlam olarak gider
+    """
+    
+    client = anthropic.Anthropic(api_key=api_key)
+    
+    with aralik("agent_calistir") as kok:
+        dongu = AgentDongusu(kup, kullanici_mesaji, olcumler, konusma)
+        for no in dongu.turlar():
+            with aralik("iterasyon", no=no):
+                istek = dongu.istek()
+                with aralik("api_istegi", model=MODEL, mesaj=len(dongu.messages)) as a:
+                    baslangic = time.perf_counter()
+                    response = client.messages.create(**istek)
+                    tool_bloklari = dongu.cevap_isle(response, time.perf_counter() - baslangic, a)
+                if tool_bloklari:
+                    dongu.araclari_calistir(tool_bloklari)
+        return dongu.bitir(kok)
+
+
+@dataclass
+class AkisOlayi:
+    tip: str      # "metin", "arac", "arac_sonuc", "bitti"
+    veri: object  # metin parçası / araç bilgisi / tam cevap
+
+
+def agent_akis(api_key: str, kup: KupVeri, kullanici_mesaji: str,
+               olcumler: Optional[List[IstekOlcumu]] = None,
+               konusma: Optional[Konusma] = None) -> Iterator[AkisOlayi]:
+    """agent_calistir'ın akışlı sürümü - olayları geldikçe üretir
+    
+    "metin": model metni parça parça, "arac": model bir aracı çağırdı,
+    "arac_sonuc": turdaki araçlar bitti, "bitti": agent_calistir ile aynı
+    birleşik cevap. Arayüz ilk token'ı beklemeden göstermeye başlayabilir.
+    """
+    
+    client = anthropic.Anthropic(api_key=api_key)
+    
+    # Aralıklar yield'ler arasında açık kalır: üst aralık açıkça verilir,
+    # geçerli aralık tüketiciye sızmaz. Süreler tüketicinin olayları işleme
+    # süresini de içerir.
+    with aralik("agent_akis", ust=gecerli_aralik()) as kok:
+        with altinda(kok):
+            dongu = AgentDongusu(kup, kullanici_mesaji, olcumler, konusma)
+        metin_basladi = False
+        for no in dongu.turlar():
+            with aralik("iterasyon", ust=kok, no=no) as tur:
+                with altinda(tur):
+                    istek = dongu.istek()
+                with aralik("api_istegi", ust=tur, model=MODEL, mesaj=len(dongu.messages)) as a:
+                    baslangic = time.perf_counter()
+                    ilk_blok = None
+                    with client.messages.stream(**istek) as stream:
+                        for event in stream:
+                            if ilk_blok is None and event.type in ("text", "content_block_start"):
+                                ilk_blok = time.perf_counter() - baslangic
+                            if event.type == "content_block_start" and event.content_block.type == "text":
+                                # Metin blokları arasına, birleşik cevaptaki gibi satır sonu
+                                if metin_basladi:
+                                    yield AkisOlayi("metin", "\n")
+                                metin_basladi = True
+                            elif event.type == "text":
+                                yield AkisOlayi("metin", event.text)
+                            elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                                yield AkisOlayi("arac", {"ad": event.content_block.name,
+                                                         "girdi": event.content_block.input})
+                        response = stream.get_final_message()
+                    tool_bloklari = dongu.cevap_isle(response, time.perf_counter() - baslangic, a)
+                    if a and ilk_blok is not None:
+                        a.ekle(ilk_blok_ms=round(ilk_blok * 1000, 1))
+                if tool_bloklari:
+                    with altinda(tur):
+                        dongu.araclari_calistir(tool_bloklari)
+            if tool_bloklari:
+                yield AkisOlayi("arac_sonuc", [b.name for b in tool_bloklari])
+        with altinda(kok):
+            cevap = dongu.bitir(kok)
     
-    return "\n".join(tum_cevaplar)
+    yield AkisOlayi("bitti", cevap)
 
 
 # =============================================================================
@@ -4,9 +4,11 @@ EVE Kozmetik için Agentic Retail Planning Assistant
 """
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-from planner_agent import calistir, KURALLAR, kategori_analiz, sku_analiz, veri_yukle
+from planner_agent import analiz_et, sku_metrikleri_hazirla, veri_yukle
+from sonuc_deposu import AnalizSonucu, varsayilan_sonuc_deposu
+from kural_motoru import varsayilan_motor
+from izleme import aralik
 
 # Sayfa ayarları
 st.set_page_config(
@@ -61,36 +63,89 @@ st.markdown("---")
 with st.sidebar:
     st.header("⚙️ Kural Ayarları")
     
+    # Varsayılanlar kural motorunun güncel eşikleri (kural dosyası değişirse onlar)
+    motor = varsayilan_motor()
+    esikler = motor.esikler
+    
     st.subheader("📊 Bütçe")
     butce_sapma = st.slider(
         "Kritik sapma eşiği (%)", 
         min_value=10, max_value=50, 
-        value=int(KURALLAR["butce_sapma_kritik"] * 100),
+        value=int(esikler["butce_sapma_kritik"] * 100),
         help="Bu oranın üzerinde sapma kritik kabul edilir"
     )
     
     st.subheader("📦 Cover Hedefleri")
-    cover_depo = st.slider("Depo cover hedefi (hafta)", 8, 20, KURALLAR["cover_depo_hedef"])
-    cover_mag_min = st.slider("Mağaza min cover (hafta)", 4, 12, KURALLAR["cover_magaza_min"])
-    cover_mag_max = st.slider("Mağaza max cover (hafta)", 8, 20, KURALLAR["cover_magaza_max"])
+    cover_depo = st.slider("Depo cover hedefi (hafta)", 8, 20, int(esikler["cover_depo_hedef"]))
+    cover_mag_min = st.slider("Mağaza min cover (hafta)", 4, 12, int(esikler["cover_magaza_min"]))
+    cover_mag_max = st.slider("Mağaza max cover (hafta)", 8, 20, int(esikler["cover_magaza_max"]))
     
     st.subheader("🚚 Sevkiyat")
-    sevk_cover = st.slider("Sevk tetikleyici (mağaza cover altı)", 2, 8, 4)
+    sevk_cover = st.slider("Sevk tetikleyici (mağaza cover altı)", 2, 8, int(esikler["sevk_tetik_cover"]))
     
     st.subheader("🏷️ İndirim")
-    indirim_cover = st.slider("İndirim tetikleyici (cover üstü)", 15, 40, 20)
+    indirim_cover = st.slider("İndirim tetikleyici (cover üstü)", 15, 40, int(esikler["indirim_tetik_cover"]))
     
     st.subheader("⭐ Top SKU")
-    top_sku = st.slider("Top SKU sayısı", 50, 200, KURALLAR["top_sku_sayisi"])
+    top_sku = st.slider("Top SKU sayısı", 50, 200, int(esikler["top_sku_sayisi"]))
+    
+    # Oturuma özel kurallar - motorun eşikleri değişmez, diğer kullanıcılar etkilenmez
+    kurallar = dict(
+        esikler,
+        butce_sapma_kritik=butce_sapma / 100,
+        cover_depo_hedef=cover_depo,
+        cover_magaza_min=cover_mag_min,
+        cover_magaza_max=cover_mag_max,
+        sevk_tetik_cover=sevk_cover,
+        indirim_tetik_cover=indirim_cover,
+        top_sku_sayisi=top_sku,
+    )
+    st.caption("Kurallar anında uygulanır - veri yeniden okunmaz.")
+    
+    if motor.son_hata:
+        st.warning(f"Kural dosyası yüklenemedi, önceki kurallar kullanılıyor: {motor.son_hata}")
+
+
+def sonuclari_guncelle(kurallar: dict) -> None:
+    """Hazır SKU metriklerini kurallarla yeniden sınıflandır
+    
+    Excel'ler sadece 'Analizi Başlat'ta okunur; eşik değişince burada
+    sadece ucuz sınıflandırma adımı çalışır. Kurallar aynıysa hiçbir şey
+    yapılmaz (filtre değişimi gibi diğer yeniden çizimler).
+    
+    Sonuç tabloları oturuma değil sonuç deposuna DataFrame olarak konur;
+    oturumda sadece kimliği tutulur.
+    """
+    anahtar = (varsayilan_motor().guncel().surum, tuple(sorted(kurallar.items())))
+    depo = varsayilan_sonuc_deposu()
+    if (st.session_state.get('kural_anahtari') == anahtar
+            and depo.getir(st.session_state.get('sonuc_id')) is not None):
+        return
+    
+    trading_df = st.session_state['trading_veri']
+    with aralik("kural_guncelle") as iz_araligi:
+        rapor, sevk_df, indirim_df = analiz_et(trading_df, st.session_state['sku_metrik'], kurallar)
+    if iz_araligi:
+        st.session_state['son_iz'] = iz_araligi.iz
     
-    # Kuralları güncelle
-    if st.button("💾 Kuralları Uygula", use_container_width=True):
-        KURALLAR["butce_sapma_kritik"] = butce_sapma / 100
-        KURALLAR["cover_depo_hedef"] = cover_depo
-        KURALLAR["cover_magaza_min"] = cover_mag_min
-        KURALLAR["cover_magaza_max"] = cover_mag_max
-        KURALLAR["top_sku_sayisi"] = top_sku
-        st.success("✅ Kurallar güncellendi!")
+    eski_id = st.session_state.get('sonuc_id')
+    st.session_state['sonuc_id'] = depo.kaydet(
+        AnalizSonucu(trading=trading_df, rapor=rapor, sevk=sevk_df, indirim=indirim_df)
+    )
+    depo.sil(eski_id)
+    st.session_state['kural_anahtari'] = anahtar
+
+
+if 'sku_metrik' in st.session_state:
+    # Depodan düşmüş sonuç da burada metriklerden yeniden üretilir
+    sonuclari_guncelle(kurallar)
+
+with st.sidebar:
+    with st.expander("🧮 Kural İstatistikleri"):
+        st.caption(f"Kural seti sürümü: {motor.guncel().surum}")
+        st.dataframe(motor.istatistik(), hide_index=True, use_container_width=True)
+
+sonuc = varsayilan_sonuc_deposu().getir(st.session_state.get('sonuc_id'))
 
 # Ana içerik
 tab1, tab2, tab3, tab4 = st.tabs(["📤 Veri Yükle", "📊 Analiz", "📦 Sevkiyat", "🏷️ İndirim"])
@@ -123,33 +178,22 @@ with tab1:
     
     if trading_file and urun_file:
         if st.button("🚀 Analizi Başlat", type="primary", use_container_width=True):
-            with st.spinner("🤖 Sanal Planner analiz ediyor..."):
-                # Dosyaları geçici kaydet
-                import tempfile
-                import os
+            with st.spinner("🤖 Sanal Planner analiz ediyor..."), aralik("analiz_baslat") as iz_araligi:
+                # Yüklenen dosyalar bellekten, tek seferde ve eşzamanlı okunur
+                trading_df, urun_df = veri_yukle(trading_file.getvalue(), urun_file.getvalue())
+                
+                # Kurallardan bağımsız SKU metriklerini bir kez hazırla
+                st.session_state['trading_veri'] = trading_df
+                with aralik("sku_metrikleri_hazirla", satir=len(urun_df)):
+                    st.session_state['sku_metrik'] = sku_metrikleri_hazirla(urun_df)
+                st.session_state.pop('kural_anahtari', None)
                 
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    trading_path = os.path.join(tmpdir, "trading.xlsx")
-                    urun_path = os.path.join(tmpdir, "urun.xlsx")
-                    
-                    with open(trading_path, 'wb') as f:
-                        f.write(trading_file.getvalue())
-                    with open(urun_path, 'wb') as f:
-                        f.write(urun_file.getvalue())
-                    
-                    # Analiz çalıştır
-                    rapor, sevk_df, indirim_df = calistir(trading_path, urun_path)
-                    
-                    # Veriyi session'a kaydet (to_dict kullanarak)
-                    trading_df, urun_df = veri_yukle(trading_path, urun_path)
-                    st.session_state['trading_dict'] = trading_df.to_dict('records')
-                    st.session_state['trading_cols'] = list(trading_df.columns)
-                    st.session_state['rapor'] = rapor
-                    st.session_state['sevk_dict'] = sevk_df.to_dict('records')
-                    st.session_state['sevk_cols'] = list(sevk_df.columns)
-                    st.session_state['indirim_dict'] = indirim_df.to_dict('records')
-                    st.session_state['indirim_cols'] = list(indirim_df.columns)
-                    st.session_state['analiz_yapildi'] = True
+                # Analiz çalıştır
+                sonuclari_guncelle(kurallar)
+                sonuc = varsayilan_sonuc_deposu().getir(st.session_state['sonuc_id'])
+                st.session_state['analiz_yapildi'] = True
+            if iz_araligi:
+                st.session_state['son_iz'] = iz_araligi.iz
             
             st.success("✅ Analiz tamamlandı! Diğer sekmelere geçebilirsin.")
             st.balloons()
@@ -158,19 +202,21 @@ with tab1:
 with tab2:
     st.header("📊 Analiz Sonuçları")
     
-    if 'analiz_yapildi' not in st.session_state:
+    if 'analiz_yapildi' not in st.session_state or sonuc is None:
         st.info("⬆️ Önce 'Veri Yükle' sekmesinden dosyaları yükle ve analizi başlat.")
     else:
         # Özet metrikler
-        sevk_df = pd.DataFrame(st.session_state['sevk_dict'])
-        indirim_df = pd.DataFrame(st.session_state['indirim_dict'])
-        trading = pd.DataFrame(st.session_state['trading_dict'])
+        sevk_df = sonuc.sevk
+        indirim_df = sonuc.indirim
+        trading = sonuc.trading
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            kritik_kat = len([1 for _, r in trading.iterrows() 
-                           if abs(r.get('Achieved TY Sales Budget Value TRY', 0) or 0) >= KURALLAR["butce_sapma_kritik"]])
+            sapma_kolon = 'Achieved TY Sales Budget Value TRY'
+            kritik_kat = int(
+                (trading[sapma_kolon].fillna(0).abs() >= kurallar["butce_sapma_kritik"]).sum()
+            ) if sapma_kolon in trading.columns else 0
             st.metric("🔴 Kritik Kategori", kritik_kat)
         
         with col2:
@@ -180,7 +226,7 @@ with tab2:
             st.metric("🏷️ İndirim Önerilen SKU", len(indirim_df))
         
         with col4:
-            top_sevk = len(sevk_df[sevk_df['Öncelik'] == 1]) if len(sevk_df) > 0 else 0
+            top_sevk = int((sevk_df['Öncelik'] == 1).sum()) if len(sevk_df) > 0 else 0
             st.metric("⭐ Öncelik 1 (Top SKU)", top_sevk)
         
         st.markdown("---")
@@ -189,12 +235,12 @@ with tab2:
         st.subheader("📝 Detaylı Rapor")
         
         with st.expander("Tam Raporu Görüntüle", expanded=True):
-            st.text(st.session_state['rapor'])
+            st.text(sonuc.rapor)
         
         # Rapor indirme
         st.download_button(
             label="📥 Raporu İndir (TXT)",
-            data=st.session_state['rapor'],
+            data=sonuc.rapor,
             file_name=f"sanal_planner_rapor_{datetime.now().strftime('%Y%m%d')}.txt",
             mime="text/plain"
         )
@@ -203,10 +249,10 @@ with tab2:
 with tab3:
     st.header("📦 Sevkiyat Planı")
     
-    if 'sevk_dict' not in st.session_state:
+    if sonuc is None:
         st.info("⬆️ Önce 'Veri Yükle' sekmesinden analizi başlat.")
     else:
-        sevk_df = pd.DataFrame(st.session_state['sevk_dict'])
+        sevk_df = sonuc.sevk
         
         if len(sevk_df) == 0:
             st.success("✅ Acil sevkiyat gerektiren SKU bulunmuyor.")
@@ -251,6 +297,8 @@ with tab3:
                     "Mağaza Stok": st.column_config.NumberColumn("Mağaza Stok", format="%d"),
                     "Haftalık Satış": st.column_config.NumberColumn("H.Satış", format="%.0f"),
                     "Cover (Hafta)": st.column_config.NumberColumn("Cover", format="%.1f"),
+                    "Sevk Adet": st.column_config.NumberColumn("Sevk Adet", format="%d"),
+                    "Sevk Sonrası Mğz Cover": st.column_config.NumberColumn("Sevk Sonrası Cover", format="%.1f"),
                 }
             )
             
@@ -270,10 +318,10 @@ with tab3:
 with tab4:
     st.header("🏷️ İndirim / Kampanya Önerileri")
     
-    if 'indirim_dict' not in st.session_state:
+    if sonuc is None:
         st.info("⬆️ Önce 'Veri Yükle' sekmesinden analizi başlat.")
     else:
-        indirim_df = pd.DataFrame(st.session_state['indirim_dict'])
+        indirim_df = sonuc.indirim
         
         if len(indirim_df) == 0:
             st.success("✅ İndirim önerilen SKU bulunmuyor.")
@@ -331,6 +379,16 @@ with tab4:
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
+# Son çalıştırmanın aşama süreleri (sayfa sonunda: bu çizimdeki analiz de görünsün)
+with st.sidebar:
+    with st.expander("⏱️ Performans"):
+        son_iz = st.session_state.get('son_iz')
+        if son_iz is None:
+            st.caption("Henüz analiz çalıştırılmadı.")
+        else:
+            st.caption(f"Toplam: {son_iz.kok.sure_sn * 1000:,.0f} ms | İz: {son_iz.kimlik[:8]}")
+            st.dataframe(son_iz.tablo(), hide_index=True, use_container_width=True)
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -6,7 +6,7 @@ Claude API Tool Calling ile akıllı retail planner
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import os
+import json
 
 # Sayfa ayarları
 st.set_page_config(
@@ -97,26 +97,73 @@ with st.sidebar:
         key="urun_sidebar"
     )
     
+    from kup_deposu import varsayilan_depo
+    depo = varsayilan_depo()
+    
     if trading_file and urun_file:
         st.success("✅ Veriler yüklendi")
         
-        # Veriyi session'a kaydet
-        if 'kup_yuklendi' not in st.session_state:
-            import tempfile
-            
-            with tempfile.TemporaryDirectory() as tmpdir:
-                trading_path = os.path.join(tmpdir, "trading.xlsx")
-                urun_path = os.path.join(tmpdir, "urun.xlsx")
-                
-                with open(trading_path, 'wb') as f:
-                    f.write(trading_file.getvalue())
-                with open(urun_path, 'wb') as f:
-                    f.write(urun_file.getvalue())
-                
-                # KupVeri oluştur
-                from agent_tools import KupVeri
-                st.session_state['kup'] = KupVeri(trading_path, urun_path)
-                st.session_state['kup_yuklendi'] = True
+        # Küp süreç genelindeki depodan gelir: aynı içerikli dosyaları yükleyen
+        # oturumlar tek küpü paylaşır, farklı dosya yüklenince referans değişir
+        dosya_kimligi = (getattr(trading_file, 'file_id', None), getattr(urun_file, 'file_id', None))
+        ref = st.session_state.get('kup_ref')
+        if ref is None or None in dosya_kimligi or st.session_state.get('kup_dosya_kimligi') != dosya_kimligi:
+            trading_veri, urun_veri = trading_file.getvalue(), urun_file.getvalue()
+            anahtar = depo.anahtar(trading_veri, urun_veri)
+            if ref is None or ref.anahtar != anahtar:
+                if ref is not None:
+                    ref.birak()
+                with st.spinner("Küp hazırlanıyor..."):
+                    ref = depo.al(trading_veri, urun_veri, anahtar=anahtar)
+                st.session_state['kup_ref'] = ref
+            st.session_state['kup_dosya_kimligi'] = dosya_kimligi
+        st.session_state['kup'] = ref.kup
+        
+        kup = ref.kup
+        onbellek = kup.arac_onbellegi.istatistik()
+        depo_durumu = depo.istatistik()
+        st.caption(f"💾 Küp belleği: {kup.bellek_kullanimi() / 1024**2:.1f} MB")
+        st.caption(
+            f"🗄️ Paylaşılan küpler: {depo_durumu['kup']} küp, {depo_durumu['referans']} oturum, "
+            f"{depo_durumu['bellek_mb']:.1f} MB"
+        )
+        st.caption(
+            f"♻️ Araç önbelleği: {onbellek['isabet']} isabet / {onbellek['iska']} ıska "
+            f"(%{onbellek['isabet_orani'] * 100:.0f})"
+        )
+    else:
+        # Dosya kaldırıldıysa eski küple devam edilmesin
+        ref = st.session_state.pop('kup_ref', None)
+        if ref is not None:
+            ref.birak()
+        st.session_state.pop('kup', None)
+        st.session_state.pop('kup_dosya_kimligi', None)
+    
+    # Son çalıştırmanın token / süre özeti
+    if 'son_olcum' in st.session_state:
+        olcum = st.session_state['son_olcum']
+        with st.expander("📈 Son Sorgu Maliyeti"):
+            st.caption(f"API isteği: {olcum['istek']} | Süre: {olcum['sure_sn']:.1f} sn")
+            st.caption(
+                f"Girdi: {olcum['girdi_token']:,} | Önbellekten: {olcum['onbellek_okunan_token']:,} "
+                f"(%{olcum['onbellek_orani'] * 100:.0f}) | Çıktı: {olcum['cikti_token']:,}"
+            )
+    
+    # Son sorgunun aşama dökümü: model mi araçlar mı yavaş
+    if st.session_state.get('son_iz') is not None:
+        son_iz = st.session_state['son_iz']
+        with st.expander("⏱️ Performans"):
+            st.caption(f"Toplam: {son_iz.kok.sure_sn * 1000:,.0f} ms | İz: {son_iz.kimlik[:8]}")
+            st.dataframe(son_iz.tablo(), hide_index=True, use_container_width=True)
+    
+    # Kural motoru: agent araçları toplu planner ile aynı kural setini kullanır
+    from kural_motoru import varsayilan_motor
+    motor = varsayilan_motor()
+    with st.expander("🧮 Kural İstatistikleri"):
+        st.caption(f"Kural seti sürümü: {motor.guncel().surum}")
+        if motor.son_hata:
+            st.warning(f"Kural dosyası yüklenemedi: {motor.son_hata}")
+        st.dataframe(motor.istatistik(), hide_index=True, use_container_width=True)
     
     st.markdown("---")
     
@@ -172,22 +219,51 @@ if mesaj:
         # Kullanıcı mesajını ekle
         st.session_state['messages'].append({'role': 'user', 'content': mesaj})
         
-        # Agent'ı çalıştır
-        with st.spinner("🤖 Sanal Planner düşünüyor..."):
-            try:
-                from agent_tools import agent_calistir
-                
-                sonuc = agent_calistir(
-                    api_key,
-                    st.session_state['kup'],
-                    mesaj
-                )
-                
-                # Agent cevabını ekle
-                st.session_state['messages'].append({'role': 'agent', 'content': sonuc})
-                
-            except Exception as e:
-                st.error(f"❌ Hata: {str(e)}")
+        st.markdown(f'<div class="chat-message user-message">🧑 {mesaj}</div>', unsafe_allow_html=True)
+        
+        # Agent'ı akışlı çalıştır - metin geldikçe ekrana yaz
+        arac_alani = st.empty()
+        cevap_alani = st.empty()
+        cevap_alani.markdown('<div class="chat-message agent-message">🤖 ...</div>', unsafe_allow_html=True)
+        
+        try:
+            from agent_tools import agent_akis, olcum_ozeti, Konusma
+            from izleme import aralik
+            
+            olcumler = []
+            arac_satirlari = []
+            metin = ""
+            
+            # Takip soruları önceki bulguları görsün
+            if 'konusma' not in st.session_state:
+                st.session_state['konusma'] = Konusma()
+            
+            # Sorgunun izi: model istekleri, araç çağrıları ve ekrana yazma süresi
+            with aralik("sorgu") as iz_araligi:
+                for olay in agent_akis(api_key, st.session_state['kup'], mesaj, olcumler=olcumler,
+                                       konusma=st.session_state['konusma']):
+                    if olay.tip == "metin":
+                        metin += olay.veri
+                        cevap_alani.markdown(
+                            f'<div class="chat-message agent-message">🤖 {metin}▌</div>',
+                            unsafe_allow_html=True
+                        )
+                    elif olay.tip == "arac":
+                        arac_satirlari.append(f"🔧 {olay.veri['ad']}({json.dumps(olay.veri['girdi'], ensure_ascii=False)})")
+                        arac_alani.markdown(
+                            f'<div class="tool-call">{"<br>".join(arac_satirlari)}</div>',
+                            unsafe_allow_html=True
+                        )
+                    elif olay.tip == "bitti":
+                        # Agent cevabını ekle
+                        st.session_state['messages'].append({'role': 'agent', 'content': olay.veri})
+            
+            st.session_state['son_olcum'] = olcum_ozeti(olcumler)
+            if iz_araligi:
+                st.session_state['son_iz'] = iz_araligi.iz
+            
+        except Exception as e:
+            st.error(f"❌ Hata: {str(e)}")
         
         # Sayfayı yenile
         st.rerun()
@@ -197,6 +273,7 @@ col1, col2, col3 = st.columns([1, 1, 1])
 with col2:
     if st.button("🗑️ Sohbeti Temizle", use_container_width=True):
         st.session_state['messages'] = []
+        st.session_state.pop('konusma', None)
         st.rerun()
 
 # Footer
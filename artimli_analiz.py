@@ -0,0 +1,610 @@
+"""
+SANAL PLANNER - Artımlı Analiz
+Haftadan haftaya sadece girdisi değişen SKU'ları yeniden sınıflandırır
+
+Her çalıştırmada SKU başına sınıflandırma girdileri (depo/mağaza stok,
+TW/LW ortalama satış, indirim oranı, kategori sorunlu mu, satış sırası) ve
+çıktıları (aksiyon, öncelik) durum dosyasına yazılır. Sonraki çalıştırmada
+satırlar ürün koduyla eşlenip girdiler vektörel karşılaştırılır; kural motoru
+sadece değişen ve yeni SKU'lar için çalışır, diğerleri önceki aksiyonunu
+korur. Kuralların baktığı cover kolonları stok ve satıştan türediği için bu
+girdiler yeterlidir. Satış sırası kuralların kullandığı en büyük sıra
+eşiğine kırpılır: top-100 dışındaki sıra kaymaları değişiklik sayılmaz.
+
+Bulgu tablosu da baştan kurulmaz: aynı süreçteki önceki tablodan değişen
+satırlar çıkarılır, yeniden seçilenler eklenir. Durum dosyası her hafta
+baştan yazılmaz; son tam yazımdan beri değişen ve kalkan satırlar yanındaki
+ek dosyasına (<dosya>.ek.parquet) yazılır, ek durumun ek_oran'ını aşınca
+durum baştan yazılır.
+
+Kural seti sürümü ya da eşikler değiştiyse, önceki durum yoksa veya değişen
+SKU oranı yüksekse tam hesaplama yapılır. Sonuç tablosu her durumda tam
+hesaplamayla aynıdır; yanında önceki çalıştırmaya göre fark tablosu üretilir
+(yeni SEVK, çözülen İNDİRİM, ...).
+
+Kullanım: python artimli_analiz.py <trading.xlsx> <urun.xlsx>
+"""
+
+import os
+import sys
+import json
+import uuid
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from izleme import aralik
+from gecmis_deposu import kod_anahtari
+from kural_motoru import KuralSeti, sira_siniri, varsayilan_motor
+from planner_agent import SKUMetrikleri, bulgu_tablosu, sku_secimi
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_VAR = True
+except ImportError:
+    PARQUET_VAR = False
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+ARTIMLI_AYARLARI = {
+    # Boş bırakılırsa durum sadece bellekte tutulur (aynı süreçteki çalıştırmalar)
+    "dosya": os.environ.get(
+        "SANAL_PLANNER_ARTIMLI_DOSYASI",
+        os.path.join(os.path.expanduser("~"), ".local", "share", "sanal_planner", "artimli_durum.parquet")
+    ),
+    # Değişen SKU oranı bunu aşarsa eşleştirmek yerine tam hesaplama
+    "tam_oran": float(os.environ.get("SANAL_PLANNER_ARTIMLI_TAM_ORAN", 0.5)),
+    # Ek dosyasındaki satırlar durumun bu oranını aşarsa durum baştan yazılır
+    "ek_oran": float(os.environ.get("SANAL_PLANNER_ARTIMLI_EK_ORAN", 0.25)),
+}
+
+GRUP = "sku_siniflandirma"
+
+# Önceki çalıştırmayla karşılaştırılan girdiler
+GIRDI_KOLONLARI = ["depo_stok", "magaza_stok", "haftalik_satis", "indirim_orani", "sorunlu", "sira"]
+# Kural girdisi değil ama bulgu tablosunda görünür: değişen satır tabloya yeniden girer
+GORUNEN_KOLONLAR = ["sku_adi", "kategori"]
+
+# Fark türleri (OK ve listede olmayan SKU "aksiyon yok" sayılır)
+YENI = "YENİ"          # Aksiyon yoktu, şimdi var
+COZULDU = "ÇÖZÜLDÜ"    # Aksiyon vardı, şimdi yok (veya SKU rapordan çıktı)
+DEGISTI = "DEĞİŞTİ"    # Aksiyon türü değişti (örn. İNDİRİM -> İZLE)
+ONCELIK = "ÖNCELİK"    # Aksiyon aynı, öncelik değişti
+FARK_TURLERI = [YENI, COZULDU, DEGISTI, ONCELIK]
+
+_ANAHTAR_META = b"sanal_planner_anahtar"
+_TABAN_META = b"sanal_planner_taban"  # Ek dosyası hangi tam yazımın üstüne
+
+# =============================================================================
+# GİRDİLER
+# =============================================================================
+
+def durum_anahtari(kural_seti: KuralSeti, esikler: Dict[str, float]) -> str:
+    """Kural seti sürümü + geçerli eşikler - değişirse önceki aksiyonlar geçersiz"""
+    tanim = json.dumps({"surum": kural_seti.surum, "esikler": esikler}, sort_keys=True, default=float)
+    return hashlib.sha256(tanim.encode()).hexdigest()[:12]
+
+
+def _kod_dizisi(kodlar: pd.Series) -> np.ndarray:
+    """Tam sayı kodlar int64 kalır (hızlı eşleşir), diğerleri metin anahtarı"""
+    if pd.api.types.is_integer_dtype(kodlar):
+        return kodlar.to_numpy(dtype=np.int64)
+    if pd.api.types.is_float_dtype(kodlar):
+        sayilar = kodlar.to_numpy(dtype=float)
+        if np.isfinite(sayilar).all() and (sayilar == np.round(sayilar)).all():
+            return sayilar.astype(np.int64)
+    return kod_anahtari(kodlar)
+
+
+def aksiyon_etiketleri(kural_seti: KuralSeti) -> np.ndarray:
+    """Grubun üretebileceği aksiyonlar (kural sırasıyla, tekrarsız)"""
+    grup = kural_seti.gruplar[GRUP]
+    return np.array(list(dict.fromkeys([k.aksiyon for k in grup.kurallar] + [grup.varsayilan])))
+
+
+def _aksiyon_kodlari(aksiyon: np.ndarray, etiketler: np.ndarray) -> np.ndarray:
+    """Aksiyon metinlerini etiket sırasına çevir (birkaç etiket: karşılaştırma, hash'ten hızlı)"""
+    kodlar = np.zeros(len(aksiyon), dtype=np.int8)
+    for sira, etiket in enumerate(etiketler):
+        kodlar[aksiyon == etiket] = sira
+    return kodlar
+
+
+def _girdiler(metrik: SKUMetrikleri, sorunlu_kategoriler: List[str], sinir: Optional[int],
+              onceki: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Karşılaştırılacak girdiler + eşleştirme anahtarı (kod, koddaki kaçıncı satır)"""
+    kod = _kod_dizisi(pd.Series(metrik.sku_kod))
+    onceki_kod = onceki["kod"].to_numpy() if onceki is not None else None
+    if onceki_kod is not None and onceki_kod.dtype == kod.dtype and np.array_equal(onceki_kod, kod):
+        tekrar = onceki["tekrar"].to_numpy()  # Kodlar aynı sırada: tekrar numaraları da aynı
+    elif pd.Index(kod).is_unique:
+        tekrar = np.zeros(len(kod), dtype=np.int32)
+    else:
+        tekrar = pd.Series(kod).groupby(kod, sort=False).cumcount().to_numpy(dtype=np.int32)
+    sira = metrik.satis_sirasi if sinir is None else np.minimum(metrik.satis_sirasi, sinir)
+    return pd.DataFrame({
+        "kod": kod,
+        "tekrar": tekrar,
+        "sku_adi": metrik.sku_adi,
+        "kategori": metrik.kategori,
+        "depo_stok": metrik.depo_stok,
+        "magaza_stok": metrik.magaza_stok,
+        "haftalik_satis": metrik.haftalik_satis,
+        "indirim_orani": metrik.indirim_orani,
+        "sorunlu": np.asarray(metrik.kategori.isin(sorunlu_kategoriler)),
+        "sira": sira.astype(np.int64),
+    })
+
+
+def _eslestir(onceki: pd.DataFrame, girdi: pd.DataFrame) -> np.ndarray:
+    """Her güncel satırın önceki durumdaki yeri (-1 = yeni SKU)"""
+    eski, yeni = onceki["kod"], girdi["kod"]
+    if pd.api.types.is_integer_dtype(eski) != pd.api.types.is_integer_dtype(yeni):
+        # Kod tipi haftalar arasında değişti (sayı <-> metin): ikisi de metin anahtarı
+        eski, yeni = pd.Series(kod_anahtari(eski)), pd.Series(kod_anahtari(yeni))
+    if len(eski) == len(yeni) and np.array_equal(eski.to_numpy(), yeni.to_numpy()) \
+            and np.array_equal(onceki["tekrar"].to_numpy(), girdi["tekrar"].to_numpy()):
+        return np.arange(len(yeni))  # Rapor aynı sırada: hash eşleştirmesine gerek yok
+    if not (onceki["tekrar"].to_numpy().any() or girdi["tekrar"].to_numpy().any()):
+        return pd.Index(eski).get_indexer(yeni)
+    indeks = pd.MultiIndex.from_arrays([eski, onceki["tekrar"].to_numpy()])
+    return indeks.get_indexer(pd.MultiIndex.from_arrays([yeni, girdi["tekrar"].to_numpy()]))
+
+
+def _dizi(seri: pd.Series):
+    """Metin kolonları pandas dizisi kalır (nesne dizisine çevirmek yavaş)"""
+    return seri.array if isinstance(seri.dtype, pd.StringDtype) else seri.to_numpy()
+
+
+def _ayni(eski, yeni) -> np.ndarray:
+    """Eleman bazında eşitlik - iki tarafı da boş olanlar eşit"""
+    if isinstance(yeni, np.ndarray):
+        ayni = eski == yeni
+        if yeni.dtype.kind == "f":
+            ayni |= np.isnan(eski) & np.isnan(yeni)
+        return ayni
+    ayni = eski == yeni
+    if not isinstance(ayni, np.ndarray):
+        ayni = ayni.to_numpy(dtype=bool, na_value=False)
+    # Boşluk kontrolü sadece farklı çıkanlarda (çoğu satır aynı)
+    farkli = np.flatnonzero(~ayni)
+    ayni[farkli] = pd.isna(eski[farkli]) & pd.isna(yeni[farkli])
+    return ayni
+
+
+def _degisenler(onceki: pd.DataFrame, girdi: pd.DataFrame, eslesme: np.ndarray) -> np.ndarray:
+    """Yeni veya herhangi bir girdisi (ya da adı, kategorisi) değişmiş satırların pozisyonları"""
+    var = eslesme >= 0
+    ayni_sira = len(onceki) == len(girdi) and var.all() and (eslesme[1:] > eslesme[:-1]).all()
+    degisen = ~var
+    onceki_yer = eslesme[var]
+    for kolon in GIRDI_KOLONLARI + GORUNEN_KOLONLAR:
+        eski, yeni = _dizi(onceki[kolon]), _dizi(girdi[kolon])
+        if not ayni_sira:
+            eski, yeni = eski[onceki_yer], yeni[var]
+        degisen[var] |= ~_ayni(eski, yeni)
+    return np.flatnonzero(degisen)
+
+# =============================================================================
+# FARK
+# =============================================================================
+
+def _fark_turu(eski_kod: np.ndarray, eski_oncelik: np.ndarray,
+               yeni_kod: np.ndarray, yeni_oncelik: np.ndarray, ok: int) -> np.ndarray:
+    """FARK_TURLERI sırası, değişmeyenler -1 (kod -1 = SKU yok)"""
+    eski_var = (eski_kod >= 0) & (eski_kod != ok)
+    yeni_var = (yeni_kod >= 0) & (yeni_kod != ok)
+    ikisi = eski_var & yeni_var
+    return np.select(
+        [~eski_var & yeni_var, eski_var & ~yeni_var, ikisi & (eski_kod != yeni_kod),
+         ikisi & (eski_oncelik != yeni_oncelik)],
+        np.arange(len(FARK_TURLERI)), default=-1,
+    )
+
+
+def fark_ozeti(fark: pd.DataFrame) -> pd.DataFrame:
+    """Fark türü x aksiyon sayıları (örn. YENİ SEVK: 120, ÇÖZÜLDÜ INDIRIM: 45)
+
+    Çözülenlerde önceki aksiyon, diğerlerinde yeni aksiyon sayılır.
+    """
+    aksiyon = fark["aksiyon"].where(fark["degisim"] != COZULDU, fark["onceki_aksiyon"])
+    return (pd.DataFrame({"degisim": fark["degisim"], "aksiyon": aksiyon})
+            .value_counts(sort=False).rename("sku").reset_index())
+
+# =============================================================================
+# BULGU TABLOSU
+# =============================================================================
+
+def _tablo_sirasi(oncelik: np.ndarray, satis: np.ndarray, yer: np.ndarray) -> np.ndarray:
+    """np.lexsort((yer, -satis, oncelik)) ile aynı sıra, tek tam sayı anahtarla
+
+    Satışlar azalan sıra numarasına çevrilip (boşlar en sonda, lexsort gibi)
+    öncelik ve yer ile tek anahtarda birleşir. Önceki tablodan gelen satırlar
+    zaten sıralı olduğundan kararlı sıralama (timsort) hazır sıralı dizileri
+    birleştirir; lexsort her seferinde baştan sıralar.
+    """
+    if not len(yer):
+        return np.empty(0, dtype=np.int64)
+    degerler = pd.unique(satis)
+    degerler = np.sort(degerler[~np.isnan(degerler)])[::-1]
+    satis_sirasi = np.searchsorted(-degerler, -satis)
+    satis_sirasi[np.isnan(satis)] = len(degerler)
+    oncelik = oncelik.astype(np.int64)
+    en_kucuk = int(oncelik.min())
+    satis_adim, yer_adim = len(degerler) + 1, int(yer.max()) + 1
+    if (int(oncelik.max()) - en_kucuk + 1) * satis_adim * yer_adim >= 2 ** 63:
+        return np.lexsort((yer, -satis, oncelik))  # Anahtar taşar
+    anahtar = ((oncelik - en_kucuk) * satis_adim + satis_sirasi) * yer_adim + yer
+    return np.argsort(anahtar, kind="stable")
+
+# =============================================================================
+# DURUM DOSYASI
+# =============================================================================
+
+def _parquet_yaz(df: pd.DataFrame, yol: str, meta: Dict[bytes, str]) -> None:
+    """Atomik yaz - yarım dosya kalmasın (OSError çağırana)"""
+    tablo = pa.Table.from_pandas(df, preserve_index=False)
+    tablo = tablo.replace_schema_metadata({**(tablo.schema.metadata or {}),
+                                           **{k: v.encode() for k, v in meta.items()}})
+    dizin = os.path.dirname(os.path.abspath(yol))
+    os.makedirs(dizin, exist_ok=True)
+    fd, gecici = tempfile.mkstemp(dir=dizin, suffix=".tmp")
+    os.close(fd)
+    try:
+        pq.write_table(tablo, gecici)
+        os.replace(gecici, yol)
+    except BaseException:
+        os.remove(gecici)
+        raise
+
+
+def _ek_uygula(durum: pd.DataFrame, ek: pd.DataFrame) -> pd.DataFrame:
+    """Ek satırlarını duruma uygula: değişenler yerinde, yeniler sonda, silinenler çıkar"""
+    silindi = ek["silindi"].to_numpy(dtype=bool)
+    ek = ek.drop(columns="silindi")
+    yer = _eslestir(durum, ek)
+    ek_yer = len(durum) + np.arange(len(ek))  # Birleşik tablodaki yeri
+
+    kaynak = np.arange(len(durum))
+    degisen = (yer >= 0) & ~silindi
+    kaynak[yer[degisen]] = ek_yer[degisen]
+    kalir = np.ones(len(durum), dtype=bool)
+    kalir[yer[(yer >= 0) & silindi]] = False
+    kaynak = np.concatenate([kaynak[kalir], ek_yer[(yer < 0) & ~silindi]])
+    return pd.concat([durum, ek], ignore_index=True).take(kaynak).reset_index(drop=True)
+
+# =============================================================================
+# SINIFLANDIRICI
+# =============================================================================
+
+@dataclass
+class ArtimliOzet:
+    sku: int              # Bu çalıştırmadaki SKU satırı
+    yeniden: int          # Kural motorundan geçen satır
+    yeni_sku: int         # Önceki durumda olmayan
+    kalkan_sku: int       # Önceki durumda olup bu hafta olmayan
+    fark: int             # Bulgusu değişen SKU
+    tam: bool             # Tam hesaplama yapıldı mı
+    neden: str = ""       # Tam hesaplama nedeni
+
+
+class ArtimliSiniflandirici:
+    """Önceki çalıştırmanın girdi ve çıktılarını tutan SKU sınıflandırıcı
+
+    siniflandir() sku_siniflandir ile aynı tabloyu döner; fark tablosu ve
+    özet son_fark / son_ozet'te kalır.
+    """
+
+    def __init__(self, dosya: Optional[str] = None, tam_oran: Optional[float] = None,
+                 ek_oran: Optional[float] = None):
+        self.dosya = ARTIMLI_AYARLARI["dosya"] if dosya is None else dosya
+        self.tam_oran = ARTIMLI_AYARLARI["tam_oran"] if tam_oran is None else tam_oran
+        self.ek_oran = ARTIMLI_AYARLARI["ek_oran"] if ek_oran is None else ek_oran
+        self.son_fark: Optional[pd.DataFrame] = None
+        self.son_ozet: Optional[ArtimliOzet] = None
+        self._durum: Optional[pd.DataFrame] = None
+        self._anahtar: Optional[str] = None
+        self._taban: Optional[str] = None          # Dosyadaki tam yazımın kimliği
+        self._ek: Optional[pd.DataFrame] = None    # O yazımdan beri değişen/kalkan satırlar
+        self._tablo: Optional[pd.DataFrame] = None      # Önceki bulgu tablosu (yamanır)
+        self._tablo_yer: Optional[np.ndarray] = None    # Tablo satırlarının durumdaki yeri
+        self._kilit = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Durum
+    # -------------------------------------------------------------------------
+
+    def _ek_dosyasi(self) -> str:
+        kok, uzanti = os.path.splitext(self.dosya)
+        return f"{kok}.ek{uzanti}"
+
+    def _durum_oku(self) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        if self._durum is None and self.dosya and PARQUET_VAR and os.path.exists(self.dosya):
+            try:
+                tablo = pq.read_table(self.dosya)
+            except (OSError, pa.ArrowInvalid):
+                return None, None  # Bozuk durum dosyası: tam hesaplama yapılır, üzerine yazılır
+            meta = tablo.schema.metadata or {}
+            self._anahtar = meta.get(_ANAHTAR_META, b"").decode()
+            self._taban = meta.get(_TABAN_META, b"").decode() or None
+            self._durum, self._ek = tablo.to_pandas(), self._ek_oku()
+            if self._ek is not None:
+                self._durum = _ek_uygula(self._durum, self._ek)
+        return self._durum, self._anahtar
+
+    def _ek_oku(self) -> Optional[pd.DataFrame]:
+        """Okunan tam yazımın ek dosyası - yoksa, bozuksa veya eskiyse None
+
+        Ek okunamazsa durum tam yazımdaki haliyle kalır; girdiler ve
+        aksiyonlar yine birbirini tuttuğu için sınıflandırma doğru, fark
+        o haftaya göre çıkar.
+        """
+        yol = self._ek_dosyasi()
+        if self._taban is None or not os.path.exists(yol):
+            return None
+        try:
+            tablo = pq.read_table(yol)
+        except (OSError, pa.ArrowInvalid):
+            return None
+        meta = tablo.schema.metadata or {}
+        if meta.get(_TABAN_META, b"").decode() != self._taban or \
+                meta.get(_ANAHTAR_META, b"").decode() != self._anahtar:
+            return None  # Başka bir tam yazıma ait (silinememiş eski ek)
+        return tablo.to_pandas()
+
+    def _ek_guncelle(self, onceki: pd.DataFrame, durum: pd.DataFrame, pozisyonlar: np.ndarray,
+                     kalkan: np.ndarray) -> Optional[pd.DataFrame]:
+        """Tam yazımdan beri değişen/kalkan satırlar, anahtar başına son hali
+
+        None: ek tutulamaz (dosyada tam yazım yok, kod tipi değişti), durum
+        baştan yazılmalı.
+        """
+        if self._taban is None or onceki["kod"].dtype != durum["kod"].dtype:
+            return None
+        if not (len(pozisyonlar) or len(kalkan)) and self._ek is not None:
+            return self._ek
+        ek = pd.concat([durum.iloc[pozisyonlar], onceki.iloc[kalkan]], ignore_index=True)
+        ek["silindi"] = np.arange(len(ek)) >= len(pozisyonlar)
+        if self._ek is not None and len(self._ek):
+            ek = pd.concat([self._ek[_eslestir(ek, self._ek) < 0], ek], ignore_index=True)
+        return ek
+
+    def _durum_yaz(self, durum: pd.DataFrame, anahtar: str, ek: Optional[pd.DataFrame] = None) -> None:
+        """Bellekte tut, dosya varsa yaz - yazılamazsa analiz bozulmasın
+
+        ek verilir ve durumun ek_oran'ını aşmazsa sadece ek dosyası yazılır;
+        yoksa durum baştan yazılır (yeni taban kimliğiyle) ve ek silinir.
+        """
+        self._durum, self._anahtar = durum, anahtar
+        if not (self.dosya and PARQUET_VAR):
+            return
+        if ek is not None and len(ek) <= self.ek_oran * len(durum):
+            if ek is not self._ek:
+                try:
+                    _parquet_yaz(ek, self._ek_dosyasi(), {_ANAHTAR_META: anahtar, _TABAN_META: self._taban})
+                except OSError:
+                    return  # Diskte eski ek kalır: daha eski ama tutarlı bir durum
+                self._ek = ek
+            return
+
+        taban = uuid.uuid4().hex
+        try:
+            _parquet_yaz(durum, self.dosya, {_ANAHTAR_META: anahtar, _TABAN_META: taban})
+        except OSError:
+            self._taban = self._ek = None  # Sonraki çalıştırma yine baştan yazmayı dener
+            return
+        self._taban, self._ek = taban, None
+        try:
+            os.remove(self._ek_dosyasi())
+        except OSError:
+            pass  # Yoksa veya silinemediyse: taban kimliği tutmadığı için okunmaz
+
+    def sifirla(self) -> None:
+        """Önceki durumu unut - sonraki çalıştırma tam hesaplama yapar"""
+        with self._kilit:
+            self._durum = self._anahtar = self._taban = self._ek = None
+            self._tablo = self._tablo_yer = None
+            self.son_fark = self.son_ozet = None
+            for yol in ([self.dosya, self._ek_dosyasi()] if self.dosya else []):
+                if os.path.exists(yol):
+                    os.remove(yol)
+
+    # -------------------------------------------------------------------------
+    # Sınıflandırma
+    # -------------------------------------------------------------------------
+
+    def siniflandir(self, metrik: SKUMetrikleri, sorunlu_kategoriler: List[str],
+                    kurallar: Optional[Dict] = None) -> pd.DataFrame:
+        """sku_siniflandir ile aynı tablo - kurallar sadece değişen SKU'lara uygulanır"""
+        with self._kilit, aralik("artimli_siniflandir", satir=len(metrik)) as a:
+            motor = varsayilan_motor()
+            kural_seti = motor.guncel()
+            esikler = {**kural_seti.esikler, **kurallar} if kurallar else kural_seti.esikler
+            anahtar = durum_anahtari(kural_seti, esikler)
+            onceki, onceki_anahtar = self._durum_oku()
+            girdi = _girdiler(metrik, sorunlu_kategoriler, sira_siniri(kural_seti, esikler, GRUP), onceki)
+
+            etiketler = aksiyon_etiketleri(kural_seti)
+            neden = ""
+            eslesme = None
+            if onceki is None:
+                neden = "önceki durum yok"
+            else:
+                eslesme = _eslestir(onceki, girdi)
+                if onceki_anahtar != anahtar:
+                    neden = "kurallar değişti"
+            if not neden:
+                pozisyonlar = _degisenler(onceki, girdi, eslesme)
+                if len(pozisyonlar) > self.tam_oran * len(girdi):
+                    neden = "değişen oran yüksek"
+
+            if neden:
+                aksiyon, oncelik = motor.siniflandir(GRUP, metrik.veri, kurallar)
+                kodlar = _aksiyon_kodlari(aksiyon, etiketler)
+                pozisyonlar = np.arange(len(girdi))
+            else:
+                # Önceki aksiyonlar kodlarıyla taşınır (aynı kural seti = aynı etiketler)
+                alt_aksiyon, alt_oncelik = motor.siniflandir(GRUP, metrik.alt_kume(pozisyonlar).veri, kurallar)
+                kodlar = onceki["aksiyon"].cat.codes.to_numpy()[eslesme]
+                kodlar[pozisyonlar] = _aksiyon_kodlari(alt_aksiyon, etiketler)
+                aksiyon = etiketler[kodlar]
+                oncelik = onceki["oncelik"].to_numpy(dtype=np.int64)[eslesme]
+                oncelik[pozisyonlar] = alt_oncelik
+
+            fark, yeni_sku, kalkan = self._fark(onceki, girdi, eslesme, pozisyonlar, kodlar, oncelik, etiketler)
+            tablo = self._bulgu_tablosu(metrik, sorunlu_kategoriler, girdi, onceki,
+                                        None if neden else eslesme, pozisyonlar, aksiyon, oncelik)
+            durum = girdi.assign(aksiyon=pd.Categorical.from_codes(kodlar, etiketler),
+                                 oncelik=oncelik.astype(np.int8))
+            self._durum_yaz(durum, anahtar, None if neden else self._ek_guncelle(onceki, durum, pozisyonlar, kalkan))
+
+            self.son_fark = fark
+            self.son_ozet = ArtimliOzet(
+                sku=len(girdi), yeniden=len(pozisyonlar), yeni_sku=yeni_sku, kalkan_sku=len(kalkan),
+                fark=len(fark), tam=bool(neden), neden=neden,
+            )
+            if a:
+                a.ekle(yeniden=len(pozisyonlar), fark=len(fark), tam=bool(neden), neden=neden)
+            return tablo
+
+    def _bulgu_tablosu(self, metrik: SKUMetrikleri, sorunlu_kategoriler: List[str], girdi: pd.DataFrame,
+                       onceki: Optional[pd.DataFrame], eslesme: Optional[np.ndarray], pozisyonlar: np.ndarray,
+                       aksiyon: np.ndarray, oncelik: np.ndarray) -> pd.DataFrame:
+        """sku_siniflandir'ın tablosu - önceki tablo varsa sadece değişen satırlar kurulur
+
+        Değişmeyen satırın girdileri, adı ve sınıfı aynı olduğundan tablodaki
+        satırı da aynıdır ve olduğu gibi alınır. Değişenler önceki tablodan
+        çıkarılır, listeye girenleri yeniden kurulup eklenir; sıra (öncelik,
+        satış azalan, rapordaki yer) bütün satırlar için yeniden kurulur.
+        """
+        tablo, yer = self._tablo, self._tablo_yer
+        if eslesme is None or tablo is None or tablo["sku_kod"].dtype != metrik.sku_kod.dtype:
+            yer = sku_secimi(metrik, sorunlu_kategoriler, aksiyon, oncelik)
+            tablo = bulgu_tablosu(metrik, yer, aksiyon, oncelik)
+        else:
+            var = eslesme >= 0
+            simdiki = np.full(len(onceki), -1, dtype=np.int64)  # Önceki satırın bu haftaki yeri
+            simdiki[eslesme[var]] = np.flatnonzero(var)
+            degisti = np.zeros(len(girdi), dtype=bool)
+            degisti[pozisyonlar] = True
+
+            simdi = simdiki[yer]
+            kalan = simdi >= 0
+            kalan[kalan] = ~degisti[simdi[kalan]]
+            secili = (aksiyon[pozisyonlar] != "OK") | girdi["sorunlu"].to_numpy()[pozisyonlar]
+            yeni_yer = pozisyonlar[secili]
+
+            tum_yer = np.concatenate([simdi[kalan], yeni_yer])
+            sira = _tablo_sirasi(oncelik[tum_yer], metrik.haftalik_satis[tum_yer], tum_yer)
+            kaynak = np.concatenate([np.flatnonzero(kalan), len(tablo) + np.arange(len(yeni_yer))])
+            if len(yeni_yer):
+                tablo = pd.concat([tablo, bulgu_tablosu(metrik, yeni_yer, aksiyon, oncelik)], ignore_index=True)
+            tablo = tablo.take(kaynak[sira]).reset_index(drop=True)
+            yer = tum_yer[sira]
+        self._tablo, self._tablo_yer = tablo, yer
+        # Sığ kopya: çağıran tabloyu değiştirirse (copy-on-write) tutulan tablo etkilenmez
+        return tablo.copy(deep=False)
+
+    def _fark(self, onceki: Optional[pd.DataFrame], girdi: pd.DataFrame, eslesme: Optional[np.ndarray],
+              pozisyonlar: np.ndarray, kodlar: np.ndarray, oncelik: np.ndarray,
+              etiketler: np.ndarray) -> Tuple[pd.DataFrame, int, np.ndarray]:
+        """(fark tablosu, yeni SKU sayısı, kalkan satırların önceki durumdaki yeri)
+
+        Sadece yeniden sınıflanan ve kalkan satırlar taranır; karşılaştırma
+        aksiyon kodlarıyla yapılır, metinler sadece farklı çıkan satırlar için
+        kurulur.
+        """
+        if onceki is None:
+            eslesme = np.full(len(girdi), -1)
+            onceki = girdi.iloc[:0].assign(aksiyon=pd.Categorical.from_codes([], etiketler),
+                                           oncelik=np.empty(0, dtype=np.int8))
+        # İki taraf ortak etiket listesine (kural seti değiştiyse etiketler farklı olabilir)
+        onceki_etiketler = onceki["aksiyon"].cat.categories.to_numpy(dtype=object)
+        tum = pd.Index(list(dict.fromkeys([*etiketler, *onceki_etiketler])), dtype=object)
+        # Sona eklenen eleman yer -1 (SKU yok) için okunur
+        eski_esle = np.append(tum.get_indexer(onceki_etiketler), -1)
+        onceki_kod = np.append(onceki["aksiyon"].cat.codes.to_numpy(), -1)
+        onceki_oncelik = np.append(onceki["oncelik"].to_numpy(dtype=np.int64), 0)
+
+        yer = eslesme[pozisyonlar]
+        var = yer >= 0
+        kalan = np.ones(len(onceki), dtype=bool)
+        kalan[eslesme[eslesme >= 0]] = False
+        kalkan = np.flatnonzero(kalan)
+
+        # Adaylar: önce yeniden sınıflananlar, sonra kalkanlar
+        eski_yer = np.concatenate([np.where(var, yer, -1), kalkan])
+        eski_kod = eski_esle[onceki_kod[eski_yer]]
+        eski_oncelik = onceki_oncelik[eski_yer]
+        yeni_kod = np.concatenate([kodlar[pozisyonlar].astype(np.int64), np.full(len(kalkan), -1)])
+        yeni_oncelik = np.concatenate([oncelik[pozisyonlar], np.zeros(len(kalkan), dtype=np.int64)])
+        tur = _fark_turu(eski_kod, eski_oncelik, yeni_kod, yeni_oncelik, tum.get_indexer(["OK"])[0])
+
+        secili = np.flatnonzero(tur >= 0)
+        guncel = secili[secili < len(pozisyonlar)]
+        kalkan_secili = kalkan[secili[secili >= len(pozisyonlar)] - len(pozisyonlar)]
+
+        def kolon(ad: str) -> pd.Series:
+            # Önce seç, sonra birleştir: metin kolonları nesne dizisine çevrilmesin
+            return pd.concat([girdi[ad].iloc[pozisyonlar[guncel]], onceki[ad].iloc[kalkan_secili]],
+                             ignore_index=True)
+
+        def etiket(kodlar: np.ndarray, etiketler: Sequence[str]) -> pd.Series:
+            # Kod -> metin kategori üzerinden: her satır için metin kurulmaz (-1 boş kalır)
+            return pd.Series(pd.Categorical.from_codes(kodlar, etiketler)).astype("str")
+
+        eski_var = eski_kod[secili] >= 0
+        yeni_var = yeni_kod[secili] >= 0
+        fark = pd.DataFrame({
+            "sku_kod": kolon("kod"),
+            "sku_adi": kolon("sku_adi"),
+            "kategori": kolon("kategori"),
+            "degisim": etiket(tur[secili], FARK_TURLERI),
+            "onceki_aksiyon": etiket(eski_kod[secili], tum),
+            "aksiyon": etiket(yeni_kod[secili], tum),
+            "onceki_oncelik": np.where(eski_var, eski_oncelik[secili], np.nan),
+            "oncelik": np.where(yeni_var, yeni_oncelik[secili], np.nan),
+        })
+        # Türe, sonra ilgili aksiyon (çözülende eskisi, kural sırasıyla) ve önceliğe göre
+        cozuldu = tur[secili] == FARK_TURLERI.index(COZULDU)
+        sira = np.lexsort((
+            np.where(cozuldu, eski_oncelik[secili], yeni_oncelik[secili]),
+            np.where(cozuldu, eski_kod[secili], yeni_kod[secili]),
+            tur[secili],
+        ))
+        return fark.iloc[sira].reset_index(drop=True), int((~var).sum()), kalkan
+
+
+_varsayilan: Optional[ArtimliSiniflandirici] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_artimli() -> ArtimliSiniflandirici:
+    """ARTIMLI_AYARLARI ile kurulan süreç geneli sınıflandırıcı"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = ArtimliSiniflandirici()
+    return _varsayilan
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    from planner_agent import calistir
+    artimli = varsayilan_artimli()
+    rapor, sevk_df, indirim_df = calistir(sys.argv[1], sys.argv[2], artimli=artimli)
+    ozet = artimli.son_ozet
+    print(f"{ozet.sku:,} SKU, {ozet.yeniden:,} yeniden sınıflandı"
+          + (f" (tam hesaplama: {ozet.neden})" if ozet.tam else ""))
+    print(f"Yeni SKU: {ozet.yeni_sku:,} | Kalkan SKU: {ozet.kalkan_sku:,} | Bulgusu değişen: {ozet.fark:,}")
+    if ozet.fark:
+        print(fark_ozeti(artimli.son_fark).to_string(index=False))
@@ -0,0 +1,588 @@
+"""
+SANAL PLANNER - Performans Ölçümü
+Vektörel SKU kural motorunu eski satır döngüsüyle karşılaştırır,
+agent araç çıktılarının token maliyetini biçimlere göre ölçer,
+planlama hattının her aşamasını kayıtlı temel ölçüme karşı izler,
+haftalık artımlı sınıflandırmayı tam hesaplamayla, parçalı süreç havuzu
+analizini seri yolla, vektörel sevk dağıtımını SKU döngüsüyle karşılaştırır
+
+Kullanım: python benchmark.py [satır sayıları...]
+Örn: python benchmark.py 10000 100000 1000000
+     python benchmark.py araclar [satır sayısı]
+     python benchmark.py artimli [sku sayısı]
+     python benchmark.py paralel [sku sayısı]
+     python benchmark.py sevk [sku sayısı]
+     python benchmark.py paket [sku sayıları...] [--kaydet] [--temel dosya.json]
+
+'paket' sentetik çalışma kitapları üretir (veri_uretici), veri_yukle,
+kategori_analiz, sku_analiz, rapor_uret, calistir ve her agent aracını
+zamanlar; süre, SKU/sn ve tepe bellek yazar. Temel dosya varsa karşılaştırır
+ve regresyon bulursa 1 ile çıkar; --kaydet ölçümü temel olarak yazar.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from planner_agent import KURALLAR, SKUBulgu, sku_analiz, sku_kurallari_uygula
+from veri_uretici import KATEGORILER, urun_raporu_uret, trading_raporu_uret
+
+# =============================================================================
+# REFERANS (ESKİ SATIR DÖNGÜSÜ)
+# =============================================================================
+
+def sku_analiz_dongu(urun: pd.DataFrame, sorunlu_kategoriler: List[str]) -> List[SKUBulgu]:
+    """sku_analiz'in iterrows tabanlı ilk sürümü - parite kontrolü için"""
+    bulgular = []
+
+    urun['toplam_satis'] = urun['TW Adet'].fillna(0) + urun['LW Adet'].fillna(0)
+    urun_sirali = urun.sort_values('toplam_satis', ascending=False)
+    top_sku_listesi = urun_sirali.head(KURALLAR["top_sku_sayisi"])['Ürün Kodu'].tolist()
+
+    for _, row in urun.iterrows():
+        sku_kod = row['Ürün Kodu']
+        sku_adi = row['Ürün ']
+        kategori = row['Kategori ']
+
+        depo_stok = row.get('Anlık Depo Stok Adet', 0) or 0
+        magaza_stok = row.get('Anlık Mğz Stok Adet', 0) or 0
+        depo_stok = 0 if pd.isna(depo_stok) else depo_stok  # Boş hücre 0 adet
+        magaza_stok = 0 if pd.isna(magaza_stok) else magaza_stok
+        toplam_stok = depo_stok + magaza_stok
+
+        tw_satis = row.get('TW Adet', 0) or 0
+        lw_satis = row.get('LW Adet', 0) or 0
+        haftalik_satis = (tw_satis + lw_satis) / 2
+
+        indirim_orani = row.get('TW İO', 0) or 0
+
+        if haftalik_satis > 0:
+            cover_hafta = toplam_stok / haftalik_satis
+            magaza_cover = magaza_stok / haftalik_satis
+        else:
+            cover_hafta = 999
+            magaza_cover = 999
+
+        aksiyon = "OK"
+        oncelik = 3
+
+        if depo_stok > 100 and magaza_cover < 4 and haftalik_satis > 20:
+            aksiyon = "SEVK"
+            oncelik = 1 if sku_kod in top_sku_listesi else 2
+        elif depo_stok > 500 and magaza_cover < 8 and haftalik_satis > 10:
+            aksiyon = "SEVK"
+            oncelik = 2
+        elif cover_hafta > 20 and haftalik_satis < 30:
+            aksiyon = "INDIRIM"
+            oncelik = 2
+        elif cover_hafta > KURALLAR["cover_depo_hedef"] * 2 and haftalik_satis < 50:
+            aksiyon = "INDIRIM"
+            oncelik = 3
+        elif cover_hafta > KURALLAR["cover_magaza_max"]:
+            aksiyon = "IZLE"
+            oncelik = 3
+
+        if aksiyon != "OK" or kategori in sorunlu_kategoriler:
+            bulgular.append(SKUBulgu(
+                sku_kod=sku_kod,
+                sku_adi=sku_adi if pd.notna(sku_adi) else str(sku_kod),
+                kategori=kategori,
+                depo_stok=int(depo_stok),
+                magaza_stok=int(magaza_stok),
+                haftalik_satis=haftalik_satis,
+                cover_hafta=cover_hafta,
+                indirim_orani=indirim_orani,
+                aksiyon=aksiyon,
+                oncelik=oncelik
+            ))
+
+    bulgular.sort(key=lambda x: (x.oncelik, -x.haftalik_satis))
+    return bulgular
+
+
+# =============================================================================
+# ÖLÇÜM
+# =============================================================================
+
+def _sure(fonksiyon, *args) -> float:
+    baslangic = time.perf_counter()
+    fonksiyon(*args)
+    return time.perf_counter() - baslangic
+
+
+def sku_analiz_olc(satir_sayilari: List[int]) -> None:
+    """Her ölçekte iki sürümü zamanla (parite: tests/test_sku_analiz.py)
+    
+    'Tablo' sütunu SKUBulgu listesi kurulmadan sadece kolonsal sonucu ölçer.
+    """
+    sorunlu = KATEGORILER[:2]
+
+    print(f"{'Satır':>10} | {'Döngü (sn)':>11} | {'Vektörel (sn)':>13} | {'Tablo (sn)':>10} | {'Hızlanma':>9}")
+    print("-" * 67)
+
+    for n in satir_sayilari:
+        urun = urun_raporu_uret(n)
+
+        dongu = _sure(sku_analiz_dongu, urun.copy(), sorunlu)
+        vektorel = _sure(sku_analiz, urun.copy(), sorunlu)
+        tablo = _sure(sku_kurallari_uygula, urun.copy(), sorunlu)
+        print(f"{n:>10,} | {dongu:>11.2f} | {vektorel:>13.3f} | {tablo:>10.3f} | {dongu / vektorel:>8.0f}x")
+
+
+
+def _token_sayaci():
+    """ANTHROPIC_API_KEY varsa API ile gerçek sayım, yoksa karakter/3 tahmini"""
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        return "tahmini", lambda metin: len(metin) // 3
+
+    import anthropic
+    from agent_tools import MODEL
+    client = anthropic.Anthropic(api_key=api_key)
+    return "API", lambda metin: client.messages.count_tokens(
+        model=MODEL, messages=[{"role": "user", "content": metin}]
+    ).input_tokens
+
+
+def arac_token_olc(satir_sayisi: int = 100_000) -> None:
+    """Her araç çağrısının sonucu kaç token - metin / tsv / json"""
+    from agent_tools import CIKTI_BICIMLERI, KupVeri, arac_calistir
+
+    urun = urun_raporu_uret(satir_sayisi, bos_oran=0)
+    kup = KupVeri.tablolardan(trading_raporu_uret(urun), urun, kompakt=True)
+    kodlar = [str(k) for k in kup.urun['Ürün Kodu'].iloc[:20]]
+    cagrilar = [
+        ("genel_ozet", {}),
+        ("kategori_analiz", {"kategori": "CİLT BAKIM"}),
+        ("sku_detay", {"sku_kod": kodlar[0]}),
+        ("sku_toplu_detay", {"sku_kodlari": kodlar}),
+        ("sorunlu_bul", {"sorun_tipi": "hepsi"}),
+        ("sorunlu_bul", {"sorun_tipi": "hepsi", "baslangic": 15, "limit": 50}),
+    ]
+
+    tur, say = _token_sayaci()
+    print(f"Sentetik küp: {satir_sayisi:,} SKU | token sayımı: {tur}\n")
+    print(f"{'Araç':<34} | " + " | ".join(f"{b:>7}" for b in CIKTI_BICIMLERI) + " | tsv/metin")
+    print("-" * 74)
+
+    toplamlar = dict.fromkeys(CIKTI_BICIMLERI, 0)
+    for ad, girdi in cagrilar:
+        tokenler = {b: say(arac_calistir(kup, ad, girdi, bicim=b)) for b in CIKTI_BICIMLERI}
+        for b, t in tokenler.items():
+            toplamlar[b] += t
+        etiket = ad + (f" {girdi.get('limit', '')}@{girdi['baslangic']}" if "baslangic" in girdi else "")
+        print(f"{etiket:<34} | " + " | ".join(f"{tokenler[b]:>7,}" for b in CIKTI_BICIMLERI)
+              + f" | {tokenler['tsv'] / tokenler['metin']:>8.0%}")
+
+    print("-" * 74)
+    print(f"{'TOPLAM':<34} | " + " | ".join(f"{toplamlar[b]:>7,}" for b in CIKTI_BICIMLERI)
+          + f" | {toplamlar['tsv'] / toplamlar['metin']:>8.0%}")
+
+
+def _hafta_degistir(urun: pd.DataFrame, oran: float, tohum: int = 7) -> pd.DataFrame:
+    """Sonraki hafta: SKU'ların 'oran' kadarında satış ve stok değişir"""
+    rng = np.random.default_rng(tohum)
+    sonraki = urun.copy()
+    secili = rng.choice(len(urun), int(len(urun) * oran), replace=False)
+    sonraki.loc[secili, 'LW Adet'] = sonraki.loc[secili, 'TW Adet']
+    sonraki.loc[secili, 'TW Adet'] = rng.poisson(rng.lognormal(2.0, 1.2, len(secili))).astype(float)
+    sonraki.loc[secili, 'Anlık Mğz Stok Adet'] = rng.integers(0, 200, len(secili))
+    return sonraki
+
+
+def artimli_olc(sku_sayisi: int = 1_000_000, oranlar: Optional[List[float]] = None) -> None:
+    """Haftalık artımlı sınıflandırma - değişen SKU oranına göre tam hesaplamayla karşılaştır
+
+    Durum geçici dizindeki dosyaya yazılır, yazım ölçüme girer. 'Artımlı':
+    aynı süreçte ikinci hafta (önceki tablo bellekte). 'Yeni süreç': durum
+    dosyadan okunur, tablo baştan kurulur. Her oranda sonuç tablosunun tam
+    hesaplamayla aynı olduğu kontrol edilir.
+    """
+    from artimli_analiz import GRUP, ArtimliSiniflandirici
+    from kural_motoru import varsayilan_motor
+    from planner_agent import sku_metrikleri_hazirla, sku_siniflandir
+
+    oranlar = oranlar or [0.001, 0.01, 0.05, 0.2]
+    sorunlu = KATEGORILER[:2]
+    motor = varsayilan_motor()
+    urun = urun_raporu_uret(sku_sayisi, 12, 6)
+    onceki = sku_metrikleri_hazirla(urun.copy())
+    dizin = tempfile.mkdtemp(prefix="sanal_planner_artimli_")
+    dosya = os.path.join(dizin, "durum.parquet")
+
+    print(f"Artımlı sınıflandırma: {sku_sayisi:,} SKU\n")
+    print(f"{'Değişen':>8} | {'Yeniden':>9} | {'Fark':>7} | {'Kural tam (ms)':>14} | {'Kural art. (ms)':>15} | "
+          f"{'Tam (sn)':>8} | {'Artımlı (sn)':>12} | {'Yeni süreç (sn)':>15}")
+    print("-" * 111)
+    try:
+        for oran in oranlar:
+            metrik = sku_metrikleri_hazirla(_hafta_degistir(urun, oran))
+            tam_tablo = sku_siniflandir(metrik, sorunlu)
+            tam = min(_sure(sku_siniflandir, metrik, sorunlu) for _ in range(BENCHMARK_AYARLARI["tekrar"]))
+            kural_tam = min(_sure(motor.siniflandir, GRUP, sku_metrikleri_hazirla(urun.copy()).veri)
+                            for _ in range(BENCHMARK_AYARLARI["tekrar"]))
+
+            sureler, yeni_surec = [], []
+            for _ in range(BENCHMARK_AYARLARI["tekrar"]):
+                artimli = ArtimliSiniflandirici(dosya=dosya, tam_oran=1.0)
+                artimli.siniflandir(onceki, sorunlu)
+                baslangic = time.perf_counter()
+                tablo = artimli.siniflandir(metrik, sorunlu)
+                sureler.append(time.perf_counter() - baslangic)
+                pd.testing.assert_frame_equal(tablo, tam_tablo)
+
+                # Geçen haftanın durumu dosyada: yeni nesne okur, tabloyu baştan kurar
+                ArtimliSiniflandirici(dosya=dosya, tam_oran=1.0).siniflandir(onceki, sorunlu)
+                baslangic = time.perf_counter()
+                tablo = ArtimliSiniflandirici(dosya=dosya, tam_oran=1.0).siniflandir(metrik, sorunlu)
+                yeni_surec.append(time.perf_counter() - baslangic)
+                pd.testing.assert_frame_equal(tablo, tam_tablo)
+            ozet = artimli.son_ozet
+            alt = metrik.alt_kume(np.arange(ozet.yeniden))
+            kural_artimli = _sure(motor.siniflandir, GRUP, alt.veri)
+
+            print(f"{oran:>8.1%} | {ozet.yeniden:>9,} | {ozet.fark:>7,} | {kural_tam * 1000:>14.1f} | "
+                  f"{kural_artimli * 1000:>15.1f} | {tam:>8.3f} | {min(sureler):>12.3f} | {min(yeni_surec):>15.3f}")
+    finally:
+        shutil.rmtree(dizin, ignore_errors=True)
+
+
+def paralel_olc(sku_sayisi: int = 1_000_000, isciler: Optional[List[int]] = None) -> None:
+    """Parçalı SKU analizinin 1-16 süreçte ölçeklenmesi - seri yolla karşılaştır
+
+    Havuz her işçi sayısında önce bir kez ısıtılır (spawn ve modül yükleme
+    ölçüme girmez). Her ölçümde sonuç seri tabloyla aynı olmalı.
+    """
+    from paralel_analiz import paralel_sku_siniflandir
+    from planner_agent import sku_metrikleri_hazirla, sku_siniflandir
+
+    isciler = isciler or [1, 2, 4, 8, 16]
+    sorunlu = KATEGORILER[:2]
+    urun = urun_raporu_uret(sku_sayisi, 12, 6)
+
+    def seri():
+        return sku_siniflandir(sku_metrikleri_hazirla(urun.copy()), sorunlu)
+
+    beklenen = seri()
+    seri_sure = min(_sure(seri) for _ in range(BENCHMARK_AYARLARI["tekrar"]))
+    print(f"Paralel SKU analizi: {sku_sayisi:,} SKU, 12 kategori | çekirdek: {os.cpu_count()}")
+    print(f"Seri: {seri_sure:.3f} sn\n")
+    print(f"{'İşçi':>5} | {'Kategori (sn)':>13} | {'Hızlanma':>8} | {'Kod (sn)':>9} | {'Hızlanma':>8}")
+    print("-" * 56)
+    for isci in isciler:
+        satir = f"{isci:>5}"
+        for yontem in ("kategori", "kod"):
+            pd.testing.assert_frame_equal(paralel_sku_siniflandir(urun, sorunlu, isci=isci, yontem=yontem), beklenen)
+            sure = min(_sure(paralel_sku_siniflandir, urun, sorunlu, None, isci, yontem)
+                       for _ in range(BENCHMARK_AYARLARI["tekrar"]))
+            genislik = 13 if yontem == "kategori" else 9
+            satir += f" | {sure:>{genislik}.3f} | {seri_sure / sure:>7.2f}x"
+        print(satir)
+
+
+def _sevk_dagit_dongu(depo, magaza, satis, oncelik, esikler, kapasite) -> np.ndarray:
+    """Referans: SKU SKU iki turlu açgözlü dağıtım"""
+    sira = sorted(range(len(depo)), key=lambda i: (oncelik[i], -satis[i], i))
+    ihtiyac_min, ihtiyac_max = [], []
+    for i in range(len(depo)):
+        alt = math.ceil(satis[i] * esikler["cover_magaza_min"]) - magaza[i]
+        ust = max(math.floor(satis[i] * esikler["cover_magaza_max"]) - magaza[i], alt)
+        ihtiyac_min.append(math.floor(min(max(alt, 0), max(depo[i], 0))))
+        ihtiyac_max.append(math.floor(min(max(ust, 0), max(depo[i], 0))))
+
+    sevk = [0] * len(depo)
+    kalan = math.inf if kapasite is None else math.floor(kapasite)
+    for ihtiyac in (ihtiyac_min, ihtiyac_max):
+        for i in sira:
+            adet = min(ihtiyac[i] - sevk[i], kalan)
+            sevk[i] += adet
+            kalan -= adet
+    return np.array(sevk, dtype=np.int64)
+
+
+def sevk_olc(sku_sayisi: int = 100_000) -> None:
+    """Sevk dağıtımı: vektörel çözüm SKU döngüsüyle aynı mı, ne kadar hızlı
+
+    SEVK koşulunu sağlayan sentetik SKU'lar (yüksek satış, düşük mağaza
+    cover'ı); kapasite sınırsız ve max ihtiyacın %50 / %10'u.
+    """
+    from sevk_dagitimi import sevk_dagit
+    from kural_motoru import varsayilan_motor
+
+    esikler = varsayilan_motor().esikler
+    rng = np.random.default_rng(11)
+    satis = np.round(rng.gamma(2.0, 40.0, sku_sayisi) + 10, 1)
+    magaza = np.floor(satis * rng.uniform(0, esikler["cover_magaza_min"], sku_sayisi))
+    depo = rng.integers(0, 2_000, sku_sayisi).astype(float)
+    oncelik = rng.integers(1, 4, sku_sayisi)
+    _, ozet = sevk_dagit(depo, magaza, satis, oncelik)
+    kapasiteler = [None, ozet.ihtiyac_max * 0.5, ozet.ihtiyac_max * 0.1]
+
+    print(f"Sevk dağıtımı: {sku_sayisi:,} SKU | max ihtiyaç {ozet.ihtiyac_max:,} adet\n")
+    print(f"{'Kapasite':>12} | {'Döngü (sn)':>11} | {'Vektörel (ms)':>13} | {'Hızlanma':>9} | "
+          f"{'Sevk':>11} | {'Min karşılanan':>14}")
+    print("-" * 86)
+    for kapasite in kapasiteler:
+        vektorel = min(_sure(sevk_dagit, depo, magaza, satis, oncelik, None, kapasite)
+                       for _ in range(BENCHMARK_AYARLARI["tekrar"]))
+        sevk, ozet = sevk_dagit(depo, magaza, satis, oncelik, None, kapasite)
+        baslangic = time.perf_counter()
+        beklenen = _sevk_dagit_dongu(depo.tolist(), magaza.tolist(), satis.tolist(),
+                                     oncelik.tolist(), esikler, kapasite)
+        dongu = time.perf_counter() - baslangic
+        np.testing.assert_array_equal(sevk, beklenen)
+        assert (sevk <= depo).all() and (kapasite is None or sevk.sum() <= kapasite)
+
+        etiket = "sınırsız" if kapasite is None else f"{kapasite:,.0f}"
+        print(f"{etiket:>12} | {dongu:>11.2f} | {vektorel * 1000:>13.1f} | {dongu / vektorel:>8.0f}x | "
+              f"{ozet.sevk:>11,} | {ozet.min_karsilanan:>14,}")
+
+
+# =============================================================================
+# PAKET: HAT AŞAMALARI VE REGRESYON KONTROLÜ
+# =============================================================================
+
+BENCHMARK_AYARLARI = {
+    "temel_dosya": os.environ.get("SANAL_PLANNER_BENCHMARK_TEMEL", "benchmark_temel.json"),
+    "boyutlar": [1_000, 10_000, 100_000],
+    "tekrar": 3,                 # Süre = en iyi tekrar
+    "kategori_sayisi": 12,
+    "umg_sayisi": 6,
+    "sure_toleransi": 0.25,      # Temelden %25 fazla yavaş = regresyon
+    "bellek_toleransi": 0.10,    # Temelden %10 fazla tepe bellek = regresyon
+    "min_sure_farki": 0.005,     # Bunun altındaki süre farkları gürültü (sn)
+    "min_bellek_farki_mb": 1.0,
+}
+
+
+@dataclass
+class AsamaOlcumu:
+    asama: str
+    sku: int
+    sure: float       # En iyi tekrar (sn)
+    bellek_mb: float  # Aşama boyunca tepe bellek artışı (tracemalloc)
+
+    @property
+    def verim(self) -> float:
+        """SKU / sn"""
+        return self.sku / self.sure if self.sure > 0 else float("inf")
+
+
+def _asama_olc(asama: str, sku: int, fonksiyon: Callable, hazirla: Optional[Callable] = None,
+               tekrar: Optional[int] = None) -> AsamaOlcumu:
+    """Aşamayı zamanla, ayrı bir çalıştırmada tepe belleği ölç
+
+    hazirla() her çalıştırmadan önce (süreye katılmadan) çağrılır ve dönen
+    argümanlar fonksiyona verilir. tracemalloc yavaşlattığı için bellek
+    ölçümü zamanlanan tekrarlardan ayrı yapılır.
+    """
+    tekrar = tekrar or BENCHMARK_AYARLARI["tekrar"]
+    en_iyi = float("inf")
+    for _ in range(tekrar):
+        args = hazirla() if hazirla else ()
+        baslangic = time.perf_counter()
+        fonksiyon(*args)
+        en_iyi = min(en_iyi, time.perf_counter() - baslangic)
+
+    args = hazirla() if hazirla else ()
+    tracemalloc.start()
+    try:
+        taban = tracemalloc.get_traced_memory()[0]
+        fonksiyon(*args)
+        tepe = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return AsamaOlcumu(asama, sku, en_iyi, (tepe - taban) / 1024 ** 2)
+
+
+def _ortam() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "makine": platform.machine(),
+        "cpu": str(os.cpu_count()),
+    }
+
+
+def hat_olc(sku_sayisi: int) -> List[AsamaOlcumu]:
+    """Bir ölçekte tüm hat aşamaları ve agent araçları"""
+    import agent_tools
+    from onbellek import ONBELLEK_AYARLARI
+    from planner_agent import calistir, kategori_analiz, rapor_uret, veri_yukle
+    from veri_uretici import EXCEL_SATIR_LIMITI, calisma_kitaplari_yaz
+
+    kategori_sayisi = BENCHMARK_AYARLARI["kategori_sayisi"]
+    umg_sayisi = BENCHMARK_AYARLARI["umg_sayisi"]
+    olcumler = []
+
+    if sku_sayisi <= EXCEL_SATIR_LIMITI:
+        trading_yolu, urun_yolu = calisma_kitaplari_yaz(sku_sayisi, kategori_sayisi, umg_sayisi)
+
+        def onbellegi_bosalt():
+            shutil.rmtree(ONBELLEK_AYARLARI["dizin"], ignore_errors=True)
+            return trading_yolu, urun_yolu
+
+        # Soğuk: parse + önbelleğe yazma; sıcak: önbellekten okuma
+        olcumler.append(_asama_olc("veri_yukle_soguk", sku_sayisi, veri_yukle,
+                                   hazirla=onbellegi_bosalt, tekrar=2))
+        olcumler.append(_asama_olc("veri_yukle", sku_sayisi, lambda: veri_yukle(trading_yolu, urun_yolu)))
+        trading, urun = veri_yukle(trading_yolu, urun_yolu)
+        hat = lambda: calistir(trading_yolu, urun_yolu)
+    else:
+        # Excel sayfasına sığmayan ölçek: dosya aşamaları atlanır, hat bellekten
+        urun = urun_raporu_uret(sku_sayisi, kategori_sayisi, umg_sayisi)
+        trading = trading_raporu_uret(urun)
+        hat = lambda: calistir(veriler=(trading, urun.copy()))
+
+    kategori_bulgular = kategori_analiz(trading)
+    sorunlu = [b.kategori for b in kategori_bulgular if b.sorun_var]
+    olcumler.append(_asama_olc("kategori_analiz", sku_sayisi, lambda: kategori_analiz(trading)))
+    olcumler.append(_asama_olc("sku_analiz", sku_sayisi, lambda u: sku_analiz(u, sorunlu),
+                               hazirla=lambda: (urun.copy(),)))
+    sku_bulgular = sku_analiz(urun.copy(), sorunlu)
+    olcumler.append(_asama_olc("rapor_uret", sku_sayisi, lambda: rapor_uret(kategori_bulgular, sku_bulgular)))
+    olcumler.append(_asama_olc("calistir", sku_sayisi, hat))
+
+    # Agent: küp bir kez kurulur, araçlar sürekli kullanımdaki gibi ölçülür
+    olcumler.append(_asama_olc("kup_kur", sku_sayisi,
+                               lambda: agent_tools.KupVeri.tablolardan(trading, urun, kompakt=True)))
+    kup = agent_tools.KupVeri.tablolardan(trading, urun, kompakt=True)
+    kodlar = [str(k) for k in kup.urun['Ürün Kodu'].iloc[::max(1, len(kup.urun) // 50)][:50]]
+    kategori = str(kup.urun['Kategori '].iloc[0])
+    araclar = {
+        "genel_ozet": lambda: agent_tools.genel_ozet(kup),
+        "kategori_analiz": lambda: agent_tools.kategori_analiz(kup, kategori),
+        "sku_detay": lambda: agent_tools.sku_detay(kup, kodlar[0]),
+        "sku_toplu_detay": lambda: agent_tools.sku_toplu_detay(kup, kodlar),
+        "sorunlu_bul": lambda: agent_tools.sorunlu_bul(kup, "hepsi"),
+    }
+    for ad, fonksiyon in araclar.items():
+        olcumler.append(_asama_olc(f"arac_{ad}", sku_sayisi, fonksiyon))
+
+    return olcumler
+
+
+def temel_oku(yol: str) -> Optional[dict]:
+    if not os.path.exists(yol):
+        return None
+    with open(yol, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def temel_yaz(yol: str, olcumler: List[AsamaOlcumu]) -> None:
+    """Ölçülen boyutları temel dosyaya yaz (diğer boyutlar korunur)"""
+    temel = temel_oku(yol) or {"olcumler": {}}
+    temel["ortam"] = _ortam()
+    temel["ayarlar"] = {k: BENCHMARK_AYARLARI[k] for k in ("kategori_sayisi", "umg_sayisi")}
+    for o in olcumler:
+        temel["olcumler"].setdefault(str(o.sku), {})[o.asama] = {
+            "sure": round(o.sure, 6),
+            "bellek_mb": round(o.bellek_mb, 3),
+        }
+    with open(yol, "w", encoding="utf-8") as f:
+        json.dump(temel, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def regresyonlar(olcumler: List[AsamaOlcumu], temel: dict) -> Dict[tuple, str]:
+    """(sku, aşama) -> açıklama; temelde olmayan aşamalar karşılaştırılmaz"""
+    ayar = BENCHMARK_AYARLARI
+    sonuc = {}
+    for o in olcumler:
+        kayit = temel.get("olcumler", {}).get(str(o.sku), {}).get(o.asama)
+        if kayit is None:
+            continue
+        notlar = []
+        if (o.sure > kayit["sure"] * (1 + ayar["sure_toleransi"])
+                and o.sure - kayit["sure"] > ayar["min_sure_farki"]):
+            notlar.append(f"süre {kayit['sure'] * 1000:.1f} -> {o.sure * 1000:.1f} ms")
+        if (o.bellek_mb > kayit["bellek_mb"] * (1 + ayar["bellek_toleransi"])
+                and o.bellek_mb - kayit["bellek_mb"] > ayar["min_bellek_farki_mb"]):
+            notlar.append(f"bellek {kayit['bellek_mb']:.1f} -> {o.bellek_mb:.1f} MB")
+        if notlar:
+            sonuc[(o.sku, o.asama)] = ", ".join(notlar)
+    return sonuc
+
+
+def paket_calistir(boyutlar: List[int], kaydet: bool = False, temel_yolu: Optional[str] = None) -> int:
+    """Tüm boyutlarda hattı ölç, tabloyu yaz; regresyon varsa 1 döndür"""
+    from onbellek import ONBELLEK_AYARLARI
+    from izleme import IZLEME_AYARLARI
+
+    temel_yolu = temel_yolu or BENCHMARK_AYARLARI["temel_dosya"]
+    temel = None if kaydet else temel_oku(temel_yolu)
+    if temel and temel.get("ortam") != _ortam():
+        print(f"⚠️ Temel farklı ortamda ölçülmüş: {temel.get('ortam')}")
+
+    # Ölçüm kendi önbellek dizinini kullanır (kullanıcının önbelleği bozulmasın);
+    # aralıklar açık kalır ama izleme dosyasına binlerce ölçüm izi yazılmaz
+    ONBELLEK_AYARLARI["dizin"] = tempfile.mkdtemp(prefix="sanal_planner_benchmark_")
+    IZLEME_AYARLARI["dosya"] = ""
+    try:
+        olcumler = []
+        for n in boyutlar:
+            olcumler.extend(hat_olc(n))
+    finally:
+        shutil.rmtree(ONBELLEK_AYARLARI["dizin"], ignore_errors=True)
+
+    bulunan = regresyonlar(olcumler, temel) if temel else {}
+
+    print(f"{'Aşama':<22} | {'SKU':>10} | {'Süre (ms)':>10} | {'SKU/sn':>12} | {'Tepe MB':>8} | Temel")
+    print("-" * 90)
+    for o in olcumler:
+        durum = ""
+        if temel:
+            kayit = temel.get("olcumler", {}).get(str(o.sku), {}).get(o.asama)
+            if (o.sku, o.asama) in bulunan:
+                durum = "🔴 " + bulunan[(o.sku, o.asama)]
+            elif kayit:
+                durum = f"✅ {o.sure / kayit['sure']:.2f}x" if kayit["sure"] > 0 else "✅"
+            else:
+                durum = "yeni"
+        print(f"{o.asama:<22} | {o.sku:>10,} | {o.sure * 1000:>10.1f} | {o.verim:>12,.0f} | "
+              f"{o.bellek_mb:>8.1f} | {durum}")
+
+    if kaydet:
+        temel_yaz(temel_yolu, olcumler)
+        print(f"\nTemel kaydedildi: {temel_yolu}")
+    elif temel is None:
+        print(f"\nTemel yok ({temel_yolu}) - kaydetmek için --kaydet")
+
+    if bulunan:
+        print(f"\n🔴 {len(bulunan)} regresyon")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["araclar"]:
+        arac_token_olc(*(int(x) for x in sys.argv[2:3]))
+    elif sys.argv[1:2] == ["artimli"]:
+        artimli_olc(*(int(x) for x in sys.argv[2:3]))
+    elif sys.argv[1:2] == ["paralel"]:
+        paralel_olc(*(int(x) for x in sys.argv[2:3]))
+    elif sys.argv[1:2] == ["sevk"]:
+        sevk_olc(*(int(x) for x in sys.argv[2:3]))
+    elif sys.argv[1:2] == ["paket"]:
+        argumanlar = sys.argv[2:]
+        temel_yolu = None
+        if "--temel" in argumanlar:
+            i = argumanlar.index("--temel")
+            temel_yolu = argumanlar[i + 1]
+            del argumanlar[i:i + 2]
+        kaydet = "--kaydet" in argumanlar
+        boyutlar = [int(x) for x in argumanlar if x != "--kaydet"] or BENCHMARK_AYARLARI["boyutlar"]
+        sys.exit(paket_calistir(boyutlar, kaydet=kaydet, temel_yolu=temel_yolu))
+    else:
+        boyutlar = [int(x) for x in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+        sku_analiz_olc(boyutlar)
@@ -0,0 +1,154 @@
+"""
+SANAL PLANNER - Akışlı Excel Okuyucu
+Çok büyük ürün raporlarını sabit bellekle okur
+
+pd.read_excel tüm sayfayı nesne tablosu olarak belleğe alır. Bu okuyucu
+openpyxl'i read-only modda satır satır gezer, sadece planner'ın kullandığı
+kolonları alır ve her parçayı hemen tipli dizilere çevirir:
+sayılar float64, metinler sözlük kodlu (kategorik) olur.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import BinaryIO, Dict, List, Optional, Union
+
+# =============================================================================
+# KOLONLAR
+# =============================================================================
+
+# Kolon adı -> tip ("kod": SKU kodu, "metin": kategorik, "sayi": float64)
+URUN_KOLONLARI = {
+    'Ürün Kodu': 'kod',
+    'Ürün ': 'metin',
+    'Kategori ': 'metin',
+    'ÜMG': 'metin',
+    'Marka ': 'metin',
+    'TW Adet': 'sayi',
+    'LW Adet': 'sayi',
+    'Anlık Depo Stok Adet': 'sayi',
+    'Anlık Mğz Stok Adet': 'sayi',
+    'TW İO': 'sayi',
+}
+
+PARCA_BOYUTU = 50_000
+
+# =============================================================================
+# TİPLİ BİRİKTİRİCİLER
+# =============================================================================
+
+class _SayiKolon:
+    """Parçaları float64 dizilere çevirerek biriktirir"""
+
+    def __init__(self):
+        self.parcalar: List[np.ndarray] = []
+
+    def ekle(self, degerler: list) -> None:
+        self.parcalar.append(np.array(
+            [d if isinstance(d, (int, float)) else np.nan for d in degerler],
+            dtype=np.float64
+        ))
+
+    def sonuc(self) -> np.ndarray:
+        return np.concatenate(self.parcalar) if self.parcalar else np.empty(0)
+
+
+class _MetinKolon:
+    """Metinleri sözlük kodlarıyla (int32) biriktirir - her farklı değer bir kez tutulur"""
+
+    def __init__(self):
+        self.sozluk: Dict[object, int] = {}
+        self.parcalar: List[np.ndarray] = []
+
+    def ekle(self, degerler: list) -> None:
+        sozluk = self.sozluk
+        kodlar = np.empty(len(degerler), dtype=np.int32)
+        for i, d in enumerate(degerler):
+            if d is None:
+                kodlar[i] = -1
+            else:
+                kodlar[i] = sozluk.setdefault(d, len(sozluk))
+        self.parcalar.append(kodlar)
+
+    def sonuc(self) -> pd.Categorical:
+        kodlar = np.concatenate(self.parcalar) if self.parcalar else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(kodlar, categories=list(self.sozluk))
+
+
+class _KodKolon:
+    """SKU kodları - hepsi tam sayıysa int64, değilse orijinal değerler"""
+
+    def __init__(self):
+        self.parcalar: List[np.ndarray] = []
+
+    def ekle(self, degerler: list) -> None:
+        if all(type(d) is int for d in degerler):
+            self.parcalar.append(np.array(degerler, dtype=np.int64))
+        else:
+            dizi = np.empty(len(degerler), dtype=object)
+            dizi[:] = [np.nan if d is None else d for d in degerler]
+            self.parcalar.append(dizi)
+
+    def sonuc(self) -> np.ndarray:
+        if not self.parcalar:
+            return np.empty(0, dtype=np.int64)
+        if any(p.dtype == object for p in self.parcalar):
+            return np.concatenate([p.astype(object) for p in self.parcalar])
+        return np.concatenate(self.parcalar)
+
+
+_BIRIKTIRICILER = {'kod': _KodKolon, 'metin': _MetinKolon, 'sayi': _SayiKolon}
+
+# =============================================================================
+# OKUMA
+# =============================================================================
+
+def urun_akis_oku(path: Union[str, BinaryIO], kolonlar: Optional[Dict[str, str]] = None,
+                  parca_boyutu: int = PARCA_BOYUTU) -> pd.DataFrame:
+    """Ürün raporunu parça parça oku (ilk sayfa)
+
+    path dosya yolu veya açık ikili dosya (BytesIO) olabilir. Bellek
+    kullanımı sayfanın tamamıyla değil, seçilen kolonlarla ölçeklenir.
+    Dosyada olmayan kolonlar atlanır.
+    """
+    from openpyxl import load_workbook
+
+    kolonlar = kolonlar or URUN_KOLONLARI
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        satirlar = ws.iter_rows(values_only=True)
+        baslik = next(satirlar, ())
+
+        # Başlıktan kolon pozisyonlarını bul
+        secilen = [(i, ad) for i, ad in enumerate(baslik) if ad in kolonlar]
+        if not secilen:
+            return pd.DataFrame(columns=list(kolonlar))
+        son_kolon = max(i for i, _ in secilen) + 1
+        satirlar = ws.iter_rows(min_row=2, max_col=son_kolon, values_only=True)
+
+        biriktiriciler = {ad: _BIRIKTIRICILER[kolonlar[ad]]() for _, ad in secilen}
+        tampon = {ad: [] for _, ad in secilen}
+        dolu = 0
+
+        def bosalt():
+            for ad, degerler in tampon.items():
+                biriktiriciler[ad].ekle(degerler)
+                degerler.clear()
+
+        for satir in satirlar:
+            # Tamamen boş satırları atla (read_excel davranışı)
+            if all(d is None for d in satir):
+                continue
+            for i, ad in secilen:
+                tampon[ad].append(satir[i] if i < len(satir) else None)
+            dolu += 1
+            if dolu == parca_boyutu:
+                bosalt()
+                dolu = 0
+        if dolu:
+            bosalt()
+    finally:
+        wb.close()
+
+    return pd.DataFrame({ad: biriktiriciler[ad].sonuc() for _, ad in secilen})
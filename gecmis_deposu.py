@@ -0,0 +1,419 @@
+"""
+SANAL PLANNER - Geçmiş Deposu
+Haftalık ürün ve trading anlık görüntülerinin hafta bölümlü Parquet deposu
+
+Her hafta bir kez eklenir (eski Excel'ler bir daha parse edilmez). Ürün
+satırları SKU ve kategori boyutlarına kodlanır: olgu tablosunda sadece
+sku_id / kategori_id (int32) ve sayılar durur, metinler boyut tablolarında
+bir kez tutulur. SKU boyutu sürümlüdür: ürün adı, ÜMG veya marka değişirse
+aynı kod için yeni bir sku_id açılır, eski haftalar kendi hallerini korur.
+Hafta klasörleri (hafta=2026-W41) ve kategori sıralı satır grupları
+sayesinde "X kategorisinin son 13 haftası" gibi aralık sorguları sadece
+ilgili dosya ve satır gruplarını okur.
+
+Yerleşim:
+    boyut_sku.parquet        sku_id, Ürün Kodu, Ürün , ÜMG, Marka  (her farklı hal bir satır)
+    boyut_kategori.parquet   kategori_id, Kategori
+    urun/hafta=.../veri.parquet
+    trading/hafta=.../veri.parquet
+
+Kullanım: python gecmis_deposu.py ekle <hafta> <trading.xlsx> <urun.xlsx>
+          python gecmis_deposu.py haftalar
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from excel_okuyucu import URUN_KOLONLARI
+from izleme import aralik
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_VAR = True
+except ImportError:
+    PARQUET_VAR = False
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+GECMIS_AYARLARI = {
+    "dizin": os.environ.get(
+        "SANAL_PLANNER_GECMIS_DIZIN",
+        os.path.join(os.path.expanduser("~"), ".local", "share", "sanal_planner", "gecmis")
+    ),
+    # Kategori filtresinde atlanabilen satır grubu boyu
+    "satir_grubu": 65_536,
+}
+
+HAFTA_DESENI = re.compile(r"^\d{4}-W\d{2}$")
+
+# Olgu tablosundaki sayı kolonları ve boyutlara giden metin kolonları
+SAYI_KOLONLARI = [k for k, tip in URUN_KOLONLARI.items() if tip == "sayi"]
+SKU_NITELIKLERI = ['Ürün ', 'ÜMG', 'Marka ']
+
+
+def hafta_kodu(tarih: Optional[date] = None) -> str:
+    """ISO hafta kodu: 2026-W41 (metin olarak sıralanabilir)"""
+    yil, hafta, _ = (tarih or date.today()).isocalendar()
+    return f"{yil}-W{hafta:02d}"
+
+
+def kod_anahtari(kodlar: pd.Series) -> np.ndarray:
+    """SKU kodlarını haftalar arası eşleşecek metne çevir (1000001.0 -> '1000001')"""
+    def anahtar(kod) -> str:
+        if isinstance(kod, (float, np.floating)) and float(kod).is_integer():
+            return str(int(kod))
+        return str(kod).strip()
+    if pd.api.types.is_integer_dtype(kodlar):
+        return kodlar.astype(str).to_numpy(dtype=object)
+    return np.array([anahtar(k) for k in kodlar.tolist()], dtype=object)
+
+
+BOS = "\x1e"  # Boyut dizilerinde boş değer işareti (None dizide karşılaştırılamaz)
+
+
+def _isaretle(seri: pd.Series) -> np.ndarray:
+    """Metin kolonunu nesne dizisine çevir, boşlar BOS"""
+    return seri.astype(object).where(seri.notna(), BOS).to_numpy(dtype=object)
+
+
+def _kategorik(degerler: np.ndarray) -> Tuple[np.ndarray, pd.Index]:
+    """(kodlar, sıralı kategoriler) - BOS -1 olur; sıralı kategoriler groupby
+    sırasını metin kolonuyla aynı tutar"""
+    kodlar, kategoriler = pd.factorize(degerler, sort=True)
+    kategoriler = pd.Index(kategoriler, dtype=object)
+    bos = kategoriler.get_indexer([BOS])[0]
+    if bos >= 0:
+        kodlar = np.where(kodlar == bos, -1, np.where(kodlar > bos, kodlar - 1, kodlar))
+        kategoriler = kategoriler.delete(bos)
+    return kodlar.astype(np.int32), kategoriler
+
+
+class _SkuBoyutu:
+    """sku_id -> kod + nitelikler (sürümlü)
+
+    Yeni haftanın satırları önce kodun son sürümüyle karşılaştırılır; sadece
+    yeni kodlar ve niteliği değişenler yeni sürüm açar.
+    """
+
+    def __init__(self, tablo: pd.DataFrame):
+        self.kod = tablo['Ürün Kodu'].astype(object).to_numpy(dtype=object)
+        self.nitelik = {k: _isaretle(tablo[k]) for k in SKU_NITELIKLERI}
+        self._son_surum: Optional[pd.Series] = None  # kod -> en büyük sku_id
+        self._cozucu: Optional[dict] = None
+
+    def __len__(self) -> int:
+        return len(self.kod)
+
+    def tablo(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'sku_id': np.arange(len(self), dtype=np.int32),
+            'Ürün Kodu': self.kod,
+            **{k: np.where(v == BOS, None, v) for k, v in self.nitelik.items()},
+        })
+
+    def kodla(self, kodlar: np.ndarray, nitelik: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(sku_id dizisi, yeni sürüm açan satırlar) - boyut değişmez, ekle() ile eklenir"""
+        if self._son_surum is None:
+            self._son_surum = pd.Series(np.arange(len(self))).groupby(self.kod).max()
+        konum = self._son_surum.index.get_indexer(kodlar)
+        var = konum >= 0
+        aday = np.full(len(kodlar), -1, dtype=np.int64)
+        aday[var] = self._son_surum.to_numpy()[konum[var]]
+        ayni = var.copy()
+        for k, degerler in nitelik.items():
+            ayni[var] &= self.nitelik[k][aday[var]] == degerler[var]
+
+        ids = np.where(ayni, aday, -1)
+        kalan = np.flatnonzero(~ayni)
+        if not len(kalan):
+            return ids.astype(np.int32), kalan
+        # Aynı hafta içinde tekrarlanan kod + nitelikler tek sürüm olur
+        anahtar = pd.Series(kodlar[kalan]).str.cat(
+            [pd.Series(nitelik[k][kalan]) for k in SKU_NITELIKLERI], sep="\x1f").to_numpy(dtype=object)
+        sira, tekil = pd.factorize(anahtar)
+        ids[kalan] = len(self) + sira
+        ilk = kalan[np.unique(sira, return_index=True)[1]]
+        return ids.astype(np.int32), ilk
+
+    def ekle(self, kodlar: np.ndarray, nitelik: Dict[str, np.ndarray]) -> None:
+        self.kod = np.concatenate([self.kod, kodlar])
+        for k in SKU_NITELIKLERI:
+            self.nitelik[k] = np.concatenate([self.nitelik[k], nitelik[k]])
+        self._son_surum = None
+        self._cozucu = None
+
+    def cozucu(self) -> dict:
+        """Okuma için hazır diziler: kod dizisi ve her nitelik için (kodlar, kategoriler)"""
+        if self._cozucu is None:
+            kod = self.kod
+            # Tüm kodlar tam sayıysa read_excel gibi int64 - başında sıfır olan
+            # kod varsa ("00123") metin kalır, yoksa sıfırlar kaybolur
+            if len(kod) and all(k.isdigit() and (k[0] != '0' or k == '0') for k in kod.tolist()):
+                kod = kod.astype(np.int64)
+            self._cozucu = {'Ürün Kodu': kod, **{k: _kategorik(v) for k, v in self.nitelik.items()}}
+        return self._cozucu
+
+# =============================================================================
+# DEPO
+# =============================================================================
+
+class GecmisDeposu:
+    """Hafta bölümlü ürün/trading deposu - ekleme artımlı, okuma aralıklı"""
+
+    def __init__(self, dizin: str):
+        if not PARQUET_VAR:
+            raise RuntimeError("Geçmiş deposu için pyarrow gerekli")
+        self.dizin = dizin
+        self._kilit = threading.Lock()
+        self._sku: Optional[_SkuBoyutu] = None
+        self._kategori: Optional[np.ndarray] = None  # kategori_id -> ad (boş = BOS)
+
+    # -------------------------------------------------------------------------
+    # Boyutlar
+    # -------------------------------------------------------------------------
+
+    def _yol(self, *parcalar: str) -> str:
+        return os.path.join(self.dizin, *parcalar)
+
+    def _boyutlar(self) -> Tuple[_SkuBoyutu, np.ndarray]:
+        if self._sku is None:
+            yol = self._yol("boyut_sku.parquet")
+            self._sku = _SkuBoyutu(pd.read_parquet(yol) if os.path.exists(yol) else
+                                   pd.DataFrame(columns=['sku_id', 'Ürün Kodu'] + SKU_NITELIKLERI))
+            yol = self._yol("boyut_kategori.parquet")
+            self._kategori = (_isaretle(pd.read_parquet(yol)['Kategori ']) if os.path.exists(yol)
+                              else np.empty(0, dtype=object))
+        return self._sku, self._kategori
+
+    # -------------------------------------------------------------------------
+    # Ekleme
+    # -------------------------------------------------------------------------
+
+    def hafta_ekle(self, hafta: str, trading: pd.DataFrame, urun: pd.DataFrame,
+                   uzerine_yaz: bool = False) -> int:
+        """Haftanın anlık görüntüsünü ekle, eklenen ürün satırı sayısını döndür
+
+        Sadece bu haftanın klasörü yazılır; boyutlara yeni SKU/kategoriler
+        eklenir, var olanların id'si değişmez. Hafta zaten varsa
+        uzerine_yaz=True verilmedikçe ValueError.
+        """
+        if not HAFTA_DESENI.match(hafta):
+            raise ValueError(f"Hafta kodu YYYY-Www olmalı: {hafta!r}")
+        for kolon in ('Ürün Kodu', 'Kategori '):
+            if kolon not in urun.columns:
+                raise ValueError(f"Ürün raporunda '{kolon}' kolonu yok")
+
+        with self._kilit, aralik("gecmis_ekle", hafta=hafta, satir=len(urun)):
+            if hafta in self.haftalar() and not uzerine_yaz:
+                raise ValueError(f"{hafta} zaten depoda (uzerine_yaz=True ile değiştirilebilir)")
+
+            sku, kategori = self._boyutlar()
+            kodlar = kod_anahtari(urun['Ürün Kodu'])
+            nitelik = {k: _isaretle(urun[k]) if k in urun.columns else np.full(len(urun), BOS, dtype=object)
+                       for k in SKU_NITELIKLERI}
+            sku_id, yeni_sku = sku.kodla(kodlar, nitelik)
+
+            kat = _isaretle(urun['Kategori '])
+            kategori_id = pd.Index(kategori).get_indexer(kat)
+            yeni_kategori = pd.unique(kat[kategori_id < 0])
+            if len(yeni_kategori):
+                kategori = np.concatenate([kategori, yeni_kategori.astype(object)])
+                kategori_id = pd.Index(kategori).get_indexer(kat)
+
+            # Boyutlar önce yazılır: yarıda kalan ekleme id'si boyutta olmayan satır bırakmaz
+            if len(yeni_sku):
+                sku.ekle(kodlar[yeni_sku], {k: v[yeni_sku] for k, v in nitelik.items()})
+                self._tablo_yaz(sku.tablo(), self._yol("boyut_sku.parquet"))
+            if len(yeni_kategori):
+                self._tablo_yaz(pd.DataFrame({
+                    'kategori_id': np.arange(len(kategori), dtype=np.int32),
+                    'Kategori ': np.where(kategori == BOS, None, kategori),
+                }), self._yol("boyut_kategori.parquet"))
+                self._kategori = kategori
+
+            # sira: rapordaki satır sırası (araçların sıralamaları aynı kalsın)
+            olgu = pd.DataFrame({'sku_id': sku_id, 'kategori_id': kategori_id.astype(np.int32),
+                                 'sira': np.arange(len(urun), dtype=np.int32)})
+            for kolon in SAYI_KOLONLARI:
+                olgu[kolon] = (pd.to_numeric(urun[kolon], errors='coerce').to_numpy(dtype=np.float64)
+                               if kolon in urun.columns else np.nan)
+            # Kategori sıralı satır grupları: kategori filtresi grupları atlar
+            olgu = olgu.sort_values(['kategori_id', 'sku_id'], kind='stable').reset_index(drop=True)
+
+            self._hafta_yaz("urun", hafta, olgu, GECMIS_AYARLARI["satir_grubu"])
+            self._hafta_yaz("trading", hafta, self._trading_hazirla(trading))
+            return len(olgu)
+
+    @staticmethod
+    def _trading_hazirla(trading: pd.DataFrame) -> pd.DataFrame:
+        """Karışık tipli metin kolonları Parquet'e yazılabilsin"""
+        trading = trading.copy()
+        for kolon in trading.columns:
+            if trading[kolon].dtype == object and not all(
+                    isinstance(d, str) for d in trading[kolon].dropna().tolist()):
+                trading[kolon] = trading[kolon].map(lambda d: None if pd.isna(d) else str(d))
+        return trading
+
+    def _tablo_yaz(self, df: pd.DataFrame, yol: str, satir_grubu: Optional[int] = None) -> None:
+        """Atomik yaz - okuyan oturumlar yarım dosya görmesin"""
+        os.makedirs(os.path.dirname(yol), exist_ok=True)
+        fd, gecici = tempfile.mkstemp(dir=os.path.dirname(yol), suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), gecici,
+                           row_group_size=satir_grubu)
+            os.replace(gecici, yol)
+        except BaseException:
+            if os.path.exists(gecici):
+                os.remove(gecici)
+            raise
+
+    def _hafta_yaz(self, tablo: str, hafta: str, df: pd.DataFrame, satir_grubu: Optional[int] = None) -> None:
+        self._tablo_yaz(df, self._yol(tablo, f"hafta={hafta}", "veri.parquet"), satir_grubu)
+
+    def hafta_sil(self, hafta: str) -> None:
+        """Haftayı depodan çıkar (boyutlar olduğu gibi kalır)"""
+        with self._kilit:
+            for tablo in ("urun", "trading"):
+                shutil.rmtree(self._yol(tablo, f"hafta={hafta}"), ignore_errors=True)
+
+    # -------------------------------------------------------------------------
+    # Okuma
+    # -------------------------------------------------------------------------
+
+    def haftalar(self) -> List[str]:
+        """Depodaki haftalar, eskiden yeniye"""
+        kok = self._yol("urun")
+        if not os.path.isdir(kok):
+            return []
+        return sorted(
+            ad.split("=", 1)[1] for ad in os.listdir(kok)
+            if ad.startswith("hafta=") and os.path.exists(os.path.join(kok, ad, "veri.parquet"))
+        )
+
+    def aralik_haftalari(self, bas: Optional[str] = None, bit: Optional[str] = None,
+                         son: Optional[int] = None) -> List[str]:
+        """[bas, bit] aralığındaki haftalar; son=N verilirse aralığın son N haftası"""
+        haftalar = [h for h in self.haftalar()
+                    if (bas is None or h >= bas) and (bit is None or h <= bit)]
+        return haftalar[-son:] if son else haftalar
+
+    def urun_oku(self, bas: Optional[str] = None, bit: Optional[str] = None, son: Optional[int] = None,
+                 kategoriler: Optional[Sequence[str]] = None,
+                 kolonlar: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Haftalık ürün satırları, ürün raporu kolon adlarıyla + 'hafta'
+
+        Sadece aralıktaki hafta klasörleri ve (kategori verilirse) o
+        kategorilerin satır grupları okunur. kolonlar: istenen sayı
+        kolonları (verilmezse hepsi). Metinler kategorik döner.
+        """
+        haftalar = self.aralik_haftalari(bas, bit, son)
+        sayilar = list(kolonlar) if kolonlar is not None else SAYI_KOLONLARI
+        sku, kategori = self._boyutlar()
+
+        with aralik("gecmis_oku", hafta=len(haftalar)) as a:
+            filtre = None
+            if kategoriler is not None:
+                ids = np.flatnonzero(pd.Index(kategori).isin(list(kategoriler))).astype(np.int32)
+                filtre = ds.field('kategori_id').isin(pa.array(ids))
+
+            parcalar = []
+            for hafta in haftalar:
+                veri = ds.dataset(self._yol("urun", f"hafta={hafta}", "veri.parquet"), format="parquet")
+                tablo = veri.to_table(columns=['sku_id', 'kategori_id', 'sira'] + sayilar,
+                                      filter=filtre).to_pandas()
+                tablo = tablo.sort_values('sira', kind='stable').drop(columns='sira')
+                tablo.insert(0, 'hafta', hafta)
+                parcalar.append(tablo)
+            olgu = (pd.concat(parcalar, ignore_index=True) if parcalar else
+                    pd.DataFrame(columns=['hafta', 'sku_id', 'kategori_id'] + sayilar))
+            if a:
+                a.ekle(satir=len(olgu))
+            return self._coz(olgu, sayilar)
+
+    def _coz(self, olgu: pd.DataFrame, sayilar: Sequence[str]) -> pd.DataFrame:
+        """Boyut id'lerini ürün raporu kolonlarına geri çevir"""
+        sku, kategori = self._boyutlar()
+        cozucu = sku.cozucu()
+        sku_id = olgu['sku_id'].to_numpy(dtype=np.int64)
+        kategori_id = olgu['kategori_id'].to_numpy(dtype=np.int64)
+
+        def kategorik(kodlar_kategoriler: Tuple[np.ndarray, pd.Index], ids: np.ndarray) -> pd.Categorical:
+            kodlar, kategoriler = kodlar_kategoriler
+            return pd.Categorical.from_codes(kodlar[ids], categories=kategoriler)
+
+        sonuc = {
+            'hafta': pd.Categorical(olgu['hafta']),
+            'Ürün Kodu': cozucu['Ürün Kodu'][sku_id],
+            'Ürün ': kategorik(cozucu['Ürün '], sku_id),
+            'Kategori ': kategorik(_kategorik(kategori), kategori_id),
+            'ÜMG': kategorik(cozucu['ÜMG'], sku_id),
+            'Marka ': kategorik(cozucu['Marka '], sku_id),
+        }
+        for kolon in sayilar:
+            sonuc[kolon] = _tamsayiya_indir(olgu[kolon].to_numpy(dtype=np.float64))
+        return pd.DataFrame(sonuc)
+
+    def trading_oku(self, hafta: str) -> pd.DataFrame:
+        """Haftanın trading raporu ('mtd' sayfası)"""
+        yol = self._yol("trading", f"hafta={hafta}", "veri.parquet")
+        if not os.path.exists(yol):
+            raise KeyError(f"{hafta} depoda yok")
+        return pd.read_parquet(yol)
+
+    def haftalik_toplam(self, kategori: Optional[str] = None, son: Optional[int] = 13,
+                        bit: Optional[str] = None,
+                        kolonlar: Sequence[str] = ('TW Adet', 'Anlık Depo Stok Adet', 'Anlık Mğz Stok Adet')
+                        ) -> pd.DataFrame:
+        """Hafta bazında toplamlar (ör. bir kategorinin son 13 haftalık satışı)"""
+        kolonlar = list(kolonlar)
+        satirlar = self.urun_oku(bit=bit, son=son, kategoriler=[kategori] if kategori else None,
+                                 kolonlar=kolonlar)
+        toplam = satirlar.groupby('hafta', observed=True)[kolonlar].sum()
+        toplam.insert(0, 'SKU', satirlar.groupby('hafta', observed=True).size())
+        return toplam
+
+
+def _tamsayiya_indir(dizi: np.ndarray) -> np.ndarray:
+    """Boşluksuz ve tam sayı değerli kolon int64 (read_excel'in çıkarımı gibi)"""
+    if len(dizi) and not np.isnan(dizi).any() and (dizi == np.floor(dizi)).all():
+        return dizi.astype(np.int64)
+    return dizi
+
+
+_varsayilan: Optional[GecmisDeposu] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_gecmis_deposu() -> GecmisDeposu:
+    """GECMIS_AYARLARI ile kurulan süreç geneli depo"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = GecmisDeposu(GECMIS_AYARLARI["dizin"])
+    return _varsayilan
+
+
+if __name__ == "__main__":
+    depo = varsayilan_gecmis_deposu()
+    if sys.argv[1:2] == ["ekle"] and len(sys.argv) == 5:
+        from planner_agent import veri_yukle
+        trading, urun = veri_yukle(sys.argv[3], sys.argv[4])
+        print(f"{sys.argv[2]}: {depo.hafta_ekle(sys.argv[2], trading, urun):,} ürün satırı eklendi")
+    elif sys.argv[1:2] == ["haftalar"]:
+        print("\n".join(depo.haftalar()) or "Depo boş")
+    else:
+        print(__doc__)
+        sys.exit(1)
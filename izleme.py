@@ -0,0 +1,227 @@
+"""
+SANAL PLANNER - İzleme
+Hat aşamaları, agent turları, API istekleri ve araç çağrıları için süre aralıkları
+
+Her aşama bir aralık (span) açar; iç içe açılan aralıklar ağaç kurar.
+İlk açılan aralık kök olur. İzler bellekte tutulur (arayüz paneli);
+SANAL_PLANNER_IZ_DOSYASI verilirse kök bittiğinde izin tüm aralıkları JSON
+satırları olarak o dosyaya da eklenir. Geçerli aralık contextvars ile
+taşınır: iş parçacığı havuzuna verilen işler baglamda() ile sarılırsa
+aralıkları çağıranın altına düşer. Üreteçler yield'ler arasında açık kalan
+aralıkları ust= ile açar (bkz. aralik).
+
+Dosya satırı: {"iz", "aralik", "ust", "ad", "baslangic", "sure_ms",
+"is_parcacigi", "hata"?, "ozellik": {...}}
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+import pandas as pd
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+IZLEME_AYARLARI = {
+    "acik": os.environ.get("SANAL_PLANNER_IZLEME", "1") != "0",
+    # Verilmezse izler sadece bellekte kalır (arayüz paneli için); dosyaya
+    # yazmak için yol verilmeli, örn. ~/.cache/sanal_planner/izler.jsonl
+    "dosya": os.environ.get("SANAL_PLANNER_IZ_DOSYASI", ""),
+    "dosya_limit_mb": float(os.environ.get("SANAL_PLANNER_IZ_DOSYASI_MB", 50)),  # Aşılınca .1'e döner
+}
+
+# =============================================================================
+# ARALIKLAR
+# =============================================================================
+
+@dataclass(eq=False)
+class Aralik:
+    ad: str
+    iz: "Iz"
+    kimlik: str
+    ust: Optional[str]
+    baslangic: float                  # Unix zamanı (sn)
+    sure_sn: float = 0.0
+    is_parcacigi: str = ""
+    hata: Optional[str] = None
+    ozellikler: Dict[str, object] = field(default_factory=dict)
+
+    def ekle(self, **ozellikler) -> None:
+        """Satır sayısı, token vb. bilgileri aralığa ekle"""
+        self.ozellikler.update(ozellikler)
+
+    def kayit(self) -> dict:
+        satir = {
+            "iz": self.iz.kimlik,
+            "aralik": self.kimlik,
+            "ust": self.ust,
+            "ad": self.ad,
+            "baslangic": round(self.baslangic, 6),
+            "sure_ms": round(self.sure_sn * 1000, 3),
+            "is_parcacigi": self.is_parcacigi,
+        }
+        if self.hata is not None:
+            satir["hata"] = self.hata
+        satir["ozellik"] = self.ozellikler
+        return satir
+
+
+class Iz:
+    """Bir kök aralık ve altındaki tüm aralıklar (bitiş sırasıyla)"""
+
+    def __init__(self):
+        self.kimlik = uuid.uuid4().hex
+        self.kok: Optional[Aralik] = None
+        self.araliklar: List[Aralik] = []
+        self._kilit = threading.Lock()
+
+    def _ekle(self, aralik: Aralik) -> None:
+        with self._kilit:
+            self.araliklar.append(aralik)
+
+    def tablo(self) -> pd.DataFrame:
+        """Arayüz paneli için: ağaç sırasıyla, girintili aşama adları"""
+        with self._kilit:
+            araliklar = list(self.araliklar)
+        if not araliklar:
+            return pd.DataFrame(columns=["Aşama", "Başlangıç (ms)", "Süre (ms)", "Pay %", "Bilgi"])
+
+        cocuklar: Dict[Optional[str], List[Aralik]] = {}
+        for a in araliklar:
+            cocuklar.setdefault(a.ust, []).append(a)
+        kok = self.kok if self.kok in araliklar else min(araliklar, key=lambda a: a.baslangic)
+        toplam = kok.sure_sn or 1e-9
+
+        satirlar = []
+        yigin = [(kok, 0)]
+        while yigin:
+            a, derinlik = yigin.pop()
+            bilgi = ", ".join(f"{k}={v}" for k, v in a.ozellikler.items())
+            if a.hata:
+                bilgi = f"HATA: {a.hata}" + (f" | {bilgi}" if bilgi else "")
+            satirlar.append({
+                "Aşama": "　" * derinlik + a.ad,
+                "Başlangıç (ms)": round((a.baslangic - kok.baslangic) * 1000, 1),
+                "Süre (ms)": round(a.sure_sn * 1000, 1),
+                "Pay %": round(a.sure_sn / toplam * 100, 1),
+                "Bilgi": bilgi,
+            })
+            alt = sorted(cocuklar.get(a.kimlik, []), key=lambda c: c.baslangic, reverse=True)
+            yigin.extend((c, derinlik + 1) for c in alt)
+        return pd.DataFrame(satirlar)
+
+
+_gecerli: contextvars.ContextVar[Optional[Aralik]] = contextvars.ContextVar("sanal_planner_aralik", default=None)
+_dosya_kilit = threading.Lock()
+_GECERLI = object()  # aralik(ust=...) verilmedi: geçerli aralığın altına aç
+
+
+@contextmanager
+def aralik(ad: str, /, *, ust=_GECERLI, **ozellikler) -> Iterator[Optional[Aralik]]:
+    """Süre aralığı aç - açık aralık yoksa yeni bir izin kökü olur
+
+    İzleme kapalıysa None verir; çağıran taraf 'if a:' ile ekleme yapar.
+
+    ust: Verilirse aralık o aralığın altına (None ise yeni kök olarak) açılır
+    ve geçerli aralık yapılmaz. Üreteçlerde yield'ler arasında açık kalan
+    aralıklar içindir - geçerli aralık tüketiciye sızmaz. Altındaki aşamalar
+    altinda(a) bloğunda çalıştırılır.
+    """
+    if not IZLEME_AYARLARI["acik"]:
+        yield None
+        return
+
+    gecerli_yap = ust is _GECERLI
+    if gecerli_yap:
+        ust = _gecerli.get()
+    iz = ust.iz if ust is not None else Iz()
+    a = Aralik(
+        ad=ad, iz=iz, kimlik=uuid.uuid4().hex[:16], ust=ust.kimlik if ust is not None else None,
+        baslangic=time.time(), is_parcacigi=threading.current_thread().name,
+        ozellikler=dict(ozellikler),
+    )
+    if ust is None:
+        iz.kok = a
+    jeton = _gecerli.set(a) if gecerli_yap else None
+    baslangic = time.perf_counter()
+    try:
+        yield a
+    except BaseException as e:
+        a.hata = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        a.sure_sn = time.perf_counter() - baslangic
+        if jeton is not None:
+            _gecerli.reset(jeton)
+        iz._ekle(a)
+        if ust is None:
+            iz_yaz(iz)
+
+
+@contextmanager
+def altinda(a: Optional[Aralik]) -> Iterator[None]:
+    """Blok boyunca a geçerli aralık olsun - ust= ile açılan aralığın aşamaları için
+
+    Blok içinde yield olmamalı (bağlam yine tüketiciye sızar).
+    """
+    if a is None:
+        yield
+        return
+    jeton = _gecerli.set(a)
+    try:
+        yield
+    finally:
+        _gecerli.reset(jeton)
+
+
+def gecerli_aralik() -> Optional[Aralik]:
+    return _gecerli.get()
+
+
+def baglamda(fonksiyon: Callable) -> Callable:
+    """İş parçacığı havuzuna verilecek fonksiyonu çağıranın izleme bağlamına bağla
+
+    Her çağrı bağlamın ayrı bir kopyasında çalışır (aynı bağlam iki iş
+    parçacığında birden açılamaz).
+    """
+    baglam = contextvars.copy_context()
+
+    def calistir(*args, **kwargs):
+        return baglam.copy().run(fonksiyon, *args, **kwargs)
+    return calistir
+
+# =============================================================================
+# DOSYA
+# =============================================================================
+
+def iz_yaz(iz: Iz, dosya: Optional[str] = None) -> None:
+    """İzin aralıklarını JSON satırları olarak ekle - yazılamazsa sessizce geç"""
+    dosya = IZLEME_AYARLARI["dosya"] if dosya is None else dosya
+    if not dosya:
+        return
+    satirlar = "".join(json.dumps(a.kayit(), ensure_ascii=False, default=str) + "\n" for a in iz.araliklar)
+    try:
+        with _dosya_kilit:
+            os.makedirs(os.path.dirname(os.path.abspath(dosya)), exist_ok=True)
+            limit = IZLEME_AYARLARI["dosya_limit_mb"] * 1024 * 1024
+            if limit > 0 and os.path.exists(dosya) and os.path.getsize(dosya) > limit:
+                os.replace(dosya, dosya + ".1")
+            with open(dosya, "a", encoding="utf-8") as f:
+                f.write(satirlar)
+    except OSError:
+        pass  # İzleme asıl işi bozmasın
+
+
+def izleri_oku(dosya: Optional[str] = None) -> pd.DataFrame:
+    """İzleme dosyasını tabloya çevir (bir satır = bir aralık)"""
+    dosya = dosya or IZLEME_AYARLARI["dosya"]
+    if not dosya:
+        raise ValueError("İzleme dosyası yok - SANAL_PLANNER_IZ_DOSYASI ile açılır")
+    return pd.read_json(dosya, lines=True)
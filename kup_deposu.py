@@ -0,0 +1,183 @@
+"""
+SANAL PLANNER - Küp Deposu
+Oturumlar arası paylaşılan, içerik adresli KupVeri kaydı
+
+Aynı haftalık dosyaları yükleyen oturumlar tek bir küpü paylaşır; anahtar
+iki dosyanın içerik özetidir, dosya adı değil. Oturumlar sadece hafif bir
+referans tutar. Referansı kalmayan küpler bellek limiti aşılınca en uzun
+süredir kullanılmayandan başlayarak silinir (LRU).
+"""
+
+import os
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from onbellek import Kaynak, kaynak_ozeti
+from agent_tools import KupVeri
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+DEPO_AYARLARI = {
+    # Referanssız küpler bu limitin üstünde tutulmaz (kullanımdakiler sayılır ama silinmez)
+    "bellek_limiti_mb": float(os.environ.get("SANAL_PLANNER_KUP_BELLEK_MB", 2048)),
+}
+
+# =============================================================================
+# DEPO
+# =============================================================================
+
+@dataclass
+class _Kayit:
+    kup: KupVeri
+    bayt: int
+    referans: int = 0
+
+
+class KupReferansi:
+    """Oturumun depodaki küpe tuttuğu referans
+
+    birak() ile veya nesne çöpe gidince (oturum kapanınca) referans bir kez
+    düşülür.
+    """
+
+    def __init__(self, depo: "KupDeposu", anahtar: str, kup: KupVeri):
+        self.anahtar = anahtar
+        self.kup = kup
+        self._depo = depo
+        # Çöp toplayıcı herhangi bir anda (kilit tutulurken bile) çağırabilir,
+        # bu yüzden burada sadece kuyruğa eklenir
+        self._birakici = weakref.finalize(self, depo._birakildi, anahtar)
+
+    @property
+    def aktif(self) -> bool:
+        return self._birakici.alive
+
+    def birak(self) -> None:
+        self._birakici()
+        self._depo.bekleyenleri_isle()
+
+
+class KupDeposu:
+    """Süreç geneli küp kaydı - referans sayımlı, bellek limitli LRU"""
+
+    def __init__(self, bellek_limiti_mb: float):
+        self.limit_bayt = int(bellek_limiti_mb * 1024 * 1024)
+        self.isabet = 0
+        self.iska = 0
+        self._kayitlar: "OrderedDict[str, _Kayit]" = OrderedDict()
+        self._kuruluyor: Dict[str, Future] = {}
+        self._birakilan: deque = deque()
+        self._kilit = threading.Lock()
+
+    @staticmethod
+    def anahtar(trading: Kaynak, urun: Kaynak, akis: bool = False, kompakt: bool = True) -> str:
+        """İki dosyanın içerik özeti + okuma seçenekleri"""
+        ozet = hashlib.sha256()
+        ozet.update(kaynak_ozeti(trading).encode())
+        ozet.update(kaynak_ozeti(urun).encode())
+        ozet.update(f"akis={akis},kompakt={kompakt}".encode())
+        return ozet.hexdigest()
+
+    def al(self, trading: Kaynak, urun: Kaynak, akis: bool = False,
+           kompakt: bool = True, anahtar: Optional[str] = None) -> KupReferansi:
+        """Dosyaların küpüne referans al - yoksa kur
+
+        Aynı dosyalar için eşzamanlı gelen istekler tek bir kurulumu bekler.
+        """
+        anahtar = anahtar or self.anahtar(trading, urun, akis, kompakt)
+
+        while True:
+            with self._kilit:
+                self._birakilanlari_dus()
+                kayit = self._kayitlar.get(anahtar)
+                if kayit is not None:
+                    kayit.referans += 1
+                    self._kayitlar.move_to_end(anahtar)
+                    self.isabet += 1
+                    return KupReferansi(self, anahtar, kayit.kup)
+
+                gelecek = self._kuruluyor.get(anahtar)
+                kuran = gelecek is None
+                if kuran:
+                    gelecek = Future()
+                    self._kuruluyor[anahtar] = gelecek
+
+            if not kuran:
+                # Başka oturum kuruyor - bitince kayıttan al
+                gelecek.result()
+                continue
+
+            try:
+                kup = KupVeri(trading, urun, akis=akis, kompakt=kompakt)
+                bayt = kup.bellek_kullanimi()
+            except BaseException as e:
+                with self._kilit:
+                    del self._kuruluyor[anahtar]
+                gelecek.set_exception(e)
+                raise
+
+            with self._kilit:
+                self._kayitlar[anahtar] = _Kayit(kup=kup, bayt=bayt, referans=1)
+                del self._kuruluyor[anahtar]
+                self.iska += 1
+                self._temizle()
+            gelecek.set_result(None)
+            return KupReferansi(self, anahtar, kup)
+
+    def _birakildi(self, anahtar: str) -> None:
+        """Referans bırakıldı - kilitsiz, sadece kuyruğa ekle"""
+        self._birakilan.append(anahtar)
+
+    def bekleyenleri_isle(self) -> None:
+        """Bırakılan referansları düş; limit aşılıyorsa referanssız küpleri sil"""
+        with self._kilit:
+            self._birakilanlari_dus()
+            self._temizle()
+
+    def _birakilanlari_dus(self) -> None:
+        while self._birakilan:
+            kayit = self._kayitlar.get(self._birakilan.popleft())
+            if kayit is not None and kayit.referans > 0:
+                kayit.referans -= 1
+
+    def _temizle(self) -> None:
+        """Kilit altında çağrılır - en eski referanssız küplerden başlayarak sil"""
+        toplam = sum(k.bayt for k in self._kayitlar.values())
+        for anahtar in list(self._kayitlar):
+            if toplam <= self.limit_bayt:
+                break
+            kayit = self._kayitlar[anahtar]
+            if kayit.referans == 0:
+                del self._kayitlar[anahtar]
+                toplam -= kayit.bayt
+
+    def istatistik(self) -> dict:
+        with self._kilit:
+            self._birakilanlari_dus()
+            return {
+                "kup": len(self._kayitlar),
+                "referans": sum(k.referans for k in self._kayitlar.values()),
+                "bellek_mb": sum(k.bayt for k in self._kayitlar.values()) / 1024 ** 2,
+                "isabet": self.isabet,
+                "iska": self.iska,
+            }
+
+
+_varsayilan: Optional[KupDeposu] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_depo() -> KupDeposu:
+    """DEPO_AYARLARI ile kurulan süreç geneli depo (tüm oturumlar aynı depoyu görür)"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = KupDeposu(DEPO_AYARLARI["bellek_limiti_mb"])
+    return _varsayilan
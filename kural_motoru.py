@@ -0,0 +1,528 @@
+"""
+SANAL PLANNER - Kural Motoru
+Planner ve agent araçlarının ortak, bildirimsel kural seti
+
+Tüm eşikler ve SKU kuralları tek yerde (KURAL_TANIMLARI) tanımlanır. Kurallar
+bir kez derlenir: her koşul kolon dizileri üzerinde tek NumPy karşılaştırması,
+her kural koşulların VE'si olur. Toplu planner (planner_agent) ve agent
+araçları (agent_tools) aynı kural setini değerlendirir.
+
+SANAL_PLANNER_KURAL_DOSYASI bir JSON dosyası gösterirse o dosya varsayılanların
+üzerine yazılır ve değiştiğinde (mtime) kurallar yeniden derlenir - süreç
+yeniden başlatılmadan. Her kuralın çağrı, eşleşme ve süre istatistiği tutulur.
+"""
+
+import os
+import json
+import hashlib
+import math
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# =============================================================================
+# KURAL TANIMLARI (Hibrit Sistem - Temel Kurallar)
+# =============================================================================
+
+# Koşul: [kolon, işleç, sağ taraf] veya [kolon, işleç, sağ taraf, çarpan]
+#   sağ taraf: sayı, eşik adı ya da '@kolon' (başka bir kolon)
+#   çarpan: sayı veya eşik adı - sağ taraf bununla çarpılır
+# Grup: ilk_eslesen=True ise kurallar sırayla denenir, ilk eşleşen kazanır
+# (aksiyon + öncelik); değilse her kural bağımsız bir maske üretir.
+KURAL_TANIMLARI = {
+    "esikler": {
+        # Kural 1: Bütçe sapması
+        "butce_sapma_kritik": 0.30,  # %30 ve üzeri sapma kritik
+        "butce_sapma_uyari": 0.15,   # Genel özette bunun altı hedef dahilinde
+        "lfl_degisim_esik": 0.10,    # %10'dan fazla küçülme sorun, büyüme bütçe fırsatı
+
+        # Kural 2: Cover hedefleri
+        "cover_depo_hedef": 12,      # Depo dahil 12 hafta
+        "cover_magaza_min": 8,       # Mağaza min 8 hafta
+        "cover_magaza_max": 12,      # Mağaza max 12 hafta
+        "umg_cover_kritik": 15,      # Alt kategori (ÜMG) cover'ı bunun üstündeyse kırmızı
+
+        # Kural 3: İndirim başarı kriteri (elastikiyete göre dinamik)
+        "indirim_basari_orani": 0.5, # Beklentinin en az %50'si
+
+        # Kural 4: Stok devir
+        "stok_devir_hedef_hafta": 12,
+
+        # Kural 5: Yok satış
+        "top_sku_sayisi": 100,       # Top 100 SKU'da tolerans yok
+        "yok_satis_kritik_oran": 0.30,  # Diğerlerinde %30 üzeri kritik
+
+        # Kural 6: SKU aksiyon tetikleyicileri
+        "sevk_tetik_cover": 4,       # Mağaza cover bunun altındaysa sevk
+        "indirim_tetik_cover": 20,   # Cover bunun üstündeyse indirim
+        "sevk_depo_min": 100,        # Sevk için depoda en az bu kadar stok
+        "sevk_satis_min": 20,        # Sevk için haftalık satış bunun üstünde
+        "sevk_orta_depo_min": 500,   # Orta öncelikli sevk: depoda fazla stok
+        "sevk_orta_satis_min": 10,
+        "sevk_oneri_satis_kat": 2,   # Mağaza stok < haftalık satış x 2 ise mağazada az
+        "sevk_aday_satis_kat": 3,    # Kategori analizinde daha geniş sevk adayı listesi
+        "sorun_sevk_depo_min": 200,  # Sorun taramasında sevk için depo alt sınırı
+        "indirim_satis_max": 30,     # İndirim: satış bunun altında
+        "indirim_genel_satis_max": 50,
+        "dusuk_satis_stok_min": 500, # Düşük satış: stok bunun üstünde...
+        "dusuk_satis_satis_max": 5,  # ...haftalık satış bunun altında
+    },
+    "gruplar": {
+        # Toplu planner: SKU başına tek aksiyon
+        "sku_siniflandirma": {
+            "ilk_eslesen": True,
+            "varsayilan": "OK",
+            "varsayilan_oncelik": 3,
+            "kurallar": [
+                # SEVK gerekli: Depoda var, mağaza cover 4 haftanın altında, satış var
+                {"ad": "sevk", "aksiyon": "SEVK", "oncelik": 2,
+                 "kosullar": [["depo_stok", ">", "sevk_depo_min"],
+                              ["magaza_cover", "<", "sevk_tetik_cover"],
+                              ["haftalik_satis", ">", "sevk_satis_min"]],
+                 "yukselt": {"oncelik": 1, "kosullar": [["satis_sirasi", "<", "top_sku_sayisi"]]}},
+                # SEVK - Orta öncelik: Depoda fazla stok var, mağazada makul
+                {"ad": "sevk_orta", "aksiyon": "SEVK", "oncelik": 2,
+                 "kosullar": [["depo_stok", ">", "sevk_orta_depo_min"],
+                              ["magaza_cover", "<", "cover_magaza_min"],
+                              ["haftalik_satis", ">", "sevk_orta_satis_min"]]},
+                # İNDİRİM gerekli: Cover çok yüksek (>20 hafta), satış düşük
+                {"ad": "indirim", "aksiyon": "INDIRIM", "oncelik": 2,
+                 "kosullar": [["cover_hafta", ">", "indirim_tetik_cover"],
+                              ["haftalik_satis", "<", "indirim_satis_max"]]},
+                # İNDİRİM - Yüksek cover genel
+                {"ad": "indirim_genel", "aksiyon": "INDIRIM", "oncelik": 3,
+                 "kosullar": [["cover_hafta", ">", "cover_depo_hedef", 2],
+                              ["haftalik_satis", "<", "indirim_genel_satis_max"]]},
+                # İZLE: Potansiyel sorun var
+                {"ad": "izle", "aksiyon": "IZLE", "oncelik": 3,
+                 "kosullar": [["cover_hafta", ">", "cover_magaza_max"]]},
+            ],
+        },
+        # Agent sku_detay / sku_toplu_detay önerisi
+        "sku_oneri": {
+            "ilk_eslesen": True,
+            "varsayilan": "OK",
+            "varsayilan_oncelik": 3,
+            "kurallar": [
+                {"ad": "indirim", "aksiyon": "INDIRIM", "oncelik": 2,
+                 "kosullar": [["cover_hafta", ">", "indirim_tetik_cover"]]},
+                {"ad": "sevk", "aksiyon": "SEVK", "oncelik": 2,
+                 "kosullar": [["depo_stok", ">", "sevk_depo_min"],
+                              ["magaza_stok", "<", "@haftalik_satis", "sevk_oneri_satis_kat"]]},
+            ],
+        },
+        # Agent kategori_analiz listeleri
+        "kategori_listeleri": {
+            "ilk_eslesen": False,
+            "kurallar": [
+                {"ad": "yuksek_cover", "aksiyon": "INDIRIM",
+                 "kosullar": [["cover_hafta", ">", "indirim_tetik_cover"]]},
+                {"ad": "sevk_aday", "aksiyon": "SEVK",
+                 "kosullar": [["depo_stok", ">", "sevk_depo_min"],
+                              ["magaza_stok", "<", "@haftalik_satis", "sevk_aday_satis_kat"]]},
+            ],
+        },
+        # Agent sorunlu_bul taraması
+        "sorun_tarama": {
+            "ilk_eslesen": False,
+            "kurallar": [
+                {"ad": "yuksek_cover", "aksiyon": "INDIRIM",
+                 "kosullar": [["cover_hafta", ">", "indirim_tetik_cover"]]},
+                {"ad": "sevk_gerekli", "aksiyon": "SEVK",
+                 "kosullar": [["depo_stok", ">", "sorun_sevk_depo_min"],
+                              ["magaza_stok", "<", "@haftalik_satis", "sevk_oneri_satis_kat"],
+                              ["haftalik_satis", ">", "sevk_satis_min"]]},
+                {"ad": "dusuk_satis", "aksiyon": "IZLE",
+                 "kosullar": [["toplam_stok", ">", "dusuk_satis_stok_min"],
+                              ["haftalik_satis", "<", "dusuk_satis_satis_max"]]},
+            ],
+        },
+    },
+}
+
+# Kuralların başvurabileceği kolonlar (KuralVerisi bu adlarla doldurulur)
+KURAL_KOLONLARI = {
+    "depo_stok": "Anlık depo stok adedi",
+    "magaza_stok": "Anlık mağaza stok adedi",
+    "toplam_stok": "Depo + mağaza stok",
+    "haftalik_satis": "Son iki haftanın ortalama satışı",
+    "cover_hafta": "Toplam stok / haftalık satış (satış yoksa 999)",
+    "magaza_cover": "Mağaza stok / haftalık satış (satış yoksa 999)",
+    "satis_sirasi": "Toplam satışa göre sıra (0 = en çok satan)",
+}
+
+ISLECLER = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# =============================================================================
+# DEĞERLENDİRME VERİSİ
+# =============================================================================
+
+class KuralVerisi:
+    """Kuralların değerlendirildiği kolonlar + eşik değerine göre maske önbelleği
+
+    Kolon değeri dizi ya da diziyi üreten fonksiyon olabilir (ilk kullanımda
+    hesaplanır). Aynı koşul aynı eşikle tekrar sorulursa maske yeniden
+    hesaplanmaz; farklı kurallardaki ortak koşullar da tek maskeyi paylaşır.
+    En son kullanılan MASKE_KAPASITESI maske tutulur (LRU): veri oturumda
+    saklanırken her yeni eşik değeri tam boy bir maske ekler.
+    """
+
+    MASKE_KAPASITESI = 24  # Tüm gruplar bir eşik takımında 11 maske: iki takım sığar
+
+    def __init__(self, kolonlar: Dict[str, Union[np.ndarray, Callable[[], np.ndarray]]]):
+        self._kolonlar = dict(kolonlar)
+        self._maskeler: OrderedDict = OrderedDict()
+        self._maske_kilit = threading.Lock()
+
+    def __len__(self) -> int:
+        for deger in self._kolonlar.values():
+            if not callable(deger):
+                return len(deger)
+        return len(self.kolon(next(iter(self._kolonlar))))
+
+    def kolon(self, ad: str) -> np.ndarray:
+        deger = self._kolonlar.get(ad)
+        if deger is None:
+            raise KeyError(f"Kural kolonu bu veride yok: {ad}")
+        if callable(deger):
+            deger = np.asarray(deger())
+            self._kolonlar[ad] = deger
+        return deger
+
+    def maske(self, anahtar: tuple, hesapla: Callable[[], np.ndarray]) -> Tuple[np.ndarray, int, bool]:
+        """(maske, eşleşen satır, yeni hesaplandı mı)"""
+        with self._maske_kilit:
+            kayit = self._maskeler.get(anahtar)
+            if kayit is not None:
+                self._maskeler.move_to_end(anahtar)
+                return kayit[0], kayit[1], False
+        maske = hesapla()
+        kayit = (maske, int(np.count_nonzero(maske)))
+        with self._maske_kilit:
+            self._maskeler[anahtar] = kayit
+            while len(self._maskeler) > self.MASKE_KAPASITESI:
+                self._maskeler.popitem(last=False)
+        return kayit[0], kayit[1], True
+
+# =============================================================================
+# DERLEME
+# =============================================================================
+
+Deger = Union[int, float, str]
+
+
+def _coz(deger: Deger, esikler: Dict[str, float]) -> float:
+    """Sayıysa kendisi, eşik adıysa eşiğin değeri"""
+    return esikler[deger] if isinstance(deger, str) else deger
+
+
+@dataclass(frozen=True)
+class Kosul:
+    kolon: str
+    islec: str
+    sag: Deger           # sayı, eşik adı veya '@kolon'
+    carpan: Deger = 1
+
+    def anahtar(self, esikler: Dict[str, float]) -> tuple:
+        sag = self.sag if isinstance(self.sag, str) and self.sag.startswith("@") else _coz(self.sag, esikler)
+        return (self.kolon, self.islec, sag, _coz(self.carpan, esikler))
+
+    def hesapla(self, veri: KuralVerisi, esikler: Dict[str, float]) -> np.ndarray:
+        if isinstance(self.sag, str) and self.sag.startswith("@"):
+            sag = veri.kolon(self.sag[1:])
+        else:
+            sag = _coz(self.sag, esikler)
+        carpan = _coz(self.carpan, esikler)
+        if carpan != 1:
+            sag = sag * carpan
+        return ISLECLER[self.islec](veri.kolon(self.kolon), sag)
+
+
+@dataclass(frozen=True)
+class Kural:
+    grup: str
+    ad: str
+    aksiyon: str
+    oncelik: int
+    kosullar: Tuple[Kosul, ...]
+    yukselt: Optional[Tuple[int, Tuple[Kosul, ...]]] = None  # (öncelik, koşullar)
+
+    def anahtar(self, esikler: Dict[str, float]) -> tuple:
+        return tuple(k.anahtar(esikler) for k in self.kosullar)
+
+
+@dataclass(frozen=True)
+class KuralGrubu:
+    ad: str
+    ilk_eslesen: bool
+    kurallar: Tuple[Kural, ...]
+    varsayilan: str = "OK"
+    varsayilan_oncelik: int = 3
+
+
+@dataclass(frozen=True)
+class KuralSeti:
+    """Derlenmiş kural seti - değişmez; yeniden yükleme yeni nesne üretir"""
+    esikler: Dict[str, float]
+    gruplar: Dict[str, KuralGrubu]
+    surum: str
+
+
+def _kosul_derle(tanim: list, esikler: Dict[str, float], yer: str) -> Kosul:
+    if not isinstance(tanim, (list, tuple)) or len(tanim) not in (3, 4):
+        raise ValueError(f"{yer}: koşul [kolon, işleç, değer(, çarpan)] olmalı: {tanim!r}")
+    kolon, islec, sag = tanim[0], tanim[1], tanim[2]
+    carpan = tanim[3] if len(tanim) == 4 else 1
+    if kolon not in KURAL_KOLONLARI:
+        raise ValueError(f"{yer}: bilinmeyen kolon '{kolon}'")
+    if islec not in ISLECLER:
+        raise ValueError(f"{yer}: bilinmeyen işleç '{islec}'")
+    if isinstance(sag, str) and sag.startswith("@"):
+        if sag[1:] not in KURAL_KOLONLARI:
+            raise ValueError(f"{yer}: bilinmeyen kolon '{sag[1:]}'")
+    for deger in (sag, carpan):
+        if isinstance(deger, str) and not deger.startswith("@") and deger not in esikler:
+            raise ValueError(f"{yer}: tanımsız eşik '{deger}'")
+        if not isinstance(deger, (str, int, float)) or isinstance(deger, bool):
+            raise ValueError(f"{yer}: geçersiz değer {deger!r}")
+    return Kosul(kolon, islec, sag, carpan)
+
+
+def derle(tanim: dict) -> KuralSeti:
+    """Bildirimsel tanımı doğrula ve kural setine çevir (hatada ValueError)"""
+    esikler = dict(tanim.get("esikler", {}))
+    for ad, deger in esikler.items():
+        # Sayı olmayan eşik derlenir ama her karşılaştırmada patlar - burada reddet
+        if not isinstance(deger, (int, float)) or isinstance(deger, bool) or not math.isfinite(deger):
+            raise ValueError(f"esikler.{ad}: sayı olmalı, {deger!r} verildi")
+    gruplar = {}
+    for grup_adi, grup in tanim.get("gruplar", {}).items():
+        kurallar = []
+        for sira, kural in enumerate(grup.get("kurallar", [])):
+            yer = f"{grup_adi}.{kural.get('ad', sira)}"
+            if not kural.get("kosullar"):
+                raise ValueError(f"{yer}: en az bir koşul gerekli")
+            yukselt = None
+            if "yukselt" in kural:
+                yukselt = (
+                    int(kural["yukselt"]["oncelik"]),
+                    tuple(_kosul_derle(k, esikler, yer) for k in kural["yukselt"]["kosullar"]),
+                )
+            kurallar.append(Kural(
+                grup=grup_adi,
+                ad=kural.get("ad", str(sira)),
+                aksiyon=kural.get("aksiyon", "IZLE"),
+                oncelik=int(kural.get("oncelik", 3)),
+                kosullar=tuple(_kosul_derle(k, esikler, yer) for k in kural["kosullar"]),
+                yukselt=yukselt,
+            ))
+        gruplar[grup_adi] = KuralGrubu(
+            ad=grup_adi,
+            ilk_eslesen=bool(grup.get("ilk_eslesen", True)),
+            kurallar=tuple(kurallar),
+            varsayilan=grup.get("varsayilan", "OK"),
+            varsayilan_oncelik=int(grup.get("varsayilan_oncelik", 3)),
+        )
+    surum = hashlib.sha256(json.dumps(tanim, sort_keys=True).encode()).hexdigest()[:12]
+    return KuralSeti(esikler=esikler, gruplar=gruplar, surum=surum)
+
+
+def _birlestir(taban: dict, ek: dict) -> dict:
+    """Dosyadaki tanım: eşikler tek tek, gruplar bütün olarak üzerine yazılır"""
+    return {
+        "esikler": {**taban.get("esikler", {}), **ek.get("esikler", {})},
+        "gruplar": {**taban.get("gruplar", {}), **ek.get("gruplar", {})},
+    }
+
+
+def sira_siniri(kural_seti: KuralSeti, esikler: Dict[str, float],
+                grup_adi: str = "sku_siniflandirma") -> Optional[int]:
+    """Satış sırasının kırpılacağı değer
+
+    Sıra sadece sayı eşikleriyle kıyaslanıyorsa en büyük eşiğin üstündeki
+    bütün sıralar her koşulda aynı sonucu verir. Sıra bir kolonla
+    kıyaslanıyorsa kırpılamaz (None).
+    """
+    en_buyuk = -1.0
+    for kural in kural_seti.gruplar[grup_adi].kurallar:
+        kosullar = kural.kosullar + (kural.yukselt[1] if kural.yukselt else ())
+        for kosul in kosullar:
+            kolon, _, sag, carpan = kosul.anahtar(esikler)
+            if sag == "@satis_sirasi" or (kolon == "satis_sirasi" and isinstance(sag, str)):
+                return None
+            if kolon == "satis_sirasi":
+                en_buyuk = max(en_buyuk, float(sag) * float(carpan))
+    return int(np.floor(en_buyuk)) + 1
+
+# =============================================================================
+# MOTOR
+# =============================================================================
+
+@dataclass
+class KuralIstatistigi:
+    cagri: int = 0       # Kuralın değerlendirilmesi istendi
+    hesaplama: int = 0   # Maske önbellekte yoktu, hesaplandı
+    eslesen: int = 0     # Toplam eşleşen satır (ilk_eslesen gruplarda kuralın kazandığı)
+    sure: float = 0.0    # Maske hesaplama süresi (sn)
+
+
+class KuralMotoru:
+    """Kural setini tutar, dosya değişince yeniden derler, istatistik toplar"""
+
+    def __init__(self, tanim: Optional[dict] = None, dosya: Optional[str] = None,
+                 kural_seti: Optional[KuralSeti] = None):
+        """kural_seti: Hazır derlenmiş set (örn. alt süreçlere gönderilen) - tanim yerine"""
+        self.dosya = dosya
+        self.son_hata: Optional[str] = None
+        self._taban = tanim or KURAL_TANIMLARI
+        self._kural_seti = kural_seti or derle(self._taban)
+        self._dosya_zamani: Optional[int] = None
+        self._istatistik: Dict[Tuple[str, str], KuralIstatistigi] = {}
+        self._kilit = threading.Lock()
+
+    def guncel(self) -> KuralSeti:
+        """Güncel kural seti - dosya değiştiyse önce yeniden derlenir
+
+        Hatalı dosyada önceki kural seti korunur, hata son_hata'da durur.
+        """
+        if self.dosya is None:
+            return self._kural_seti
+        try:
+            zaman = os.stat(self.dosya).st_mtime_ns
+        except OSError:
+            zaman = None
+        if zaman != self._dosya_zamani:
+            with self._kilit:
+                if zaman != self._dosya_zamani:
+                    self._yukle(zaman)
+        return self._kural_seti
+
+    def _yukle(self, zaman: Optional[int]) -> None:
+        self._dosya_zamani = zaman
+        if zaman is None:
+            # Dosya kaldırıldı - varsayılan kurallara dön
+            self._kural_seti = derle(self._taban)
+            self.son_hata = None
+            return
+        try:
+            with open(self.dosya, encoding="utf-8") as f:
+                ek = json.load(f)
+            self._kural_seti = derle(_birlestir(self._taban, ek))
+            self.son_hata = None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.son_hata = f"{self.dosya}: {e}"
+
+    @property
+    def esikler(self) -> Dict[str, float]:
+        return self.guncel().esikler
+
+    def _esikler(self, kural_seti: KuralSeti, esikler: Optional[Dict]) -> Dict[str, float]:
+        """Çağıranın verdiği eşikler (örn. arayüz ayarları) kural setinin üstüne"""
+        return {**kural_seti.esikler, **esikler} if esikler else kural_seti.esikler
+
+    def _maske(self, kural: Kural, veri: KuralVerisi, esikler: Dict[str, float]) -> Tuple[np.ndarray, int]:
+        baslangic = time.perf_counter()
+        maske, eslesen, hesaplandi = veri.maske(
+            kural.anahtar(esikler),
+            lambda: np.logical_and.reduce([k.hesapla(veri, esikler) for k in kural.kosullar]),
+        )
+        with self._kilit:
+            ist = self._istatistik.setdefault((kural.grup, kural.ad), KuralIstatistigi())
+            ist.cagri += 1
+            if hesaplandi:
+                ist.hesaplama += 1
+                ist.sure += time.perf_counter() - baslangic
+        return maske, eslesen
+
+    def maskeler(self, grup_adi: str, veri: KuralVerisi,
+                 esikler: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """Bağımsız gruptaki her kuralın maskesi (kural adı -> bool dizi)"""
+        kural_seti = self.guncel()
+        esikler = self._esikler(kural_seti, esikler)
+        sonuc = {}
+        for kural in kural_seti.gruplar[grup_adi].kurallar:
+            sonuc[kural.ad], eslesen = self._maske(kural, veri, esikler)
+            with self._kilit:
+                self._istatistik[(kural.grup, kural.ad)].eslesen += eslesen
+        return sonuc
+
+    def siniflandir(self, grup_adi: str, veri: KuralVerisi, esikler: Optional[Dict] = None,
+                    pozisyonlar: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """İlk eşleşen kurala göre (aksiyon, öncelik) dizileri
+
+        pozisyonlar verilirse sadece o satırlar için döner; maskeler yine tüm
+        veri için hesaplanıp saklanır, sonraki sorgular hazır maskeyi kullanır.
+        """
+        kural_seti = self.guncel()
+        esikler = self._esikler(kural_seti, esikler)
+        grup = kural_seti.gruplar[grup_adi]
+
+        secici = slice(None) if pozisyonlar is None else pozisyonlar
+        kosullar = [self._maske(k, veri, esikler)[0][secici] for k in grup.kurallar]
+        # Kazanan kuralın sırası; -1 = hiçbiri (tablonun son elemanı varsayılan)
+        secim = np.select(kosullar, np.arange(len(kosullar)), default=-1)
+
+        aksiyon = np.array([k.aksiyon for k in grup.kurallar] + [grup.varsayilan])[secim]
+        oncelik = np.array([k.oncelik for k in grup.kurallar] + [grup.varsayilan_oncelik])[secim]
+        for sira, kural in enumerate(grup.kurallar):
+            if kural.yukselt is None:
+                continue
+            yeni_oncelik, yukselt_kosullari = kural.yukselt
+            yukselt = veri.maske(
+                tuple(k.anahtar(esikler) for k in yukselt_kosullari),
+                lambda: np.logical_and.reduce([k.hesapla(veri, esikler) for k in yukselt_kosullari]),
+            )[0][secici]
+            oncelik[(secim == sira) & yukselt] = yeni_oncelik
+
+        kazanan = np.bincount(secim + 1, minlength=len(kosullar) + 1)
+        with self._kilit:
+            for sira, kural in enumerate(grup.kurallar):
+                self._istatistik[(kural.grup, kural.ad)].eslesen += int(kazanan[sira + 1])
+        return aksiyon, oncelik
+
+    def istatistik(self) -> pd.DataFrame:
+        """Kural başına çağrı, hesaplama, eşleşme ve süre"""
+        kural_seti = self.guncel()
+        satirlar = []
+        with self._kilit:
+            for grup in kural_seti.gruplar.values():
+                for kural in grup.kurallar:
+                    ist = self._istatistik.get((grup.ad, kural.ad), KuralIstatistigi())
+                    satirlar.append({
+                        "grup": grup.ad,
+                        "kural": kural.ad,
+                        "aksiyon": kural.aksiyon,
+                        "cagri": ist.cagri,
+                        "hesaplama": ist.hesaplama,
+                        "eslesen": ist.eslesen,
+                        "sure_ms": ist.sure * 1000,
+                    })
+        return pd.DataFrame(satirlar)
+
+    def istatistik_sifirla(self) -> None:
+        with self._kilit:
+            self._istatistik.clear()
+
+
+_varsayilan: Optional[KuralMotoru] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_motor() -> KuralMotoru:
+    """KURAL_TANIMLARI (+ SANAL_PLANNER_KURAL_DOSYASI) ile kurulan süreç geneli motor"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = KuralMotoru(dosya=os.environ.get("SANAL_PLANNER_KURAL_DOSYASI"))
+    return _varsayilan
@@ -0,0 +1,208 @@
+"""
+SANAL PLANNER - Excel Önbelleği
+Aynı haftalık dosyaların tekrar tekrar parse edilmesini önleyen disk önbelleği
+
+Anahtar dosya içeriğinin özetidir (SHA-256), dosya adı veya yolu değil.
+Parse edilen tablolar Parquet olarak saklanır; boyut limiti aşılınca en
+uzun süredir kullanılmayan kayıtlar silinir (LRU).
+
+Kaynak bir dosya yolu veya doğrudan dosya içeriği (bytes) olabilir;
+Streamlit yüklemeleri geçici dosyaya yazılmadan bellekten okunur.
+"""
+
+import io
+import os
+import hashlib
+import tempfile
+import threading
+import pandas as pd
+from typing import BinaryIO, Callable, Optional, Union
+
+from izleme import aralik
+
+try:
+    import pyarrow  # noqa: F401  (Parquet motoru)
+    PARQUET_VAR = True
+except ImportError:
+    PARQUET_VAR = False
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+ONBELLEK_AYARLARI = {
+    "dizin": os.environ.get(
+        "SANAL_PLANNER_ONBELLEK_DIZIN",
+        os.path.join(os.path.expanduser("~"), ".cache", "sanal_planner")
+    ),
+    "limit_mb": float(os.environ.get("SANAL_PLANNER_ONBELLEK_MB", 2048)),  # 0 = kapalı
+    "surum": 1,  # Hazırlama mantığı değişince artır, eski kayıtlar kullanılmaz
+}
+
+# Dosya yolu veya dosya içeriği
+Kaynak = Union[str, bytes]
+
+# =============================================================================
+# ÖNBELLEK
+# =============================================================================
+
+def dosya_ozeti(path: str) -> str:
+    """Dosya içeriğinin SHA-256 özeti"""
+    ozet = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for parca in iter(lambda: f.read(1 << 20), b''):
+            ozet.update(parca)
+    return ozet.hexdigest()
+
+
+def kaynak_ozeti(kaynak: Kaynak) -> str:
+    """Yol veya bytes için içerik özeti (aynı içerik = aynı özet)"""
+    if isinstance(kaynak, (bytes, bytearray)):
+        return hashlib.sha256(kaynak).hexdigest()
+    return dosya_ozeti(kaynak)
+
+
+def kaynak_ac(kaynak: Kaynak) -> Union[str, BinaryIO]:
+    """Okuyuculara verilecek hali: yol aynen, bytes bellek içi dosya olarak"""
+    if isinstance(kaynak, (bytes, bytearray)):
+        return io.BytesIO(kaynak)
+    return kaynak
+
+
+class ExcelOnbellek:
+    """İçerik adresli, boyut limitli Parquet önbelleği"""
+
+    def __init__(self, dizin: str, limit_mb: float):
+        self.dizin = dizin
+        self.limit_bayt = int(limit_mb * 1024 * 1024)
+        self.isabet = 0
+        self.iska = 0
+        self._kilit = threading.Lock()
+
+    @property
+    def aktif(self) -> bool:
+        return PARQUET_VAR and self.limit_bayt > 0
+
+    def _kayit_yolu(self, anahtar: str) -> str:
+        return os.path.join(self.dizin, f"{anahtar}.parquet")
+
+    def oku(self, kaynak: Kaynak, sheet_name: Union[str, int] = 0, etiket: str = "ham",
+            donustur: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+            okuyucu: Optional[Callable[[Union[str, BinaryIO]], pd.DataFrame]] = None) -> pd.DataFrame:
+        """Excel'i önbellekten oku, yoksa parse edip kaydet
+
+        kaynak: Dosya yolu veya dosya içeriği (bytes)
+        etiket: Aynı dosyanın farklı hazırlanmış hallerini ayırır
+        donustur: Parse sonrası uygulanan dönüşüm (sonucu önbelleğe girer)
+        okuyucu: pd.read_excel yerine kullanılacak okuma fonksiyonu
+        """
+        with aralik("excel_oku", sayfa=sheet_name, etiket=etiket) as a:
+            df, durum = self._oku(kaynak, sheet_name, etiket, donustur, okuyucu)
+            if a:
+                a.ekle(onbellek=durum, satir=len(df), kolon=len(df.columns))
+            return df
+
+    def _oku(self, kaynak: Kaynak, sheet_name: Union[str, int], etiket: str,
+             donustur: Optional[Callable[[pd.DataFrame], pd.DataFrame]],
+             okuyucu: Optional[Callable[[Union[str, BinaryIO]], pd.DataFrame]]):
+        """(tablo, önbellek durumu: 'kapali' / 'isabet' / 'iska')"""
+        if not self.aktif:
+            return self._parse(kaynak, sheet_name, donustur, okuyucu), "kapali"
+
+        ozet = kaynak_ozeti(kaynak)
+        anahtar = f"{ozet}_{sheet_name}_{etiket}_v{ONBELLEK_AYARLARI['surum']}"
+        kayit = self._kayit_yolu(anahtar)
+
+        if os.path.exists(kayit):
+            try:
+                with aralik("parquet_oku"):
+                    df = pd.read_parquet(kayit)
+                os.utime(kayit)  # LRU için son kullanım zamanı
+                self._say("isabet")
+                return df, "isabet"
+            except Exception:
+                pass  # Bu arada silinmiş veya bozuk kayıt - yeniden parse et
+
+        self._say("iska")
+        df = self._parse(kaynak, sheet_name, donustur, okuyucu)
+        with aralik("parquet_yaz"):
+            self._yaz(kayit, df)
+        return df, "iska"
+
+    def _say(self, sayac: str) -> None:
+        """isabet/iska sayacını artır - iki çalışma kitabı paralel okunur"""
+        with self._kilit:
+            setattr(self, sayac, getattr(self, sayac) + 1)
+
+    @staticmethod
+    def _parse(kaynak: Kaynak, sheet_name: Union[str, int],
+               donustur: Optional[Callable[[pd.DataFrame], pd.DataFrame]],
+               okuyucu: Optional[Callable[[Union[str, BinaryIO]], pd.DataFrame]] = None) -> pd.DataFrame:
+        with aralik("excel_parse"):
+            if okuyucu is not None:
+                df = okuyucu(kaynak_ac(kaynak))
+            else:
+                df = pd.read_excel(kaynak_ac(kaynak), sheet_name=sheet_name)
+        if donustur is None:
+            return df
+        with aralik("donustur"):
+            return donustur(df)
+
+    def _yaz(self, kayit: str, df: pd.DataFrame) -> None:
+        """Atomik yaz (diğer oturumlar yarım dosya görmesin), sonra limiti uygula"""
+        os.makedirs(self.dizin, exist_ok=True)
+        fd, gecici = tempfile.mkstemp(dir=self.dizin, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(gecici, index=True)
+            os.replace(gecici, kayit)
+        except Exception:
+            # Karışık tipli kolonlar vb. Parquet'e yazılamazsa önbelleksiz devam
+            if os.path.exists(gecici):
+                os.remove(gecici)
+            return
+        self._temizle()
+
+    def _temizle(self) -> None:
+        """Toplam boyut limiti aşıyorsa en eski kullanılan kayıtları sil"""
+        with self._kilit:
+            kayitlar = []
+            for ad in os.listdir(self.dizin):
+                if not ad.endswith(".parquet"):
+                    continue
+                try:
+                    bilgi = os.stat(os.path.join(self.dizin, ad))
+                except FileNotFoundError:
+                    continue
+                kayitlar.append((bilgi.st_mtime, bilgi.st_size, ad))
+
+            toplam = sum(boyut for _, boyut, _ in kayitlar)
+            for _, boyut, ad in sorted(kayitlar):
+                if toplam <= self.limit_bayt:
+                    break
+                try:
+                    os.remove(os.path.join(self.dizin, ad))
+                except FileNotFoundError:
+                    pass
+                toplam -= boyut
+
+
+_varsayilan: Optional[ExcelOnbellek] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_onbellek() -> ExcelOnbellek:
+    """ONBELLEK_AYARLARI ile kurulan süreç geneli önbellek"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = ExcelOnbellek(ONBELLEK_AYARLARI["dizin"], ONBELLEK_AYARLARI["limit_mb"])
+    return _varsayilan
+
+
+def excel_oku(kaynak: Kaynak, sheet_name: Union[str, int] = 0, etiket: str = "ham",
+              donustur: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+              okuyucu: Optional[Callable[[Union[str, BinaryIO]], pd.DataFrame]] = None) -> pd.DataFrame:
+    """pd.read_excel yerine kullanılır - tekrar yüklemeler önbellekten gelir"""
+    return varsayilan_onbellek().oku(kaynak, sheet_name=sheet_name, etiket=etiket,
+                                     donustur=donustur, okuyucu=okuyucu)
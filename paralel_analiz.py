@@ -0,0 +1,222 @@
+"""
+SANAL PLANNER - Paralel Analiz
+Ürün tablosunu parçalara bölüp SKU analizini süreç havuzunda çalıştırır
+
+Parçalar kategoriye göre (kategoriler satır sayısına göre işçilere
+dengelenir) ya da ürün kodunun özetine göre ayrılır. Tek küresel girdi olan
+satış sırası ana süreçte bir kez hesaplanır. Kurallar sırayı sadece sayı
+eşikleriyle kıyaslıyorsa her parçaya sadece top-N kodları ve sıraları gider,
+diğer SKU'lar eşiğin üstüne kırpılır (sonuç değişmez). Her parça metrikleri
+hazırlar, kuralları uygular ve bulgularını satır pozisyonlarıyla döner;
+birleştirme seri yolun sırasını (öncelik, satış, satır sırası) birebir korur.
+
+Süreçler 'spawn' ile açılır (arayüzün iş parçacıkları fork ile kopyalanmasın)
+ve çalıştırmalar arasında yeniden kullanılır.
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from izleme import aralik
+from kural_motoru import KuralMotoru, KuralSeti, sira_siniri, varsayilan_motor
+from sevk_dagitimi import sevk_planla
+from planner_agent import (
+    analiz_et, bulgu_tablosu, kategori_analiz, rapor_uret_tablodan, satis_sirasi_hesapla,
+    sku_metrikleri_hazirla, sku_secimi, sonuc_tablolari,
+)
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+PARALEL_AYARLARI = {
+    "isci": int(os.environ.get("SANAL_PLANNER_ISCI", os.cpu_count() or 1)),
+    "yontem": os.environ.get("SANAL_PLANNER_PARCA_YONTEMI", "kategori"),
+    # Bunun altında süreç maliyeti kazancı aşar, seri çalışılır
+    "min_satir": int(os.environ.get("SANAL_PLANNER_PARALEL_MIN_SATIR", 50_000)),
+}
+
+PARCA_YONTEMLERI = ("kategori", "kod")
+
+# Parçaların kullandığı ürün kolonları - süreçlere sadece bunlar gönderilir
+PARCA_KOLONLARI = ['Ürün Kodu', 'Ürün ', 'Kategori ', 'TW Adet', 'LW Adet',
+                   'Anlık Depo Stok Adet', 'Anlık Mğz Stok Adet', 'TW İO']
+
+# =============================================================================
+# PARÇALAMA
+# =============================================================================
+
+def parcala(urun: pd.DataFrame, parca_sayisi: int, yontem: str = "kategori") -> List[np.ndarray]:
+    """Her parçanın satır pozisyonları (artan sırada, boş parça yok)
+
+    kategori: Bir kategorinin tüm satırları aynı parçada; kategoriler büyükten
+    küçüğe en az yüklü parçaya atanır. Kategori sayısı azsa parça da az olur.
+    kod: Ürün kodunun özetine göre - dengeli, kategori sayısından bağımsız.
+    """
+    if yontem == "kategori":
+        kodlar, _ = pd.factorize(urun['Kategori '], use_na_sentinel=False)
+        sayilar = np.bincount(kodlar, minlength=1)
+        yuk = np.zeros(parca_sayisi, dtype=np.int64)
+        atama = np.empty(len(sayilar), dtype=np.int64)
+        for kategori in np.argsort(-sayilar, kind="stable"):
+            atama[kategori] = np.argmin(yuk)
+            yuk[atama[kategori]] += sayilar[kategori]
+        parca_no = atama[kodlar]
+    elif yontem == "kod":
+        ozet = pd.util.hash_pandas_object(urun['Ürün Kodu'], index=False).to_numpy()
+        parca_no = (ozet % np.uint64(parca_sayisi)).astype(np.int64)
+    else:
+        raise ValueError(f"Bilinmeyen parçalama yöntemi: {yontem} ({', '.join(PARCA_YONTEMLERI)})")
+
+    sira = np.argsort(parca_no, kind="stable")
+    sinirlar = np.cumsum(np.bincount(parca_no, minlength=parca_sayisi))[:-1]
+    return [p for p in np.split(sira, sinirlar) if len(p)]
+
+
+@dataclass(frozen=True)
+class UstSira:
+    """Parçalara yayınlanan satış sırası: top-N kodları ve sıraları
+
+    Listede olmayan kodların sırası 'sinir' olur; kurallar sırayı sinir'den
+    küçük eşiklerle kıyasladığı için sonuç gerçek sırayla aynıdır.
+    """
+    kodlar: np.ndarray
+    siralar: np.ndarray
+    sinir: int
+
+    def parca_icin(self, kodlar: np.ndarray) -> np.ndarray:
+        yer = pd.Index(self.kodlar).get_indexer(kodlar)
+        return np.where(yer >= 0, self.siralar[yer], self.sinir)
+
+
+def ust_sira_hazirla(urun: pd.DataFrame, kural_seti: KuralSeti,
+                     esikler: Dict[str, float]) -> Tuple[Optional[UstSira], np.ndarray]:
+    """(yayınlanacak top-N sırası, tüm satırların sırası)
+
+    Kurallar sırayı bir kolonla kıyaslıyorsa kırpılamaz; UstSira None olur ve
+    parçalara kendi satırlarının sırası gider.
+    """
+    sira = satis_sirasi_hesapla(urun)
+    sinir = sira_siniri(kural_seti, esikler)
+    if sinir is None:
+        return None, sira
+    ust = np.flatnonzero(sira < sinir)
+    kodlar = pd.Series(urun['Ürün Kodu'].to_numpy()[ust])
+    tekil = ~kodlar.duplicated().to_numpy()  # Aynı koddaki satırların sırası zaten aynı (en iyisi)
+    return UstSira(kodlar.to_numpy()[tekil], sira[ust][tekil], sinir), sira
+
+# =============================================================================
+# PARÇA İŞLEME (alt süreçte)
+# =============================================================================
+
+def _parca_analiz(parca: pd.DataFrame, ust: Optional[UstSira], sira: Optional[np.ndarray],
+                  kural_seti: KuralSeti, sorunlu_kategoriler: List[str],
+                  kurallar: Optional[Dict]) -> Tuple[pd.DataFrame, np.ndarray, float, int]:
+    """(parçanın bulgu tablosu, tablodaki satırların parça içi pozisyonu, süre, süreç no)"""
+    baslangic = time.perf_counter()
+    if ust is not None:
+        sira = ust.parca_icin(parca['Ürün Kodu'].to_numpy())
+    metrik = sku_metrikleri_hazirla(parca, sira)
+    aksiyon, oncelik = KuralMotoru(kural_seti=kural_seti).siniflandir("sku_siniflandirma", metrik.veri, kurallar)
+    pozisyonlar = sku_secimi(metrik, sorunlu_kategoriler, aksiyon, oncelik)
+    tablo = bulgu_tablosu(metrik, pozisyonlar, aksiyon, oncelik)
+    return tablo, pozisyonlar, time.perf_counter() - baslangic, os.getpid()
+
+
+_havuz: Optional[ProcessPoolExecutor] = None
+_havuz_isci = 0
+_havuz_kilit = threading.Lock()
+
+
+def havuz(isci: int) -> ProcessPoolExecutor:
+    """Süreç geneli havuz - farklı işçi sayısı istenirse yeniden kurulur"""
+    global _havuz, _havuz_isci
+    with _havuz_kilit:
+        if _havuz is None or _havuz_isci != isci:
+            if _havuz is not None:
+                _havuz.shutdown(wait=False, cancel_futures=True)
+            _havuz = ProcessPoolExecutor(isci, mp_context=multiprocessing.get_context("spawn"))
+            _havuz_isci = isci
+    return _havuz
+
+# =============================================================================
+# ANALİZ
+# =============================================================================
+
+def paralel_sku_siniflandir(urun: pd.DataFrame, sorunlu_kategoriler: List[str],
+                            kurallar: Optional[Dict] = None, isci: Optional[int] = None,
+                            yontem: Optional[str] = None) -> pd.DataFrame:
+    """sku_siniflandir(sku_metrikleri_hazirla(urun), ...) ile aynı tablo, parçalı"""
+    isci = isci or PARALEL_AYARLARI["isci"]
+    yontem = yontem or PARALEL_AYARLARI["yontem"]
+    kural_seti = varsayilan_motor().guncel()
+    esikler = {**kural_seti.esikler, **kurallar} if kurallar else kural_seti.esikler
+
+    with aralik("paralel_siniflandir", satir=len(urun), isci=isci, yontem=yontem) as a:
+        with aralik("ust_sira"):
+            ust, sira = ust_sira_hazirla(urun, kural_seti, esikler)
+        parcalar = parcala(urun, isci, yontem)
+        kolonlar = [k for k in PARCA_KOLONLARI if k in urun.columns]
+
+        with aralik("parcalar", parca=len(parcalar)):
+            isler = [
+                havuz(isci).submit(
+                    _parca_analiz, urun.iloc[p][kolonlar], ust, sira[p] if ust is None else None,
+                    kural_seti, sorunlu_kategoriler, kurallar,
+                )
+                for p in parcalar
+            ]
+            sonuclar = [is_.result() for is_ in isler]
+
+        with aralik("birlestir"):
+            # Seri yoldaki sıra: öncelik, satış (azalan), sonra satır sırası
+            tablolar = [s[0] for s in sonuclar]
+            satir = np.concatenate([p[s[1]] for p, s in zip(parcalar, sonuclar)])
+            dolu = [t for t in tablolar if len(t)] or tablolar[:1]
+            tablo = pd.concat(dolu, ignore_index=True)
+            sira = np.lexsort((satir, -tablo['haftalik_satis'].to_numpy(), tablo['oncelik'].to_numpy()))
+            tablo = tablo.iloc[sira].reset_index(drop=True)
+
+        if a:
+            sureler = [s[2] for s in sonuclar]
+            a.ekle(parca=len(parcalar), surec=len({s[3] for s in sonuclar}),
+                   parca_en_uzun_ms=round(max(sureler) * 1000, 1),
+                   parca_toplam_ms=round(sum(sureler) * 1000, 1), secili=len(tablo))
+    return tablo
+
+
+def paralel_analiz_et(trading: pd.DataFrame, urun: pd.DataFrame, kurallar: Optional[Dict] = None,
+                      isci: Optional[int] = None,
+                      yontem: Optional[str] = None) -> Tuple[str, pd.DataFrame, pd.DataFrame]:
+    """analiz_et'in ürün tablosundan parçalı hali - küçük tabloda seri yola düşer"""
+    isci = isci or PARALEL_AYARLARI["isci"]
+    if isci <= 1 or len(urun) < PARALEL_AYARLARI["min_satir"]:
+        with aralik("sku_metrikleri_hazirla", satir=len(urun)):
+            metrik = sku_metrikleri_hazirla(urun)
+        return analiz_et(trading, metrik, kurallar)
+
+    with aralik("analiz_et", sku=len(urun), isci=isci):
+        with aralik("kategori_analiz", satir=len(trading)):
+            kategori_bulgular = kategori_analiz(trading, kurallar)
+            sorunlu_kat_isimleri = [b.kategori for b in kategori_bulgular if b.sorun_var]
+
+        tablo = paralel_sku_siniflandir(urun, sorunlu_kat_isimleri, kurallar, isci, yontem)
+
+        with aralik("rapor_uret") as a:
+            rapor = rapor_uret_tablodan(kategori_bulgular, tablo, kurallar)
+            if a:
+                a.ekle(karakter=len(rapor))
+
+        with aralik("sonuc_tablolari"):
+            sevk_df, indirim_df = sonuc_tablolari(tablo)
+
+        with aralik("sevk_dagit", sku=len(sevk_df)):
+            sevk_df, _ = sevk_planla(sevk_df, kurallar)
+    return rapor, sevk_df, indirim_df
@@ -11,43 +11,58 @@ Bu script:
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dataclasses import dataclass
-from typing import List, Dict, Tuple, Optional
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional
+
+from onbellek import Kaynak, excel_oku
+from izleme import aralik, baglamda
+from excel_okuyucu import urun_akis_oku
+from kural_motoru import KURAL_TANIMLARI, KuralVerisi, varsayilan_motor
+from sevk_dagitimi import sevk_planla
+
+if TYPE_CHECKING:
+    from artimli_analiz import ArtimliSiniflandirici
 
 # =============================================================================
 # KURALLAR (Hibrit Sistem - Temel Kurallar)
 # =============================================================================
 
-KURALLAR = {
-    # Kural 1: Bütçe sapması
-    "butce_sapma_kritik": 0.30,  # %30 ve üzeri sapma kritik
-    
-    # Kural 2: Cover hedefleri
-    "cover_depo_hedef": 12,      # Depo dahil 12 hafta
-    "cover_magaza_min": 8,       # Mağaza min 8 hafta
-    "cover_magaza_max": 12,      # Mağaza max 12 hafta
-    
-    # Kural 3: İndirim başarı kriteri (elastikiyete göre dinamik)
-    "indirim_basari_orani": 0.5, # Beklentinin en az %50'si
-    
-    # Kural 4: Stok devir
-    "stok_devir_hedef_hafta": 12,
-    
-    # Kural 5: Yok satış
-    "top_sku_sayisi": 100,       # Top 100 SKU'da tolerans yok
-    "yok_satis_kritik_oran": 0.30,  # Diğerlerinde %30 üzeri kritik
-}
+# Eşikler ve SKU kuralları kural_motoru.KURAL_TANIMLARI'nda tek yerde tanımlı;
+# agent araçları da aynı kural setini değerlendirir. KURALLAR varsayılan
+# eşiklerdir - fonksiyonlar kurallar verilmezse motorun güncel eşiklerini kullanır.
+KURALLAR = KURAL_TANIMLARI["esikler"]
+
+def _esikler(kurallar: Optional[Dict]) -> Dict:
+    """Verilen eşikler motorun güncel eşiklerinin üstüne (eksik anahtar kalmasın)"""
+    esikler = varsayilan_motor().esikler
+    return {**esikler, **kurallar} if kurallar else esikler
 
 # =============================================================================
 # VERİ OKUMA
 # =============================================================================
 
-def veri_yukle(trading_path: str, urun_path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Excel dosyalarını yükle"""
-    trading = pd.read_excel(trading_path, sheet_name='mtd')
-    urun = pd.read_excel(urun_path)
-    return trading, urun
+def veri_yukle(trading_path: Kaynak, urun_path: Kaynak, akis: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Excel dosyalarını yükle (aynı içerik tekrar gelirse önbellekten)
+    
+    Yollar yerine dosya içerikleri (bytes) de verilebilir - yüklenen dosyalar
+    diske yazılmadan okunur. İki dosya eşzamanlı okunur: özet hesabı, zip
+    açma ve Parquet okuma GIL'i bıraktığı için büyük ürün raporu okunurken
+    trading raporu da hazırlanır.
+    
+    akis=True: Ürün raporu sadece gerekli kolonlarla, sabit bellekle okunur
+    (milyon satırlık raporlar için).
+    """
+    with aralik("veri_yukle", akis=akis), \
+            ThreadPoolExecutor(max_workers=2, thread_name_prefix="veri_yukle") as havuz:
+        oku = baglamda(excel_oku)
+        trading = havuz.submit(oku, trading_path, sheet_name='mtd')
+        if akis:
+            urun = havuz.submit(oku, urun_path, etiket='akis', okuyucu=urun_akis_oku)
+        else:
+            urun = havuz.submit(oku, urun_path)
+        return trading.result(), urun.result()
 
 # =============================================================================
 # ANALİZ MODÜLÜ
@@ -76,8 +91,9 @@ class SKUBulgu:
     aksiyon: str  # "SEVK", "INDIRIM", "IZLE", "OK"
     oncelik: int  # 1=Kritik, 2=Yüksek, 3=Normal
 
-def kategori_analiz(trading: pd.DataFrame) -> List[KategoriBulgu]:
+def kategori_analiz(trading: pd.DataFrame, kurallar: Optional[Dict] = None) -> List[KategoriBulgu]:
     """Kategori bazlı analiz - sorunlu kategorileri bul"""
+    kurallar = _esikler(kurallar)
     bulgular = []
     
     for _, row in trading.iterrows():
@@ -110,7 +126,7 @@ def kategori_analiz(trading: pd.DataFrame) -> List[KategoriBulgu]:
         sorun_var = False
         
         # Kural 1: Bütçe sapması kontrolü
-        if abs(butce_sapma) >= KURALLAR["butce_sapma_kritik"]:
+        if abs(butce_sapma) >= kurallar["butce_sapma_kritik"]:
             sorun_var = True
             if butce_sapma < 0:
                 sorunlar.append(f"❌ Bütçe altında: {butce_sapma*100:.1f}%")
@@ -118,12 +134,12 @@ def kategori_analiz(trading: pd.DataFrame) -> List[KategoriBulgu]:
                 sorunlar.append(f"⚠️ Bütçe aşımı: +{butce_sapma*100:.1f}%")
         
         # LFL negatif
-        if lfl_degisim < -0.10:  # %10'dan fazla küçülme
+        if lfl_degisim < -kurallar["lfl_degisim_esik"]:  # %10'dan fazla küçülme
             sorun_var = True
             sorunlar.append(f"📉 LFL küçülme: {lfl_degisim*100:.1f}%")
         
         # Cover yüksek (fazla stok)
-        if cover > KURALLAR["cover_depo_hedef"]:
+        if cover > kurallar["cover_depo_hedef"]:
             sorun_var = True
             sorunlar.append(f"📦 Cover yüksek: {cover:.1f} hafta")
         
@@ -144,100 +160,205 @@ def kategori_analiz(trading: pd.DataFrame) -> List[KategoriBulgu]:
     
     return bulgular
 
-def sku_analiz(urun: pd.DataFrame, sorunlu_kategoriler: List[str]) -> List[SKUBulgu]:
-    """SKU bazlı analiz - aksiyon gereken ürünleri bul"""
-    bulgular = []
-    
+def _sayisal_kolon(urun: pd.DataFrame, kolon: str) -> np.ndarray:
+    """Kolonu float dizisi olarak döndür (kolon yoksa 0)"""
+    if kolon not in urun.columns:
+        return np.zeros(len(urun))
+    return urun[kolon].to_numpy(dtype=float, na_value=np.nan)
+
+@dataclass
+class SKUMetrikleri:
+    """Kurallardan bağımsız SKU metrikleri - yüklemede bir kez hesaplanır
+
+    Eşik değişince sadece sku_siniflandir tekrar çalışır; koşul maskeleri
+    (veri) eşik değerine göre saklandığı için değişmeyen kuralların maskesi
+    de yeniden hesaplanmaz.
+    """
+    sku_kod: np.ndarray
+    sku_adi: pd.api.extensions.ExtensionArray  # Metinler pandas dizisi - her seferinde dönüşmesin
+    kategori: pd.api.extensions.ExtensionArray
+    depo_stok: np.ndarray
+    magaza_stok: np.ndarray
+    haftalik_satis: np.ndarray
+    cover_hafta: np.ndarray
+    magaza_cover: np.ndarray
+    indirim_orani: np.ndarray
+    satis_sirasi: np.ndarray  # Kodun toplam satışa göre en iyi sırası (0 = en çok satan)
+    veri: KuralVerisi = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Kural motoru kolonları standart adlarıyla görür
+        self.veri = KuralVerisi({
+            "depo_stok": self.depo_stok,
+            "magaza_stok": self.magaza_stok,
+            "toplam_stok": lambda d=self.depo_stok, m=self.magaza_stok: d + m,
+            "haftalik_satis": self.haftalik_satis,
+            "cover_hafta": self.cover_hafta,
+            "magaza_cover": self.magaza_cover,
+            "satis_sirasi": self.satis_sirasi,
+        })
+
+    def __len__(self) -> int:
+        return len(self.sku_kod)
+
+    def alt_kume(self, pozisyonlar: np.ndarray) -> "SKUMetrikleri":
+        """Sadece verilen satırların metrikleri (kurallar satır bazlı, sonuç aynı)"""
+        return SKUMetrikleri(**{f.name: getattr(self, f.name)[pozisyonlar] for f in fields(self) if f.init})
+
+def satis_sirasi_hesapla(urun: pd.DataFrame) -> np.ndarray:
+    """Her satırın kodunun toplam satışa göre en iyi sırası (0 = en çok satan)"""
     # Haftalık satışa göre sırala (top SKU tespiti için)
     urun['toplam_satis'] = urun['TW Adet'].fillna(0) + urun['LW Adet'].fillna(0)
-    urun_sirali = urun.sort_values('toplam_satis', ascending=False)
-    top_sku_listesi = urun_sirali.head(KURALLAR["top_sku_sayisi"])['Ürün Kodu'].tolist()
-    
-    for _, row in urun.iterrows():
-        sku_kod = row['Ürün Kodu']
-        sku_adi = row['Ürün ']
-        kategori = row['Kategori ']
-        
-        depo_stok = row.get('Anlık Depo Stok Adet', 0) or 0
-        magaza_stok = row.get('Anlık Mğz Stok Adet', 0) or 0
-        toplam_stok = depo_stok + magaza_stok
-        
-        tw_satis = row.get('TW Adet', 0) or 0
-        lw_satis = row.get('LW Adet', 0) or 0
-        haftalik_satis = (tw_satis + lw_satis) / 2  # Ortalama
-        
-        indirim_orani = row.get('TW İO', 0) or 0
-        
-        # Cover hesapla
-        if haftalik_satis > 0:
-            cover_hafta = toplam_stok / haftalik_satis
-        else:
-            cover_hafta = 999  # Satış yok, stok var = sonsuz cover
-        
-        # Aksiyon belirleme
-        aksiyon = "OK"
-        oncelik = 3
-        
-        # Mağaza cover hesapla (mağaza stok / haftalık satış)
-        if haftalik_satis > 0:
-            magaza_cover = magaza_stok / haftalik_satis
-        else:
-            magaza_cover = 999
-        
-        # SEVK gerekli: Depoda var, mağazada cover düşük, satış var
-        # Mağaza cover 4 haftanın altındaysa ve depoda stok varsa sevk et
-        if depo_stok > 100 and magaza_cover < 4 and haftalik_satis > 20:
-            aksiyon = "SEVK"
-            oncelik = 1 if sku_kod in top_sku_listesi else 2
-        
-        # SEVK - Orta öncelik: Depoda fazla stok var, mağazada makul
-        elif depo_stok > 500 and magaza_cover < 8 and haftalik_satis > 10:
-            aksiyon = "SEVK"
-            oncelik = 2
-        
-        # İNDİRİM gerekli: Cover çok yüksek (>20 hafta), satış düşük
-        elif cover_hafta > 20 and haftalik_satis < 30:
-            aksiyon = "INDIRIM"
-            oncelik = 2
-        
-        # İNDİRİM - Yüksek cover genel
-        elif cover_hafta > KURALLAR["cover_depo_hedef"] * 2 and haftalik_satis < 50:
-            aksiyon = "INDIRIM"
-            oncelik = 3
-        
-        # İZLE: Potansiyel sorun var
-        elif cover_hafta > KURALLAR["cover_magaza_max"]:
-            aksiyon = "IZLE"
-            oncelik = 3
-        
-        # Sadece sorunlu kategorilerdeki veya aksiyon gereken SKU'ları ekle
-        if aksiyon != "OK" or kategori in sorunlu_kategoriler:
-            bulgular.append(SKUBulgu(
-                sku_kod=sku_kod,
-                sku_adi=sku_adi if pd.notna(sku_adi) else str(sku_kod),
-                kategori=kategori,
-                depo_stok=int(depo_stok),
-                magaza_stok=int(magaza_stok),
-                haftalik_satis=haftalik_satis,
-                cover_hafta=cover_hafta,
-                indirim_orani=indirim_orani,
-                aksiyon=aksiyon,
-                oncelik=oncelik
-            ))
-    
-    # Önceliğe göre sırala
-    bulgular.sort(key=lambda x: (x.oncelik, -x.haftalik_satis))
+    sirali = urun['toplam_satis'].reset_index(drop=True).sort_values(ascending=False).index.to_numpy()
+    sira = np.empty(len(urun), dtype=np.int64)
+    sira[sirali] = np.arange(len(urun))
+    # Aynı kod birden çok satırdaysa en iyi sırası geçerli (isin ile aynı sonuç)
+    return pd.Series(sira).groupby(urun['Ürün Kodu'].to_numpy(), dropna=False).transform('min').to_numpy()
+
+def sku_metrikleri_hazirla(urun: pd.DataFrame, satis_sirasi: Optional[np.ndarray] = None) -> SKUMetrikleri:
+    """Cover, mağaza cover ve satış sırası gibi ağır hesapları bir kez yap
+    
+    satis_sirasi: Tablo bir parçaysa (paralel analiz) tüm üründen hesaplanmış
+    sıra - verilmezse bu tablodan hesaplanır.
+    """
+    if satis_sirasi is None:
+        satis_sirasi = satis_sirasi_hesapla(urun)
+    
+    # Boş stok hücresi 0 adettir (tablodaki tamsayı dönüşümü NaN'ı bozmasın)
+    depo_stok = np.nan_to_num(_sayisal_kolon(urun, 'Anlık Depo Stok Adet'))
+    magaza_stok = np.nan_to_num(_sayisal_kolon(urun, 'Anlık Mğz Stok Adet'))
+    haftalik_satis = (_sayisal_kolon(urun, 'TW Adet') + _sayisal_kolon(urun, 'LW Adet')) / 2  # Ortalama
+    
+    # Cover hesapla (satış yok, stok var = sonsuz cover)
+    satis_var = haftalik_satis > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover_hafta = np.where(satis_var, (depo_stok + magaza_stok) / haftalik_satis, 999)
+        magaza_cover = np.where(satis_var, magaza_stok / haftalik_satis, 999)
+    
+    sku_kod = urun['Ürün Kodu'].to_numpy()
+    sku_adi = urun['Ürün '].to_numpy(dtype=object).copy()
+    ad_yok = pd.isna(sku_adi)
+    sku_adi[ad_yok] = [str(kod) for kod in sku_kod[ad_yok]]
+    
+    return SKUMetrikleri(
+        sku_kod=sku_kod,
+        sku_adi=pd.array(sku_adi),
+        kategori=urun['Kategori '].array,
+        depo_stok=depo_stok,
+        magaza_stok=magaza_stok,
+        haftalik_satis=haftalik_satis,
+        cover_hafta=cover_hafta,
+        magaza_cover=magaza_cover,
+        indirim_orani=_sayisal_kolon(urun, 'TW İO'),
+        satis_sirasi=satis_sirasi,
+    )
+
+def sku_siniflandir(metrik: SKUMetrikleri, sorunlu_kategoriler: List[str],
+                    kurallar: Optional[Dict] = None,
+                    siniflar: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> pd.DataFrame:
+    """Hazır metriklere kuralları uygula (ucuz adım)
+    
+    Kurallar kural motorunun 'sku_siniflandirma' grubundan gelir; kurallar
+    (eşikler) verilirse motorun eşiklerinin üstüne yazılır. Dönen tablo
+    SKUBulgu alanlarını içerir, sadece listeye girecek SKU'lar önceliğe göre
+    sıralı gelir.
+    
+    siniflar: Başka yoldan (artımlı analiz) hesaplanmış (aksiyon, öncelik) -
+    verilirse kural motoru çalışmaz.
+    """
+    m = metrik
+    
+    # Kurallar sırayla değerlendirilir, ilk eşleşen kazanır
+    if siniflar is None:
+        aksiyon, oncelik = varsayilan_motor().siniflandir("sku_siniflandirma", m.veri, kurallar)
+    else:
+        aksiyon, oncelik = siniflar
     
-    return bulgular
+    return bulgu_tablosu(m, sku_secimi(m, sorunlu_kategoriler, aksiyon, oncelik), aksiyon, oncelik)
+
+def sku_secimi(metrik: SKUMetrikleri, sorunlu_kategoriler: List[str],
+               aksiyon: np.ndarray, oncelik: np.ndarray) -> np.ndarray:
+    """Listeye girecek satırların pozisyonları, tablodaki sırayla"""
+    # Sadece sorunlu kategorilerdeki veya aksiyon gereken SKU'ları al
+    secili = np.flatnonzero((aksiyon != "OK") | np.asarray(metrik.kategori.isin(sorunlu_kategoriler)))
+    
+    # Önceliğe göre sırala (aynı öncelikte satışı yüksek olan önce)
+    sira = np.lexsort((-metrik.haftalik_satis[secili], oncelik[secili]))
+    return secili[sira]
+
+def bulgu_tablosu(metrik: SKUMetrikleri, pozisyonlar: np.ndarray,
+                  aksiyon: np.ndarray, oncelik: np.ndarray) -> pd.DataFrame:
+    """Seçili satırlardan SKUBulgu alanlı tablo"""
+    m = metrik
+    return pd.DataFrame({
+        'sku_kod': m.sku_kod[pozisyonlar],
+        'sku_adi': m.sku_adi[pozisyonlar],
+        'kategori': m.kategori[pozisyonlar],
+        'depo_stok': m.depo_stok[pozisyonlar].astype(np.int64),
+        'magaza_stok': m.magaza_stok[pozisyonlar].astype(np.int64),
+        'haftalik_satis': m.haftalik_satis[pozisyonlar],
+        'cover_hafta': m.cover_hafta[pozisyonlar],
+        'indirim_orani': m.indirim_orani[pozisyonlar],
+        'aksiyon': aksiyon[pozisyonlar],
+        'oncelik': oncelik[pozisyonlar],
+    })
+
+def sku_kurallari_uygula(urun: pd.DataFrame, sorunlu_kategoriler: List[str]) -> pd.DataFrame:
+    """SKU kurallarını tüm tabloya tek seferde uygula (vektörel)
+    
+    Satır döngüsü yerine NumPy maskeleri ve np.select ile cover, mağaza cover,
+    aksiyon ve öncelik hesaplar. Aynı veride kurallar tekrar tekrar
+    değişecekse sku_metrikleri_hazirla + sku_siniflandir kullanılmalı.
+    """
+    return sku_siniflandir(sku_metrikleri_hazirla(urun), sorunlu_kategoriler)
+
+def sku_analiz(urun: pd.DataFrame, sorunlu_kategoriler: List[str]) -> List[SKUBulgu]:
+    """SKU bazlı analiz - aksiyon gereken ürünleri bul"""
+    tablo = sku_kurallari_uygula(urun, sorunlu_kategoriler)
+    kolonlar = [tablo[kolon].tolist() for kolon in tablo.columns]
+    return [SKUBulgu(*kayit) for kayit in zip(*kolonlar)]
 
 # =============================================================================
 # RAPOR ÜRETME
 # =============================================================================
 
 def rapor_uret(kategori_bulgular: List[KategoriBulgu], 
-               sku_bulgular: List[SKUBulgu]) -> str:
+               sku_bulgular: List[SKUBulgu], kurallar: Optional[Dict] = None) -> str:
     """Agent çıktısını üret"""
-    
+    sevk_listesi = [s for s in sku_bulgular if s.aksiyon == "SEVK"]
+    indirim_listesi = [s for s in sku_bulgular if s.aksiyon == "INDIRIM"]
+    return _rapor_yaz(
+        kategori_bulgular,
+        sevk_listesi[:20], len(sevk_listesi), sum(1 for s in sevk_listesi if s.oncelik == 1),
+        indirim_listesi[:15], len(indirim_listesi), kurallar,
+    )
+
+def rapor_uret_tablodan(kategori_bulgular: List[KategoriBulgu], tablo: pd.DataFrame,
+                        kurallar: Optional[Dict] = None) -> str:
+    """rapor_uret ile aynı rapor, sku_siniflandir tablosundan
+    
+    Rapor sadece ilk 20 sevk ve ilk 15 indirim satırını yazar; diğerleri için
+    sayım yeterli, tüm tablo SKUBulgu nesnelerine çevrilmez.
+    """
+    aksiyon = tablo['aksiyon'].to_numpy()
+    sevk = np.flatnonzero(aksiyon == "SEVK")
+    indirim = np.flatnonzero(aksiyon == "INDIRIM")
+    
+    def bulgular(pozisyonlar: np.ndarray) -> List[SKUBulgu]:
+        secili = tablo.iloc[pozisyonlar]
+        return [SKUBulgu(*kayit) for kayit in zip(*[secili[k].tolist() for k in secili.columns])]
+    
+    return _rapor_yaz(
+        kategori_bulgular,
+        bulgular(sevk[:20]), len(sevk), int((tablo['oncelik'].to_numpy()[sevk] == 1).sum()),
+        bulgular(indirim[:15]), len(indirim), kurallar,
+    )
+
+def _rapor_yaz(kategori_bulgular: List[KategoriBulgu],
+               sevk_ilk: List[SKUBulgu], sevk_sayisi: int, sevk_kritik_sayisi: int,
+               indirim_ilk: List[SKUBulgu], indirim_sayisi: int,
+               kurallar: Optional[Dict] = None) -> str:
+    kurallar = _esikler(kurallar)
     rapor = []
     rapor.append("=" * 70)
     rapor.append("📊 SANAL PLANNER - HAFTALIK ANALİZ RAPORU")
@@ -268,19 +389,17 @@ def rapor_uret(kategori_bulgular: List[KategoriBulgu],
     rapor.append("📦 BÖLÜM 2: SEVKİYAT PLANI")
     rapor.append("─" * 70)
     
-    sevk_listesi = [s for s in sku_bulgular if s.aksiyon == "SEVK"]
-    
-    if sevk_listesi:
-        rapor.append(f"\n🚚 {len(sevk_listesi)} SKU ACİL SEVK GEREKTİRİYOR:\n")
+    if sevk_sayisi:
+        rapor.append(f"\n🚚 {sevk_sayisi} SKU ACİL SEVK GEREKTİRİYOR:\n")
         rapor.append(f"{'Önc':^4} | {'SKU Kodu':^12} | {'Ürün Adı':<35} | {'Depo':>8} | {'Mağaza':>8} | {'H.Satış':>8}")
         rapor.append("-" * 95)
         
-        for sku in sevk_listesi[:20]:  # İlk 20
+        for sku in sevk_ilk:  # İlk 20
             sku_adi_kisalt = sku.sku_adi[:33] + ".." if len(sku.sku_adi) > 35 else sku.sku_adi
             rapor.append(f"{sku.oncelik:^4} | {sku.sku_kod:^12} | {sku_adi_kisalt:<35} | {sku.depo_stok:>8,} | {sku.magaza_stok:>8,} | {sku.haftalik_satis:>8,.0f}")
         
-        if len(sevk_listesi) > 20:
-            rapor.append(f"\n... ve {len(sevk_listesi) - 20} SKU daha")
+        if sevk_sayisi > 20:
+            rapor.append(f"\n... ve {sevk_sayisi - 20} SKU daha")
     else:
         rapor.append("\n✅ Acil sevkiyat gerektiren SKU yok.\n")
     
@@ -289,20 +408,18 @@ def rapor_uret(kategori_bulgular: List[KategoriBulgu],
     rapor.append("🏷️ BÖLÜM 3: İNDİRİM / KAMPANYA ÖNERİLERİ")
     rapor.append("─" * 70)
     
-    indirim_listesi = [s for s in sku_bulgular if s.aksiyon == "INDIRIM"]
-    
-    if indirim_listesi:
-        rapor.append(f"\n💰 {len(indirim_listesi)} SKU İNDİRİM/KAMPANYA ÖNERİLİYOR:\n")
+    if indirim_sayisi:
+        rapor.append(f"\n💰 {indirim_sayisi} SKU İNDİRİM/KAMPANYA ÖNERİLİYOR:\n")
         rapor.append(f"{'SKU Kodu':^12} | {'Ürün Adı':<35} | {'Cover':>8} | {'H.Satış':>8} | {'Mevcut İO':>10}")
         rapor.append("-" * 85)
         
-        for sku in indirim_listesi[:15]:  # İlk 15
+        for sku in indirim_ilk:  # İlk 15
             sku_adi_kisalt = sku.sku_adi[:33] + ".." if len(sku.sku_adi) > 35 else sku.sku_adi
             cover_str = f"{sku.cover_hafta:.1f} hf" if sku.cover_hafta < 100 else "∞"
             rapor.append(f"{sku.sku_kod:^12} | {sku_adi_kisalt:<35} | {cover_str:>8} | {sku.haftalik_satis:>8,.0f} | {sku.indirim_orani*100:>9.0f}%")
         
-        if len(indirim_listesi) > 15:
-            rapor.append(f"\n... ve {len(indirim_listesi) - 15} SKU daha")
+        if indirim_sayisi > 15:
+            rapor.append(f"\n... ve {indirim_sayisi - 15} SKU daha")
     else:
         rapor.append("\n✅ İndirim önerilen SKU yok.\n")
     
@@ -318,24 +435,24 @@ def rapor_uret(kategori_bulgular: List[KategoriBulgu],
         en_sorunlu = max(sorunlu_kategoriler, key=lambda x: abs(x.butce_sapma))
         rapor.append(f"  1. En sorunlu kategori: {en_sorunlu.kategori} (Bütçe sapması: {en_sorunlu.butce_sapma*100:.1f}%)")
     
-    yuksek_cover_kategoriler = [b for b in kategori_bulgular if b.cover > 12]
+    cover_hedef = kurallar["cover_depo_hedef"]
+    yuksek_cover_kategoriler = [b for b in kategori_bulgular if b.cover > cover_hedef]
     if yuksek_cover_kategoriler:
-        rapor.append(f"  2. {len(yuksek_cover_kategoriler)} kategoride stok fazlası (Cover > 12 hafta)")
+        rapor.append(f"  2. {len(yuksek_cover_kategoriler)} kategoride stok fazlası (Cover > {cover_hedef} hafta)")
     
-    sevk_kritik = [s for s in sevk_listesi if s.oncelik == 1]
-    if sevk_kritik:
-        rapor.append(f"  3. {len(sevk_kritik)} Top-100 SKU'da acil sevkiyat gerekiyor")
+    if sevk_kritik_sayisi:
+        rapor.append(f"  3. {sevk_kritik_sayisi} Top-{kurallar['top_sku_sayisi']} SKU'da acil sevkiyat gerekiyor")
     
     rapor.append("\n🎯 Seneye Bütçe Önerileri:\n")
     
     # Büyüyen kategoriler
-    buyuyen = [b for b in kategori_bulgular if b.lfl_degisim > 0.10]
+    buyuyen = [b for b in kategori_bulgular if b.lfl_degisim > kurallar["lfl_degisim_esik"]]
     if buyuyen:
         for b in buyuyen[:3]:
             rapor.append(f"  ↗️ {b.kategori}: LFL +{b.lfl_degisim*100:.1f}% - Bütçe artırımı düşünülebilir")
     
     # Küçülen kategoriler
-    kuculen = [b for b in kategori_bulgular if b.lfl_degisim < -0.10]
+    kuculen = [b for b in kategori_bulgular if b.lfl_degisim < -kurallar["lfl_degisim_esik"]]
     if kuculen:
         for b in kuculen[:3]:
             rapor.append(f"  ↘️ {b.kategori}: LFL {b.lfl_degisim*100:.1f}% - Bütçe revizyonu gerekebilir")
@@ -350,52 +467,124 @@ def rapor_uret(kategori_bulgular: List[KategoriBulgu],
 # ANA FONKSİYON
 # =============================================================================
 
-def calistir(trading_path: str, urun_path: str) -> Tuple[str, pd.DataFrame, pd.DataFrame]:
-    """Ana çalıştırma fonksiyonu"""
-    
-    # 1. Veri yükle
-    trading, urun = veri_yukle(trading_path, urun_path)
-    
-    # 2. Kategori analizi
-    kategori_bulgular = kategori_analiz(trading)
-    sorunlu_kat_isimleri = [b.kategori for b in kategori_bulgular if b.sorun_var]
-    
-    # 3. SKU analizi
-    sku_bulgular = sku_analiz(urun, sorunlu_kat_isimleri)
-    
-    # 4. Rapor üret
-    rapor = rapor_uret(kategori_bulgular, sku_bulgular)
-    
-    # 5. Excel çıktıları hazırla
-    sevk_df = pd.DataFrame([
-        {
-            'Öncelik': s.oncelik,
-            'SKU Kodu': s.sku_kod,
-            'Ürün Adı': s.sku_adi,
-            'Kategori': s.kategori,
-            'Depo Stok': s.depo_stok,
-            'Mağaza Stok': s.magaza_stok,
-            'Haftalık Satış': s.haftalik_satis,
-            'Cover (Hafta)': round(s.cover_hafta, 1) if s.cover_hafta < 100 else 999
-        }
-        for s in sku_bulgular if s.aksiyon == "SEVK"
-    ])
-    
-    indirim_df = pd.DataFrame([
-        {
-            'SKU Kodu': s.sku_kod,
-            'Ürün Adı': s.sku_adi,
-            'Kategori': s.kategori,
-            'Toplam Stok': s.depo_stok + s.magaza_stok,
-            'Haftalık Satış': s.haftalik_satis,
-            'Cover (Hafta)': round(s.cover_hafta, 1) if s.cover_hafta < 100 else 999,
-            'Mevcut İndirim %': round(s.indirim_orani * 100, 0)
-        }
-        for s in sku_bulgular if s.aksiyon == "INDIRIM"
-    ])
+def sonuc_tablolari(tablo: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """sku_siniflandir tablosundan sevkiyat ve indirim Excel çıktıları"""
+    sevk = tablo[tablo['aksiyon'].to_numpy() == "SEVK"]
+    sevk_df = pd.DataFrame({
+        'Öncelik': sevk['oncelik'].to_numpy(),
+        'SKU Kodu': sevk['sku_kod'].to_numpy(),
+        'Ürün Adı': sevk['sku_adi'].array,
+        'Kategori': sevk['kategori'].array,
+        'Depo Stok': sevk['depo_stok'].to_numpy(),
+        'Mağaza Stok': sevk['magaza_stok'].to_numpy(),
+        'Haftalık Satış': sevk['haftalik_satis'].to_numpy(),
+        'Cover (Hafta)': _cover_gosterim(sevk['cover_hafta'].to_numpy()),
+    })
+    
+    indirim = tablo[tablo['aksiyon'].to_numpy() == "INDIRIM"]
+    indirim_df = pd.DataFrame({
+        'SKU Kodu': indirim['sku_kod'].to_numpy(),
+        'Ürün Adı': indirim['sku_adi'].array,
+        'Kategori': indirim['kategori'].array,
+        'Toplam Stok': indirim['depo_stok'].to_numpy() + indirim['magaza_stok'].to_numpy(),
+        'Haftalık Satış': indirim['haftalik_satis'].to_numpy(),
+        'Cover (Hafta)': _cover_gosterim(indirim['cover_hafta'].to_numpy()),
+        'Mevcut İndirim %': np.round(indirim['indirim_orani'].to_numpy() * 100, 0),
+    })
+    
+    return sevk_df, indirim_df
+
+def _cover_gosterim(cover: np.ndarray) -> np.ndarray:
+    """1 ondalık cover, 100 hafta ve üstü (veya tanımsız) 999
+    
+    np.round yarıma çok yakın değerlerde round()'dan farklı yuvarlayabilir;
+    sadece o değerler round() ile düzeltilir, Excel çıktısı aynı kalsın.
+    """
+    yuvarlak = np.round(cover, 1)
+    ondalik = cover * 10 - np.floor(cover * 10)
+    supheli = np.flatnonzero(np.abs(ondalik - 0.5) < 1e-6)
+    yuvarlak[supheli] = [round(c, 1) for c in cover[supheli].tolist()]
+    return np.where(cover < 100, yuvarlak, 999)
+
+def analiz_et(trading: pd.DataFrame, metrik: SKUMetrikleri,
+              kurallar: Optional[Dict] = None,
+              artimli: Optional["ArtimliSiniflandirici"] = None) -> Tuple[str, pd.DataFrame, pd.DataFrame]:
+    """Hazır veriler üzerinde kategori analizi, SKU sınıflandırma ve rapor
+    
+    artimli verilirse sadece önceki çalıştırmaya göre girdisi değişen SKU'lar
+    yeniden sınıflandırılır; fark tablosu artimli.son_fark'ta kalır.
+    """
+    
+    with aralik("analiz_et", sku=len(metrik)):
+        # 1. Kategori analizi
+        with aralik("kategori_analiz", satir=len(trading)) as a:
+            kategori_bulgular = kategori_analiz(trading, kurallar)
+            sorunlu_kat_isimleri = [b.kategori for b in kategori_bulgular if b.sorun_var]
+            if a:
+                a.ekle(kategori=len(kategori_bulgular), sorunlu=len(sorunlu_kat_isimleri))
+        
+        # 2. SKU analizi
+        with aralik("sku_siniflandir", satir=len(metrik)) as a:
+            if artimli is None:
+                tablo = sku_siniflandir(metrik, sorunlu_kat_isimleri, kurallar)
+            else:
+                tablo = artimli.siniflandir(metrik, sorunlu_kat_isimleri, kurallar)
+            if a:
+                a.ekle(secili=len(tablo))
+        
+        # 3. Rapor üret
+        with aralik("rapor_uret") as a:
+            rapor = rapor_uret_tablodan(kategori_bulgular, tablo, kurallar)
+            if a:
+                a.ekle(karakter=len(rapor))
+        
+        # 4. Excel çıktıları hazırla
+        with aralik("sonuc_tablolari") as a:
+            sevk_df, indirim_df = sonuc_tablolari(tablo)
+            if a:
+                a.ekle(sevk=len(sevk_df), indirim=len(indirim_df))
+        
+        # 5. Sevk adetlerini dağıt
+        with aralik("sevk_dagit", sku=len(sevk_df)) as a:
+            sevk_df, sevk_ozet = sevk_planla(sevk_df, kurallar)
+            if a:
+                a.ekle(adet=sevk_ozet.sevk, min_karsilanan=sevk_ozet.min_karsilanan)
     
     return rapor, sevk_df, indirim_df
 
+def calistir(trading_path: Optional[Kaynak] = None, urun_path: Optional[Kaynak] = None,
+             akis: bool = False,
+             veriler: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None,
+             artimli: Optional["ArtimliSiniflandirici"] = None,
+             isci: Optional[int] = None) -> Tuple[str, pd.DataFrame, pd.DataFrame]:
+    """Ana çalıştırma fonksiyonu
+    
+    veriler: Daha önce veri_yukle ile okunmuş (trading, urun) - verilirse
+    dosyalar tekrar okunmaz.
+    artimli: Haftalık artımlı sınıflandırma (bkz. artimli_analiz) - geçen
+    haftanın durumuna göre sadece değişen SKU'lar kurallardan geçer.
+    isci: 1'den büyükse SKU analizi ürün tablosu parçalanarak bu kadar
+    süreçte çalışır (bkz. paralel_analiz); sonuç seri yolla aynıdır.
+    artimli ile birlikte verilemez (artımlı durum tek süreçte güncellenir).
+    """
+    if artimli is not None and isci is not None and isci > 1:
+        raise ValueError("artimli ve isci > 1 birlikte kullanılamaz - artımlı sınıflandırma seri çalışır")
+    
+    with aralik("calistir"):
+        # 1. Veri yükle
+        if veriler is not None:
+            trading, urun = veriler
+        else:
+            trading, urun = veri_yukle(trading_path, urun_path, akis=akis)
+        
+        # 2. Analiz
+        if isci is not None and isci > 1:
+            from paralel_analiz import paralel_analiz_et
+            return paralel_analiz_et(trading, urun, isci=isci)
+        with aralik("sku_metrikleri_hazirla", satir=len(urun)):
+            metrik = sku_metrikleri_hazirla(urun)
+        return analiz_et(trading, metrik, artimli=artimli)
+
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,116 @@
+"""
+SANAL PLANNER - Sevk Dağıtımı
+SEVK bulgularına depodan mağazaya gönderilecek adetleri dağıtır
+
+Her SKU için iki hedef vardır: mağaza cover'ını cover_magaza_min'e çıkaran
+ihtiyaç ve cover_magaza_max'a kadar tamamlayan ek miktar. İkisi de depo
+stoğuyla sınırlıdır. Haftalık lojistik kapasitesi verilirse dağıtım iki
+turda yapılır: önce bütün SKU'lar öncelik sırasıyla (öncelik, sonra haftalık
+satış) min cover'a çıkarılır, kapasite kalırsa aynı sırayla max'a
+tamamlanır. Her tur sıralı ihtiyaçların kümülatif toplamıyla tek geçişte
+hesaplanır (açgözlü önek doldurma - öncelik sırasına göre en iyi çözüm),
+döngü yoktur.
+"""
+
+import os
+import math
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from kural_motoru import varsayilan_motor
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+SEVK_AYARLARI = {
+    # Haftalık lojistik kapasitesi (adet); boşsa sadece depo stoğu sınırlar
+    "haftalik_kapasite": float(os.environ["SANAL_PLANNER_SEVK_KAPASITE"])
+    if os.environ.get("SANAL_PLANNER_SEVK_KAPASITE") else None,
+}
+
+# =============================================================================
+# DAĞITIM
+# =============================================================================
+
+@dataclass
+class SevkOzeti:
+    sku: int               # Dağıtıma giren SKU
+    ihtiyac_min: int       # Min cover için gereken toplam adet (depo sınırlı)
+    ihtiyac_max: int       # Max cover için gereken toplam adet (depo sınırlı)
+    sevk: int              # Dağıtılan toplam adet
+    min_karsilanan: int    # Min cover'a ulaşan SKU (ihtiyacı olanlar içinde)
+    kapasite: Optional[float] = None
+
+
+def _onek_doldur(ihtiyac: np.ndarray, kapasite: float) -> np.ndarray:
+    """Sıralı ihtiyaçları kapasite bitene kadar baştan doldur
+
+    i. satır: min(ihtiyaç, kapasite - öncekilerin toplamı); kapasitenin
+    bittiği satır kısmi alır, sonrakiler hiç almaz.
+    """
+    onceki = np.cumsum(ihtiyac) - ihtiyac
+    return np.clip(kapasite - onceki, 0, ihtiyac)
+
+
+def sevk_dagit(depo_stok: np.ndarray, magaza_stok: np.ndarray, haftalik_satis: np.ndarray,
+               oncelik: np.ndarray, kurallar: Optional[Dict] = None,
+               kapasite: Optional[float] = None) -> Tuple[np.ndarray, SevkOzeti]:
+    """SKU başına sevk adedi (girdi sırasıyla) ve özet
+
+    Adetler tam sayıdır: min hedef yukarı (cover min'in altında kalmasın),
+    max hedef aşağı yuvarlanır. kapasite None ise SEVK_AYARLARI'ndaki değer,
+    o da yoksa sınırsız.
+    """
+    esikler = varsayilan_motor().esikler
+    esikler = {**esikler, **kurallar} if kurallar else esikler
+    kapasite = SEVK_AYARLARI["haftalik_kapasite"] if kapasite is None else kapasite
+
+    depo = np.maximum(np.nan_to_num(np.asarray(depo_stok, dtype=float)), 0)
+    magaza = np.nan_to_num(np.asarray(magaza_stok, dtype=float))
+    satis = np.maximum(np.nan_to_num(np.asarray(haftalik_satis, dtype=float)), 0)
+
+    hedef_min = np.ceil(satis * esikler["cover_magaza_min"]) - magaza
+    hedef_max = np.maximum(np.floor(satis * esikler["cover_magaza_max"]) - magaza, hedef_min)
+    ihtiyac_min = np.floor(np.clip(hedef_min, 0, depo))
+    ihtiyac_max = np.floor(np.clip(hedef_max, 0, depo))
+
+    if kapasite is None:
+        sevk = ihtiyac_max
+    else:
+        kapasite = max(math.floor(kapasite), 0)
+        # Öncelik sırası: öncelik artan, aynı öncelikte satış azalan, sonra girdi sırası
+        sira = np.lexsort((-satis, np.asarray(oncelik)))
+        tur1 = _onek_doldur(ihtiyac_min[sira], kapasite)
+        tur2 = _onek_doldur(ihtiyac_max[sira] - tur1, kapasite - tur1.sum())
+        sevk = np.empty_like(ihtiyac_max)
+        sevk[sira] = tur1 + tur2
+
+    sevk = sevk.astype(np.int64)
+    ozet = SevkOzeti(
+        sku=len(sevk),
+        ihtiyac_min=int(ihtiyac_min.sum()),
+        ihtiyac_max=int(ihtiyac_max.sum()),
+        sevk=int(sevk.sum()),
+        min_karsilanan=int(((sevk >= ihtiyac_min) & (ihtiyac_min > 0)).sum()),
+        kapasite=kapasite,
+    )
+    return sevk, ozet
+
+
+def sevk_planla(sevk_df: pd.DataFrame, kurallar: Optional[Dict] = None,
+                kapasite: Optional[float] = None) -> Tuple[pd.DataFrame, SevkOzeti]:
+    """sonuc_tablolari'nın sevkiyat listesine 'Sevk Adet' ve sevk sonrası cover ekle"""
+    satis = sevk_df['Haftalık Satış'].to_numpy(dtype=float, na_value=np.nan)
+    magaza = sevk_df['Mağaza Stok'].to_numpy(dtype=float)
+    sevk, ozet = sevk_dagit(sevk_df['Depo Stok'].to_numpy(), magaza, satis,
+                            sevk_df['Öncelik'].to_numpy(), kurallar, kapasite)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(satis > 0, (magaza + sevk) / satis, 999)
+    plan = sevk_df.assign(**{
+        'Sevk Adet': sevk,
+        'Sevk Sonrası Mğz Cover': np.where(cover < 100, np.round(cover, 1), 999),
+    })
+    return plan, ozet
@@ -0,0 +1,84 @@
+"""
+SANAL PLANNER - Sonuç Deposu
+Analiz sonuçlarını kolonsal tablolar olarak tutan süreç geneli depo
+
+Oturum sadece sonucun kimliğini (id) tutar; tablolar DataFrame olarak
+depoda kalır. Her yeniden çizimde list-of-dict -> DataFrame dönüşümü
+yapılmaz, sekmeler doğrudan bu tabloları filtreler.
+"""
+
+import os
+import threading
+import uuid
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+SONUC_AYARLARI = {
+    # En fazla bu kadar sonuç tutulur, fazlası en eski kullanılandan silinir
+    "kapasite": int(os.environ.get("SANAL_PLANNER_SONUC_KAPASITE", 64)),
+}
+
+# =============================================================================
+# DEPO
+# =============================================================================
+
+@dataclass
+class AnalizSonucu:
+    trading: pd.DataFrame
+    rapor: str
+    sevk: pd.DataFrame
+    indirim: pd.DataFrame
+
+
+class SonucDeposu:
+    """id -> AnalizSonucu, kapasite sınırlı LRU"""
+
+    def __init__(self, kapasite: int):
+        self.kapasite = kapasite
+        self._kayitlar: "OrderedDict[str, AnalizSonucu]" = OrderedDict()
+        self._kilit = threading.Lock()
+
+    def kaydet(self, sonuc: AnalizSonucu) -> str:
+        """Sonucu sakla, kimliğini döndür"""
+        kimlik = uuid.uuid4().hex
+        with self._kilit:
+            self._kayitlar[kimlik] = sonuc
+            while len(self._kayitlar) > self.kapasite:
+                self._kayitlar.popitem(last=False)
+        return kimlik
+
+    def getir(self, kimlik: Optional[str]) -> Optional[AnalizSonucu]:
+        """Sonucu döndür (silinmişse veya kimlik yoksa None)"""
+        if kimlik is None:
+            return None
+        with self._kilit:
+            sonuc = self._kayitlar.get(kimlik)
+            if sonuc is not None:
+                self._kayitlar.move_to_end(kimlik)
+            return sonuc
+
+    def sil(self, kimlik: Optional[str]) -> None:
+        with self._kilit:
+            self._kayitlar.pop(kimlik, None)
+
+    def __len__(self) -> int:
+        return len(self._kayitlar)
+
+
+_varsayilan: Optional[SonucDeposu] = None
+_varsayilan_kilit = threading.Lock()
+
+
+def varsayilan_sonuc_deposu() -> SonucDeposu:
+    """SONUC_AYARLARI ile kurulan süreç geneli depo"""
+    global _varsayilan
+    with _varsayilan_kilit:
+        if _varsayilan is None:
+            _varsayilan = SonucDeposu(SONUC_AYARLARI["kapasite"])
+    return _varsayilan
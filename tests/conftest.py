@@ -0,0 +1,173 @@
+"""Ortak test düzeneği: yerel sahte Messages API sunucusu ve küçük küp"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import pytest
+
+from izleme import IZLEME_AYARLARI
+
+
+@pytest.fixture(autouse=True)
+def _iz_dosyasi_kapali(monkeypatch):
+    """Testler kullanıcının izleme dosyasına yazmasın"""
+    monkeypatch.setitem(IZLEME_AYARLARI, "dosya", "")
+
+
+# =============================================================================
+# SAHTE API
+# =============================================================================
+
+def kullanim(girdi: int = 10, cikti: int = 5, okunan: int = 0, yazilan: int = 0) -> dict:
+    return {"input_tokens": girdi, "output_tokens": cikti,
+            "cache_read_input_tokens": okunan, "cache_creation_input_tokens": yazilan}
+
+
+def metin_cevabi(metin: str, **usage) -> dict:
+    return {"content": [{"type": "text", "text": metin}], "stop_reason": "end_turn",
+            "usage": kullanim(**usage)}
+
+
+def arac_cevabi(*cagrilar: tuple, metin: Optional[str] = None, **usage) -> dict:
+    """cagrilar: (id, araç adı, girdi) - model bu araçları çağırır"""
+    icerik = [{"type": "text", "text": metin}] if metin else []
+    icerik += [{"type": "tool_use", "id": kimlik, "name": ad, "input": girdi} for kimlik, ad, girdi in cagrilar]
+    return {"content": icerik, "stop_reason": "tool_use", "usage": kullanim(**usage)}
+
+
+def hata_cevabi(durum: int, retry_after: Optional[str] = None) -> dict:
+    basliklar = {"retry-after": retry_after} if retry_after is not None else {}
+    return {"durum": durum, "basliklar": basliklar,
+            "govde": {"type": "error", "error": {"type": "api_error", "message": f"sahte {durum}"}}}
+
+
+class SahteAPI:
+    """POST /v1/messages için sırayla senaryo cevapları veren yerel sunucu
+
+    cevaplar: Sırayla tüketilen cevaplar (metin_cevabi, arac_cevabi,
+    hata_cevabi); liste biterse son cevap tekrarlanır. Bir cevap çağrılabilir
+    ise istek gövdesiyle çağrılır. gecikme: her cevaptan önce bekleme (sn),
+    cevaptaki "gecikme" anahtarı onu ezer.
+    """
+
+    def __init__(self):
+        self.cevaplar: List[object] = []
+        self.istekler: List[dict] = []
+        self.gecikme = 0.0
+        self.aktif = 0
+        self.en_cok_aktif = 0
+        self._kilit = threading.Lock()
+        self._sunucu = ThreadingHTTPServer(("127.0.0.1", 0), self._isleyici())
+        self._sunucu.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._sunucu.server_address[1]}"
+        threading.Thread(target=self._sunucu.serve_forever, daemon=True).start()
+
+    def kapat(self) -> None:
+        self._sunucu.shutdown()
+        self._sunucu.server_close()
+
+    def _siradaki(self, govde: dict) -> dict:
+        with self._kilit:
+            self.istekler.append(govde)
+            cevap = self.cevaplar.pop(0) if len(self.cevaplar) > 1 else self.cevaplar[0]
+        return cevap(govde) if callable(cevap) else cevap
+
+    def _isleyici(self):
+        api = self
+
+        class Isleyici(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                govde = json.loads(self.rfile.read(int(self.headers["content-length"])))
+                with api._kilit:
+                    api.aktif += 1
+                    api.en_cok_aktif = max(api.en_cok_aktif, api.aktif)
+                try:
+                    cevap = dict(api._siradaki(govde))
+                    time.sleep(cevap.pop("gecikme", api.gecikme))
+                    if "durum" in cevap:
+                        self._json(cevap["durum"], cevap["govde"], cevap["basliklar"])
+                    elif govde.get("stream"):
+                        self._akis(govde, cevap)
+                    else:
+                        self._json(200, _mesaj(govde, cevap))
+                finally:
+                    with api._kilit:
+                        api.aktif -= 1
+
+            def _json(self, durum: int, veri: dict, basliklar: Optional[dict] = None):
+                ham = json.dumps(veri).encode()
+                self.send_response(durum)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(ham)))
+                for ad, deger in (basliklar or {}).items():
+                    self.send_header(ad, deger)
+                self.end_headers()
+                self.wfile.write(ham)
+
+            def _akis(self, govde: dict, cevap: dict):
+                """Aynı cevabı SSE olayları olarak gönder"""
+                mesaj = _mesaj(govde, cevap)
+                olaylar = [("message_start", {"message": dict(mesaj, content=[], stop_reason=None)})]
+                for i, blok in enumerate(mesaj["content"]):
+                    if blok["type"] == "text":
+                        olaylar.append(("content_block_start", {"index": i, "content_block": {"type": "text", "text": ""}}))
+                        olaylar.append(("content_block_delta", {"index": i, "delta": {"type": "text_delta", "text": blok["text"]}}))
+                    else:
+                        olaylar.append(("content_block_start", {"index": i, "content_block": dict(blok, input={})}))
+                        olaylar.append(("content_block_delta", {"index": i, "delta": {
+                            "type": "input_json_delta", "partial_json": json.dumps(blok["input"])}}))
+                    olaylar.append(("content_block_stop", {"index": i}))
+                olaylar.append(("message_delta", {"delta": {"stop_reason": mesaj["stop_reason"], "stop_sequence": None},
+                                                  "usage": {"output_tokens": mesaj["usage"]["output_tokens"]}}))
+                olaylar.append(("message_stop", {}))
+
+                ham = "".join(f"event: {tip}\ndata: {json.dumps(dict(veri, type=tip))}\n\n" for tip, veri in olaylar).encode()
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("content-length", str(len(ham)))
+                self.end_headers()
+                self.wfile.write(ham)
+
+        return Isleyici
+
+
+def _mesaj(govde: dict, cevap: dict) -> dict:
+    return {"id": "msg_sahte", "type": "message", "role": "assistant", "model": govde.get("model", ""),
+            "stop_sequence": None, **cevap}
+
+
+@pytest.fixture
+def sahte_api(monkeypatch):
+    """Senkron istemciler (anthropic.Anthropic) ANTHROPIC_BASE_URL ile buraya gider"""
+    api = SahteAPI()
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", api.url)
+    yield api
+    api.kapat()
+
+
+@pytest.fixture(scope="session")
+def kup():
+    from agent_tools import KupVeri
+    from veri_uretici import trading_raporu_uret, urun_raporu_uret
+
+    urun = urun_raporu_uret(500)
+    return KupVeri.tablolardan(trading_raporu_uret(urun), urun)
+
+
+def isaretler(govde: dict) -> List[str]:
+    """İstekteki cache_control işaretlerinin yerleri"""
+    yerler = [f"system[{i}]" for i, b in enumerate(govde.get("system", [])) if "cache_control" in b]
+    yerler += [f"tools[{i}]" for i, t in enumerate(govde.get("tools", [])) if "cache_control" in t]
+    for i, mesaj in enumerate(govde["messages"]):
+        if isinstance(mesaj["content"], list):
+            yerler += [f"messages[{i}][{j}]" for j, b in enumerate(mesaj["content"]) if "cache_control" in b]
+    return yerler
+
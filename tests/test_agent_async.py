@@ -0,0 +1,99 @@
+"""AsyncAgent: yeniden deneme, eşzamanlılık sınırı ve süre limitleri (sahte API ile)"""
+
+import asyncio
+import time
+
+import anthropic
+import pytest
+
+from agent_async import AsyncAgent
+from conftest import arac_cevabi, hata_cevabi, metin_cevabi
+
+
+def _calistir(api, kup, mesaj="Durum?", **ayar):
+    async def _():
+        async with AsyncAgent("test", base_url=api.url, **ayar) as agent:
+            return await agent.calistir(kup, mesaj)
+    return asyncio.run(_())
+
+
+@pytest.mark.parametrize("durum", [429, 500, 503, 529])
+def test_gecici_hata_yeniden_denenir(sahte_api, kup, durum):
+    sahte_api.cevaplar = [hata_cevabi(durum), hata_cevabi(durum), metin_cevabi("Tamam.")]
+    assert _calistir(sahte_api, kup, bekleme_taban=0.01) == "Tamam."
+    assert len(sahte_api.istekler) == 3
+
+
+def test_kalici_hata_yeniden_denenmez(sahte_api, kup):
+    sahte_api.cevaplar = [hata_cevabi(400), metin_cevabi("Tamam.")]
+    with pytest.raises(anthropic.BadRequestError):
+        _calistir(sahte_api, kup, bekleme_taban=0.01)
+    assert len(sahte_api.istekler) == 1
+
+
+def test_deneme_hakki_bitince_hata(sahte_api, kup):
+    sahte_api.cevaplar = [hata_cevabi(529)]
+    with pytest.raises(anthropic.APIStatusError) as hata:
+        _calistir(sahte_api, kup, bekleme_taban=0.01, max_deneme=3)
+    assert hata.value.status_code == 529
+    assert len(sahte_api.istekler) == 3
+
+
+def test_retry_after_uyulur_ve_sinirlanir(sahte_api, kup):
+    sahte_api.cevaplar = [hata_cevabi(429, retry_after="3600"), hata_cevabi(503, retry_after="0.05"),
+                          metin_cevabi("Tamam.")]
+    baslangic = time.perf_counter()
+    assert _calistir(sahte_api, kup, max_bekleme=0.1) == "Tamam."
+    assert 0.15 <= time.perf_counter() - baslangic < 2
+
+
+def test_semafor_eszamanli_istegi_sinirlar(sahte_api, kup):
+    sahte_api.gecikme = 0.1
+    sahte_api.cevaplar = [metin_cevabi("Tamam.")]
+
+    async def _():
+        async with AsyncAgent("test", base_url=sahte_api.url, max_eszamanli=2) as agent:
+            return await agent.toplu_calistir(kup, [f"Soru {i}" for i in range(6)])
+
+    assert asyncio.run(_()) == ["Tamam."] * 6
+    assert sahte_api.en_cok_aktif == 2
+
+
+def test_istek_zaman_asimi_yeniden_denenir(sahte_api, kup):
+    sahte_api.cevaplar = [dict(metin_cevabi("Geç."), gecikme=1.0), metin_cevabi("Tamam.")]
+    baslangic = time.perf_counter()
+    assert _calistir(sahte_api, kup, istek_zaman_asimi=0.2, bekleme_taban=0.01) == "Tamam."
+    assert time.perf_counter() - baslangic < 1.0
+    assert len(sahte_api.istekler) == 2
+
+
+def test_istek_zaman_asimi_deneme_bitince_hata(sahte_api, kup):
+    sahte_api.cevaplar = [dict(metin_cevabi("Geç."), gecikme=1.0)]
+    with pytest.raises((asyncio.TimeoutError, anthropic.APITimeoutError)):
+        _calistir(sahte_api, kup, istek_zaman_asimi=0.1, bekleme_taban=0.01, max_deneme=2)
+    assert len(sahte_api.istekler) == 2
+
+
+def test_sorgu_sure_limiti_digerlerini_etkilemez(sahte_api, kup):
+    def cevap(govde):
+        yavas = "yavaş" in govde["messages"][0]["content"][-1]["text"]
+        return dict(metin_cevabi("Tamam."), gecikme=1.0 if yavas else 0)
+    sahte_api.cevaplar = [cevap]
+
+    async def _():
+        async with AsyncAgent("test", base_url=sahte_api.url) as agent:
+            return await agent.toplu_calistir(kup, ["hızlı", "yavaş", "hızlı"], sure_limiti=0.3)
+
+    sonuclar = asyncio.run(_())
+    assert sonuclar[0] == sonuclar[2] == "Tamam."
+    assert isinstance(sonuclar[1], asyncio.TimeoutError)
+
+
+def test_araclar_paralel_calisir_ve_sonuclar_tek_mesajda(sahte_api, kup):
+    sahte_api.cevaplar = [
+        arac_cevabi(("t1", "genel_ozet", {}), ("t2", "sorunlu_bul", {"sorun_tipi": "hepsi"})),
+        metin_cevabi("Tamam."),
+    ]
+    assert _calistir(sahte_api, kup) == "Tamam."
+    sonuclar = sahte_api.istekler[1]["messages"][2]["content"]
+    assert [b["tool_use_id"] for b in sonuclar] == ["t1", "t2"]
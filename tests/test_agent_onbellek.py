@@ -0,0 +1,63 @@
+"""Prompt önbelleği işaretleri ve IstekOlcumu token hesabı (sahte API ile)"""
+
+import pytest
+
+from agent_tools import Konusma, agent_akis, agent_calistir, olcum_ozeti
+from conftest import arac_cevabi, isaretler, metin_cevabi
+
+
+def _senaryo(api):
+    api.cevaplar = [
+        arac_cevabi(("t1", "genel_ozet", {}), girdi=100, cikti=20, yazilan=3000),
+        metin_cevabi("Özet hazır.", girdi=50, cikti=30, okunan=3000, yazilan=200),
+    ]
+
+
+def _akis_cevabi(api_key, kup, mesaj, **kw):
+    olaylar = list(agent_akis(api_key, kup, mesaj, **kw))
+    assert olaylar[-1].tip == "bitti"
+    return olaylar[-1].veri
+
+
+@pytest.mark.parametrize("calistir", [agent_calistir, _akis_cevabi], ids=["tek", "akis"])
+def test_uc_onbellek_noktasi(sahte_api, kup, calistir):
+    _senaryo(sahte_api)
+    assert calistir("test", kup, "Genel durum?") == "Özet hazır."
+
+    ilk, ikinci = sahte_api.istekler
+    assert isaretler(ilk) == [
+        f"system[{len(ilk['system']) - 1}]", f"tools[{len(ilk['tools']) - 1}]", "messages[0][0]",
+    ]
+    # Kayan nokta: önceki mesajın işareti kalkar, sadece son araç sonucu işaretli
+    assert isaretler(ikinci)[:2] == isaretler(ilk)[:2]
+    assert isaretler(ikinci)[2:] == [f"messages[2][{len(ikinci['messages'][2]['content']) - 1}]"]
+    assert ikinci["messages"][2]["content"][-1]["type"] == "tool_result"
+
+
+def test_konusma_takip_sorusu_da_uc_nokta(sahte_api, kup):
+    konusma = Konusma()
+    _senaryo(sahte_api)
+    agent_calistir("test", kup, "Genel durum?", konusma=konusma)
+    sahte_api.cevaplar = [metin_cevabi("Tamam.")]
+    agent_calistir("test", kup, "Peki kozmetik?", konusma=konusma)
+
+    son = sahte_api.istekler[-1]
+    assert len(isaretler(son)) == 3
+    assert isaretler(son)[-1] == f"messages[{len(son['messages']) - 1}][0]"
+
+
+@pytest.mark.parametrize("calistir", [agent_calistir, _akis_cevabi], ids=["tek", "akis"])
+def test_istek_olcumu_token_hesabi(sahte_api, kup, calistir):
+    _senaryo(sahte_api)
+    olcumler = []
+    calistir("test", kup, "Genel durum?", olcumler=olcumler)
+
+    assert [(o.iterasyon, o.girdi_token, o.onbellek_okunan_token, o.onbellek_yazilan_token, o.cikti_token)
+            for o in olcumler] == [(1, 100, 0, 3000, 20), (2, 50, 3000, 200, 30)]
+    assert all(o.sure_sn >= 0 for o in olcumler)
+
+    ozet = olcum_ozeti(olcumler)
+    assert ozet["istek"] == 2
+    assert (ozet["girdi_token"], ozet["onbellek_okunan_token"], ozet["onbellek_yazilan_token"],
+            ozet["cikti_token"]) == (150, 3000, 3200, 50)
+    assert ozet["onbellek_orani"] == pytest.approx(3000 / (150 + 3000 + 3200))
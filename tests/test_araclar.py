@@ -0,0 +1,50 @@
+"""Agent araçlarının hatalı girdilere cevabı"""
+
+import numpy as np
+import pytest
+
+from agent_tools import (SORUN_TIPLERI, KupVeri, arac_calistir, kategori_analiz, sku_detay,
+                         sku_toplu_detay, sorunlu_bul)
+from veri_uretici import trading_raporu_uret, urun_raporu_uret
+
+
+@pytest.mark.parametrize("bicim", ["metin", "tsv", "json"])
+def test_bilinmeyen_sorun_tipi_gecerlileri_soyler(kup, bicim):
+    cevap = sorunlu_bul(kup, "stok_fazlasi", bicim=bicim)
+    assert cevap.startswith("Bilinmeyen sorun tipi: stok_fazlasi")
+    assert all(tip in cevap for tip in [*SORUN_TIPLERI, "hepsi"])
+
+
+def test_arac_uzerinden_bilinmeyen_sorun_tipi(kup):
+    cevap = arac_calistir(kup, "sorunlu_bul", {"sorun_tipi": "Stok_Fazlasi"}, bicim="metin")
+    assert "Bilinmeyen sorun tipi: stok_fazlasi" in cevap
+
+
+@pytest.mark.parametrize("tip", list(SORUN_TIPLERI))
+def test_gecerli_sorun_tipi_listeler(kup, tip):
+    cevap = sorunlu_bul(kup, tip)
+    assert cevap.startswith(f"=== SORUNLU SKU TARAMASI ({tip}) ===")
+    assert "Toplam:" in cevap
+
+
+def test_onbellekten_gelen_baslik_yazima_bagli_degil(kup):
+    ilk = arac_calistir(kup, "kategori_analiz", {"kategori": "cilt bakim"}, bicim="metin")
+    ikinci = arac_calistir(kup, "kategori_analiz", {"kategori": "CİLT BAKIM"}, bicim="metin")
+    assert ilk is ikinci
+    assert ilk.startswith("=== CİLT BAKIM KATEGORİ ANALİZİ ===")
+
+    kod = kup.urun['Ürün Kodu'].iloc[0]
+    cevap = arac_calistir(kup, "sku_detay", {"sku_kod": f" {kod}.0"}, bicim="metin")
+    assert cevap.startswith(f"=== SKU DETAY: {kod} ===")
+
+
+def test_bos_magaza_stogu_oneride_sevk_sayilmaz():
+    """Öneri boş mağaza stoğunu 0 saymaz ('Stok dengeli'); kategori listesi sayar"""
+    urun = urun_raporu_uret(200)
+    urun.loc[0, ['Anlık Depo Stok Adet', 'Anlık Mğz Stok Adet', 'TW Adet', 'LW Adet']] = [500, np.nan, 50, 50]
+    kup = KupVeri.tablolardan(trading_raporu_uret(urun), urun)
+    kod = str(urun.loc[0, 'Ürün Kodu'])
+
+    assert sku_detay(kup, kod).endswith("✅ Stok dengeli - İzlemeye devam")
+    assert sku_toplu_detay(kup, [kod]).splitlines()[-1].endswith("| OK")
+    assert f"  {kod} | Depo: 500 | Mağaza: nan" in kategori_analiz(kup, urun.loc[0, 'Kategori '], limit=200)
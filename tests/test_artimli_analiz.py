@@ -0,0 +1,86 @@
+"""Artımlı sınıflandırma: her hafta tam hesaplamayla aynı tablo, durum dosyası ek ile güncel"""
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from artimli_analiz import ArtimliSiniflandirici
+from benchmark import _hafta_degistir
+from planner_agent import calistir, sku_metrikleri_hazirla, sku_siniflandir
+from veri_uretici import KATEGORILER, urun_raporu_uret
+
+SORUNLU = KATEGORILER[:2]
+
+
+def _haftalar():
+    """Sırayla: ilk hafta, küçük değişim, SKU kalkar + ad değişir, sıra ters + eski SKU'lar döner"""
+    urun = urun_raporu_uret(3_000, 8, 4)
+    # Aynı kod iki satırda (tekrar numarasıyla eşleşir)
+    urun = pd.concat([urun, urun.iloc[:20]], ignore_index=True)
+    yield urun
+    hafta = _hafta_degistir(urun, 0.01, 1)
+    yield hafta
+    hafta = _hafta_degistir(hafta, 0.02, 2).drop(index=range(100, 160)).reset_index(drop=True)
+    hafta.loc[:300, 'Ürün '] = "Yeni ad"  # Girdisi aynı, tabloda adı değişmeli
+    yield hafta
+    yield pd.concat([hafta.iloc[::-1], urun.iloc[100:130]], ignore_index=True)
+
+
+def _kontrol(artimli: ArtimliSiniflandirici, urun: pd.DataFrame) -> None:
+    metrik = sku_metrikleri_hazirla(urun.copy())
+    pd.testing.assert_frame_equal(artimli.siniflandir(metrik, SORUNLU), sku_siniflandir(metrik, SORUNLU))
+
+
+def test_her_hafta_tam_hesaplamayla_ayni(tmp_path):
+    artimli = ArtimliSiniflandirici(dosya=str(tmp_path / "durum.parquet"), ek_oran=1.0)
+    for no, urun in enumerate(_haftalar()):
+        _kontrol(artimli, urun)
+        assert artimli.son_ozet.tam == (no == 0)
+    assert artimli.son_ozet.kalkan_sku == 0 and artimli.son_ozet.yeni_sku == 30
+
+
+def test_dosyadan_devam_eden_surec_ayni(tmp_path):
+    """Her hafta yeni nesne: durum tam yazım + ek dosyasından kurulur, fark kesintisiz süreçle aynı"""
+    surekli = ArtimliSiniflandirici(dosya=str(tmp_path / "surekli.parquet"), ek_oran=1.0)
+    dosya = str(tmp_path / "durum.parquet")
+    for no, urun in enumerate(_haftalar()):
+        artimli = ArtimliSiniflandirici(dosya=dosya, ek_oran=1.0)
+        _kontrol(artimli, urun)
+        _kontrol(surekli, urun)
+        assert artimli.son_ozet == surekli.son_ozet
+        pd.testing.assert_frame_equal(artimli.son_fark, surekli.son_fark, check_dtype=False)
+        assert os.path.exists(str(tmp_path / "durum.ek.parquet")) == (no > 0)
+
+
+def test_ek_buyuyunce_durum_bastan_yazilir(tmp_path):
+    dosya = tmp_path / "durum.parquet"
+    artimli = ArtimliSiniflandirici(dosya=str(dosya), ek_oran=0.02)
+    haftalar = _haftalar()
+    _kontrol(artimli, next(haftalar))
+    ilk = dosya.stat().st_mtime_ns
+
+    _kontrol(artimli, next(haftalar))  # %1 değişti: sadece ek yazılır
+    assert dosya.stat().st_mtime_ns == ilk
+    assert (tmp_path / "durum.ek.parquet").exists()
+
+    _kontrol(artimli, next(haftalar))  # Ek %2'yi aştı
+    assert dosya.stat().st_mtime_ns != ilk
+    assert not (tmp_path / "durum.ek.parquet").exists()
+
+
+def test_bozuk_ek_dosyasi_sonucu_bozmaz(tmp_path):
+    dosya = str(tmp_path / "durum.parquet")
+    haftalar = list(_haftalar())
+    ArtimliSiniflandirici(dosya=dosya, ek_oran=1.0).siniflandir(sku_metrikleri_hazirla(haftalar[0].copy()), SORUNLU)
+    ArtimliSiniflandirici(dosya=dosya, ek_oran=1.0).siniflandir(sku_metrikleri_hazirla(haftalar[1].copy()), SORUNLU)
+    (tmp_path / "durum.ek.parquet").write_bytes(b"bozuk")
+
+    _kontrol(ArtimliSiniflandirici(dosya=dosya, ek_oran=1.0), haftalar[2])
+
+
+def test_isci_ile_birlikte_verilemez(tmp_path):
+    with pytest.raises(ValueError, match="isci"):
+        calistir(artimli=ArtimliSiniflandirici(dosya=str(tmp_path / "durum.parquet")), isci=2)
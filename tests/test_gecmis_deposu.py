@@ -0,0 +1,40 @@
+"""Geçmiş deposu: ürün kodları yazıldığı gibi geri okunur"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from gecmis_deposu import GecmisDeposu
+
+
+def _urun(kodlar) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Ürün Kodu': kodlar,
+        'Ürün ': [f"Ürün {i}" for i in range(len(kodlar))],
+        'Kategori ': "GIDA",
+        'ÜMG': "ÜMG",
+        'Marka ': "Marka",
+        'TW Adet': range(len(kodlar)),
+    })
+
+
+def _trading() -> pd.DataFrame:
+    return pd.DataFrame({'Kategori': ["GIDA"], 'Ciro': [1.0]})
+
+
+def test_bastaki_sifirlar_korunur(tmp_path):
+    depo = GecmisDeposu(str(tmp_path))
+    depo.hafta_ekle("2026-W40", _trading(), _urun(["00123", "456", "0"]))
+
+    okunan = GecmisDeposu(str(tmp_path)).urun_oku(kolonlar=['TW Adet'])
+    assert okunan['Ürün Kodu'].tolist() == ["00123", "456", "0"]
+
+
+def test_sayisal_kodlar_int64_doner(tmp_path):
+    depo = GecmisDeposu(str(tmp_path))
+    depo.hafta_ekle("2026-W40", _trading(), _urun([1000001, 1000002]))
+
+    okunan = depo.urun_oku(kolonlar=['TW Adet'])
+    assert okunan['Ürün Kodu'].dtype == "int64"
+    assert okunan['Ürün Kodu'].tolist() == [1000001, 1000002]
@@ -0,0 +1,63 @@
+"""İzleme: üreteç aralıkları tüketiciye sızmaz, dosya çıktısı isteğe bağlı"""
+
+import contextvars
+import json
+import os
+import subprocess
+import sys
+
+from agent_tools import agent_akis
+from conftest import arac_cevabi, metin_cevabi
+from izleme import IZLEME_AYARLARI, aralik, gecerli_aralik
+
+
+def test_akis_araliklari_tuketiciye_sizmaz(sahte_api, kup):
+    sahte_api.cevaplar = [arac_cevabi(("t1", "genel_ozet", {}), metin="Bakıyorum."), metin_cevabi("Tamam.")]
+
+    with aralik("sorgu") as sorgu:
+        olaylar = []
+        for olay in agent_akis("test", kup, "Durum?"):
+            assert gecerli_aralik() is sorgu
+            olaylar.append(olay.tip)
+        assert gecerli_aralik() is sorgu
+    assert gecerli_aralik() is None
+    assert olaylar[-1] == "bitti" and "arac_sonuc" in olaylar
+
+    # Ağaç: sorgu > agent_akis > iterasyon > (api_istegi, araclar > arac:genel_ozet)
+    araliklar = {a.kimlik: a for a in sorgu.iz.araliklar}
+    def yol(a):
+        return [a.ad] if a.ust is None else yol(araliklar[a.ust]) + [a.ad]
+    yollar = {"/".join(yol(a)) for a in araliklar.values()}
+    assert "sorgu/agent_akis/iterasyon/api_istegi" in yollar
+    assert "sorgu/agent_akis/iterasyon/araclar/arac:genel_ozet" in yollar
+
+
+def test_yarida_birakilan_akis_baska_baglamda_kapatilir(sahte_api, kup):
+    sahte_api.cevaplar = [metin_cevabi("Uzun cevap.")]
+    akis = agent_akis("test", kup, "Durum?")
+    assert next(akis).tip == "metin"
+    assert gecerli_aralik() is None
+
+    # Streamlit gibi: üreteç başka bir bağlamda kapatılır - hata yutulmadan temiz kapanmalı
+    contextvars.copy_context().run(akis.close)
+    assert gecerli_aralik() is None
+
+
+def test_dosya_varsayilan_kapali():
+    ortam = {k: v for k, v in os.environ.items() if k != "SANAL_PLANNER_IZ_DOSYASI"}
+    cikti = subprocess.run(
+        [sys.executable, "-c", "import izleme; print(repr(izleme.IZLEME_AYARLARI['dosya']))"],
+        env=ortam, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert cikti == "''"
+
+
+def test_dosya_verilirse_kok_bitince_yazilir(tmp_path, monkeypatch):
+    dosya = tmp_path / "izler.jsonl"
+    monkeypatch.setitem(IZLEME_AYARLARI, "dosya", str(dosya))
+    with aralik("kok"):
+        with aralik("alt", satir=3):
+            pass
+    satirlar = [json.loads(s) for s in dosya.read_text(encoding="utf-8").splitlines()]
+    assert [s["ad"] for s in satirlar] == ["alt", "kok"]
+    assert satirlar[0]["ozellik"] == {"satir": 3}
@@ -0,0 +1,44 @@
+"""Konusma: soru mesajları tur sınırıdır, sıkıştırma turu ortadan bölmez"""
+
+from agent_tools import Konusma, _soru_mesaji_mi
+
+
+def _tur(no: int, arac_sonucu: str = "satır\n" * 200) -> list:
+    """Bir soru, bir araç çağrısı ve sonucu"""
+    return [
+        {"role": "user", "content": f"Soru {no}"},
+        {"role": "assistant", "content": [{"type": "tool_use", "id": f"t{no}", "name": "genel_ozet", "input": {}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"t{no}", "content": arac_sonucu}]},
+    ]
+
+
+def test_arac_sonucuyla_biten_gecmise_soru_ayri_mesaj(kup):
+    konusma = Konusma()
+    konusma.kup_surum = kup.surum
+    konusma.messages = _tur(1)  # İterasyon sınırında araç sonucuyla bitti
+
+    messages = konusma.baslat(kup, "Soru 2")
+    assert messages[-2] == konusma.messages[-1]
+    assert messages[-1] == {"role": "user", "content": "Soru 2"}
+    assert _soru_mesaji_mi(messages[-1])
+    assert not _soru_mesaji_mi(messages[-2])
+
+
+def test_sikistirma_son_soruyu_ve_tur_butunlugunu_korur(kup):
+    konusma = Konusma(token_butcesi=300, ozet_satir=2)
+    konusma.kup_surum = kup.surum
+    konusma.messages = _tur(1) + _tur(2)
+
+    messages = konusma.baslat(kup, "Soru 3")
+    messages += [
+        {"role": "assistant", "content": [{"type": "tool_use", "id": "t3", "name": "genel_ozet", "input": {}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t3", "content": "x" * 3000}]},
+    ]
+    konusma.sikistir(messages)
+
+    # Eski turlar atıldı; liste son sorunun başından başlar, araç sonucu öksüz kalmaz
+    assert messages[0] == {"role": "user", "content": "Soru 3"}
+    kullanilan = {b["id"] for m in messages if m["role"] == "assistant" for b in m["content"]}
+    sonuclar = {b["tool_use_id"] for m in messages if isinstance(m["content"], list)
+                for b in m["content"] if b.get("type") == "tool_result"}
+    assert sonuclar <= kullanilan
@@ -0,0 +1,64 @@
+"""Kural dosyası doğrulama: hatalı dosyada önceki kural seti korunur"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from kural_motoru import KURAL_TANIMLARI, KuralMotoru, KuralVerisi, derle
+
+
+def _veri(n: int = 50) -> KuralVerisi:
+    rng = np.random.default_rng(0)
+    satis = rng.uniform(0, 100, n)
+    depo, magaza = rng.uniform(0, 1000, n), rng.uniform(0, 300, n)
+    return KuralVerisi({
+        "depo_stok": depo, "magaza_stok": magaza, "toplam_stok": depo + magaza,
+        "haftalik_satis": satis, "cover_hafta": (depo + magaza) / satis,
+        "magaza_cover": magaza / satis, "satis_sirasi": np.arange(n),
+    })
+
+
+@pytest.mark.parametrize("deger", ["abc", True, None, [1], float("nan")])
+def test_sayi_olmayan_esik_reddedilir(deger):
+    tanim = {**KURAL_TANIMLARI, "esikler": {**KURAL_TANIMLARI["esikler"], "sevk_depo_min": deger}}
+    with pytest.raises(ValueError, match="sevk_depo_min"):
+        derle(tanim)
+
+
+def test_hatali_dosyada_onceki_set_kalir(tmp_path):
+    dosya = tmp_path / "kurallar.json"
+    dosya.write_text(json.dumps({"esikler": {"sevk_depo_min": 250}}))
+    motor = KuralMotoru(dosya=str(dosya))
+    assert motor.esikler["sevk_depo_min"] == 250
+    onceki = motor.guncel()
+
+    dosya.write_text(json.dumps({"esikler": {"sevk_depo_min": "abc"}}))
+    os.utime(dosya, ns=(0, os.stat(dosya).st_mtime_ns + 1_000_000))
+    assert motor.guncel() is onceki
+    assert "sevk_depo_min" in motor.son_hata
+
+    # Önceki setle sınıflandırma çalışmaya devam eder
+    aksiyon, oncelik = motor.siniflandir("sku_siniflandirma", _veri())
+    assert len(aksiyon) == len(oncelik) == 50
+
+
+def test_maske_onbellegi_sinirli():
+    """Eşik her değiştiğinde yeni maske - en son kullanılanlar kalır, eskiler atılır"""
+    motor, veri = KuralMotoru(), _veri()
+    beklenen = motor.siniflandir("sku_siniflandirma", veri)
+    for cover in range(1, 200):
+        motor.siniflandir("sku_siniflandirma", veri, {"sevk_tetik_cover": cover})
+        assert len(veri._maskeler) <= KuralVerisi.MASKE_KAPASITESI
+
+    # İleri geri kaydırma: önceki eşiklerin maskeleri yeniden hesaplanmaz
+    motor.siniflandir("sku_siniflandirma", veri, {"sevk_tetik_cover": 2})
+    motor.istatistik_sifirla()
+    motor.siniflandir("sku_siniflandirma", veri, {"sevk_tetik_cover": 199})
+    motor.siniflandir("sku_siniflandirma", veri, {"sevk_tetik_cover": 2})
+    assert motor.istatistik()["hesaplama"].sum() == 0
+
+    aksiyon, oncelik = motor.siniflandir("sku_siniflandirma", veri)
+    np.testing.assert_array_equal(aksiyon, beklenen[0])
+    np.testing.assert_array_equal(oncelik, beklenen[1])
@@ -0,0 +1,32 @@
+"""Parçalı analiz seri yolla (analiz_et) aynı rapor ve tabloları verir"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from paralel_analiz import PARALEL_AYARLARI, paralel_analiz_et
+from planner_agent import analiz_et, sku_metrikleri_hazirla
+from veri_uretici import trading_raporu_uret, urun_raporu_uret
+
+
+@pytest.fixture
+def urun() -> pd.DataFrame:
+    urun = urun_raporu_uret(4_000, 8, 4)
+    urun.loc[::97, 'Kategori '] = np.nan
+    # Aynı kod farklı kategoride de geçer (kategori parçalamasında ayrı parçalara düşer)
+    return pd.concat([urun, urun.iloc[:40].assign(**{'Kategori ': urun['Kategori '].iloc[-1]})],
+                     ignore_index=True)
+
+
+@pytest.mark.parametrize("yontem", ["kategori", "kod"])
+@pytest.mark.parametrize("kurallar", [None, {"top_sku_sayisi": 30, "sevk_tetik_cover": 6}])
+def test_seri_yolla_ayni(monkeypatch, urun, yontem, kurallar):
+    monkeypatch.setitem(PARALEL_AYARLARI, "min_satir", 0)
+    trading = trading_raporu_uret(urun)
+
+    rapor, sevk_df, indirim_df = analiz_et(trading, sku_metrikleri_hazirla(urun.copy()), kurallar)
+    p_rapor, p_sevk_df, p_indirim_df = paralel_analiz_et(trading, urun.copy(), kurallar, isci=3, yontem=yontem)
+
+    assert p_rapor == rapor
+    pd.testing.assert_frame_equal(p_sevk_df, sevk_df)
+    pd.testing.assert_frame_equal(p_indirim_df, indirim_df)
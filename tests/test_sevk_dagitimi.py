@@ -0,0 +1,95 @@
+"""Vektörel sevk dağıtımı SKU döngüsüyle (benchmark._sevk_dagit_dongu) aynı mı"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import _sevk_dagit_dongu
+from sevk_dagitimi import SEVK_AYARLARI, sevk_dagit, sevk_planla
+
+# Cover hedefleri: min 8, max 12 hafta
+KURALLAR = {"cover_magaza_min": 8, "cover_magaza_max": 12}
+
+
+@pytest.fixture(autouse=True)
+def _sinirsiz(monkeypatch):
+    monkeypatch.setitem(SEVK_AYARLARI, "haftalik_kapasite", None)
+
+
+def _skular(n: int = 2_000, tohum: int = 11):
+    rng = np.random.default_rng(tohum)
+    satis = np.round(rng.gamma(2.0, 40.0, n) + 10, 1)
+    magaza = np.floor(satis * rng.uniform(0, 10, n))
+    depo = rng.integers(0, 2_000, n).astype(float)
+    oncelik = rng.integers(1, 4, n)
+    return depo, magaza, satis, oncelik
+
+
+def parite_kontrol(depo, magaza, satis, oncelik, kapasite) -> np.ndarray:
+    sevk, ozet = sevk_dagit(depo, magaza, satis, oncelik, KURALLAR, kapasite)
+    beklenen = _sevk_dagit_dongu(depo.tolist(), magaza.tolist(), satis.tolist(),
+                                 oncelik.tolist(), KURALLAR, kapasite)
+    np.testing.assert_array_equal(sevk, beklenen)
+    assert ozet.sevk == sevk.sum()
+    return sevk
+
+
+def test_sinirsiz_kapasite_max_hedef_depoyla_sinirli():
+    depo = np.array([1_000.0, 30, 1_000, 0])
+    magaza = np.array([20.0, 20, 200, 0])
+    satis = np.array([10.0, 10, 10, 10])
+    sevk = parite_kontrol(depo, magaza, satis, np.ones(4, dtype=int), None)
+    # Max hedef 12 x 10 - 20 = 100; depoda 30 varsa 30; mağaza zaten dolu; depo boş
+    assert sevk.tolist() == [100, 30, 0, 0]
+
+    depo, magaza, satis, oncelik = _skular()
+    sevk = parite_kontrol(depo, magaza, satis, oncelik, None)
+    np.testing.assert_array_equal(sevk, np.clip(np.floor(satis * 12) - magaza, 0, depo))
+
+
+def test_kapasite_min_ihtiyactan_az_oncelik_sirasiyla_dolar():
+    # Sıra: A (öncelik 1), B (öncelik 2, satış yüksek), C (öncelik 2)
+    depo = np.full(3, 1_000.0)
+    magaza = np.zeros(3)
+    satis = np.array([20.0, 10, 50])           # C, A, B
+    oncelik = np.array([2, 1, 2])
+    sevk, ozet = sevk_dagit(depo, magaza, satis, oncelik, KURALLAR, kapasite=500)
+    # Min ihtiyaçlar: A 80, B 400, C 160 -> A ve B tam, C kalan 20'yi alır
+    assert sevk.tolist() == [20, 80, 400]
+    assert ozet.min_karsilanan == 2 and ozet.sevk == 500
+    parite_kontrol(depo, magaza, satis, oncelik, 500)
+
+
+@pytest.mark.parametrize("oran", [0.05, 0.5, 0.9])
+def test_kapasiteli_dagitim_donguyle_ayni(oran):
+    depo, magaza, satis, oncelik = _skular()
+    _, ozet = sevk_dagit(depo, magaza, satis, oncelik, KURALLAR)
+    sevk = parite_kontrol(depo, magaza, satis, oncelik, ozet.ihtiyac_max * oran)
+    assert sevk.sum() == int(ozet.ihtiyac_max * oran)
+
+
+def test_bos_ve_sifir_satis_eksi_magaza_stogu():
+    depo = np.array([500.0, 500, 500, np.nan, -50, 500])
+    magaza = np.array([10.0, np.nan, -30, 0, 0, -5])
+    satis = np.array([np.nan, 10, 10, 10, 10, 0])
+    sevk, _ = sevk_dagit(depo, magaza, satis, np.ones(6, dtype=int), KURALLAR)
+    # Satışı boş/sıfır SKU sadece eksi stoğu kapatır; boş mağaza stoğu 0, boş/eksi depo 0 sayılır
+    assert sevk.tolist() == [0, 120, 150, 0, 0, 5]
+    temiz = [np.nan_to_num(d) for d in (depo, magaza, satis)]
+    parite_kontrol(*temiz, np.ones(6, dtype=int), None)
+    parite_kontrol(*temiz, np.ones(6, dtype=int), 200)
+
+
+def test_sevk_sonrasi_magaza_cover():
+    sevk_df = pd.DataFrame({
+        'Öncelik': [1, 1, 2, 2],
+        'Depo Stok': [1_000.0, 1_000, 1_000, 1_000],
+        'Mağaza Stok': [20.0, 50, 5_000, 10],
+        'Haftalık Satış': [10.0, 3, 10, np.nan],
+    })
+    plan, ozet = sevk_planla(sevk_df, KURALLAR)
+    assert plan['Sevk Adet'].tolist() == [100, 0, 0, 0]
+    # (20 + 100) / 10 = 12; 50 / 3 = 16.67 -> 16.7; 500 hafta ve satışsız SKU 999
+    assert plan['Sevk Sonrası Mğz Cover'].tolist() == [12.0, 16.7, 999, 999]
+    assert ozet.sku == 4
+    pd.testing.assert_frame_equal(plan[sevk_df.columns], sevk_df)
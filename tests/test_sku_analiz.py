@@ -0,0 +1,66 @@
+"""Vektörel SKU analizi eski satır döngüsüyle (benchmark.sku_analiz_dongu) aynı mı"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import sku_analiz_dongu
+from planner_agent import SKUBulgu, sku_analiz
+from veri_uretici import KATEGORILER, urun_raporu_uret
+
+SORUNLU = KATEGORILER[:2]
+
+
+def _bulgu_anahtari(b: SKUBulgu) -> tuple:
+    """Karşılaştırma için bulguyu NaN-güvenli tuple'a çevir"""
+    haftalik = None if pd.isna(b.haftalik_satis) else round(b.haftalik_satis, 9)
+    return (b.sku_kod, b.sku_adi, b.kategori, b.depo_stok, b.magaza_stok, haftalik,
+            round(b.cover_hafta, 9), b.indirim_orani, b.aksiyon, b.oncelik)
+
+
+def parite_kontrol(urun: pd.DataFrame, sorunlu_kategoriler=SORUNLU) -> None:
+    beklenen = list(map(_bulgu_anahtari, sku_analiz_dongu(urun.copy(), sorunlu_kategoriler)))
+    gelen = list(map(_bulgu_anahtari, sku_analiz(urun.copy(), sorunlu_kategoriler)))
+    assert len(beklenen) == len(gelen)
+
+    # NaN satış varsa eski sürümün sıralaması tanımsız, sadece içerik karşılaştırılır
+    if any(b[5] is None for b in beklenen):
+        assert sorted(beklenen, key=repr) == sorted(gelen, key=repr)
+    else:
+        assert beklenen == gelen
+
+
+def test_bos_satisli_rapor():
+    parite_kontrol(urun_raporu_uret(5_000))
+
+
+def test_dolu_rapor_sirasi():
+    parite_kontrol(urun_raporu_uret(5_000, tohum=7, bos_oran=0))
+
+
+def test_bos_stok_sifir_sayilir():
+    urun = urun_raporu_uret(3_000, tohum=3, bos_oran=0)
+    urun['Anlık Depo Stok Adet'] = urun['Anlık Depo Stok Adet'].astype(float)
+    urun['Anlık Mğz Stok Adet'] = urun['Anlık Mğz Stok Adet'].astype(float)
+    urun.loc[urun.index[::40], 'Anlık Depo Stok Adet'] = np.nan
+    urun.loc[urun.index[5::40], 'Anlık Mğz Stok Adet'] = np.nan
+
+    parite_kontrol(urun)
+    bulgular = sku_analiz(urun.copy(), SORUNLU)
+    assert min(b.depo_stok for b in bulgular) >= 0
+    assert min(b.magaza_stok for b in bulgular) >= 0
+
+
+@pytest.mark.parametrize("adim", [10, 50])
+def test_esit_satis_ve_oncelik(adim):
+    """Aynı öncelik ve satışta satır sırası korunur; top-N sınırında da eşitlik var"""
+    urun = urun_raporu_uret(4_000, tohum=adim, bos_oran=0)
+    urun['TW Adet'] = (urun['TW Adet'] // adim) * adim
+    urun['LW Adet'] = urun['TW Adet']
+    parite_kontrol(urun)
+
+
+def test_tekrarlanan_kodlar():
+    urun = urun_raporu_uret(3_000, tohum=5, bos_oran=0)
+    urun.loc[urun.index[1::3], 'Ürün Kodu'] = urun['Ürün Kodu'].to_numpy()[0:-1:3][:len(urun.index[1::3])]
+    parite_kontrol(urun)
@@ -0,0 +1,206 @@
+"""
+SANAL PLANNER - Sentetik Veri Üretici
+Gerçek rapor formatında trading ve ürün çalışma kitapları üretir
+
+Ürün raporu: kategori payları Zipf dağılımlı, satış talebi log-normal (az
+sayıda çok satan, uzun kuyruk), stok talep x hedef cover etrafında, bir kısım
+SKU ölü stok. Trading raporu ('mtd' sayfası) aynı ürünlerden toplanır: cover
+ürün toplamlarından, bütçe/LFL/margin kategori bazında rastgele.
+
+Kullanım: python veri_uretici.py <sku sayısı> [kategori sayısı] [ümg sayısı] [dizin]
+Örn: python veri_uretici.py 100000 12 6 /tmp/veri
+"""
+
+import os
+import sys
+import shutil
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+# =============================================================================
+# AYARLAR
+# =============================================================================
+
+KATEGORILER = ["RENKLİ KOZMETİK", "SAÇ BAKIM", "CİLT BAKIM", "PARFÜM", "KİŞİSEL BAKIM"]
+MARKALAR = ["EVE", "FLORMAR", "GOLDEN ROSE", "PASTEL"]
+
+# Excel sayfası en fazla 1.048.576 satır (başlık dahil)
+EXCEL_SATIR_LIMITI = 1_048_575
+
+URETICI_AYARLARI = {
+    "dizin": os.environ.get(
+        "SANAL_PLANNER_VERI_DIZIN",
+        os.path.join(os.path.expanduser("~"), ".cache", "sanal_planner_veri")
+    ),
+    "olu_stok_orani": 0.05,   # Satışı olmayan ama stoğu olan SKU payı
+    "bos_orani": 0.02,        # Boş satış hücresi payı (gerçek raporlardaki gibi)
+}
+
+# =============================================================================
+# TABLOLAR
+# =============================================================================
+
+def kategori_adlari(kategori_sayisi: int) -> List[str]:
+    """İlk beşi gerçek kategori adları, fazlası numaralı"""
+    return (KATEGORILER + [f"KATEGORİ {i + 1}" for i in range(len(KATEGORILER), kategori_sayisi)])[:kategori_sayisi]
+
+
+def urun_raporu_uret(sku_sayisi: int, kategori_sayisi: int = 5, umg_sayisi: int = 5,
+                     tohum: int = 42, bos_oran: Optional[float] = None) -> pd.DataFrame:
+    """Ürün raporu formatında sentetik tablo"""
+    rng = np.random.default_rng(tohum)
+    bos_oran = URETICI_AYARLARI["bos_orani"] if bos_oran is None else bos_oran
+
+    # Kategori payları Zipf: ilk kategoriler kalabalık
+    kategoriler = np.array(kategori_adlari(kategori_sayisi), dtype=object)
+    pay = 1 / np.arange(1, kategori_sayisi + 1)
+    kategori_no = rng.choice(kategori_sayisi, sku_sayisi, p=pay / pay.sum())
+    umg_no = rng.integers(1, umg_sayisi + 1, sku_sayisi)
+
+    # Talep: log-normal, ölü stok SKU'larda sıfır
+    talep = rng.lognormal(mean=2.0, sigma=1.2, size=sku_sayisi)
+    olu = rng.random(sku_sayisi) < URETICI_AYARLARI["olu_stok_orani"]
+    talep[olu] = 0
+    tw = rng.poisson(talep).astype(float)
+    lw = rng.poisson(talep).astype(float)
+    tw[rng.random(sku_sayisi) < bos_oran] = np.nan
+    lw[rng.random(sku_sayisi) < bos_oran] = np.nan
+
+    # Stok: talep x hedef cover; her kategorinin kendi hedefi var (bazıları
+    # dengeli, bazıları fazla stoklu), SKU'lar bu hedef etrafında geniş yayılır.
+    # Ölü stokta sabit yığın.
+    kategori_cover = rng.uniform(6, 18, kategori_sayisi)
+    sigma = 0.6
+    cover = rng.lognormal(mean=np.log(kategori_cover[kategori_no]) - sigma ** 2 / 2, sigma=sigma)
+    stok = np.where(olu, rng.integers(50, 2000, sku_sayisi), np.round(talep * cover))
+    depo_payi = rng.beta(2, 2, sku_sayisi)
+    depo = np.round(stok * depo_payi).astype(np.int64)
+    magaza = (stok - depo).astype(np.int64)
+
+    adlar = np.array([f"Ürün {i}" for i in range(sku_sayisi)], dtype=object)
+    adlar[rng.random(sku_sayisi) < 0.01] = np.nan
+
+    kategori = kategoriler[kategori_no]
+    return pd.DataFrame({
+        'Ürün Kodu': 1_000_000 + rng.permutation(sku_sayisi),
+        'Ürün ': adlar,
+        'Kategori ': kategori,
+        'TW Adet': tw,
+        'LW Adet': lw,
+        'Anlık Depo Stok Adet': depo,
+        'Anlık Mğz Stok Adet': magaza,
+        'TW İO': rng.choice([0, 0.1, 0.2, 0.3, 0.5], sku_sayisi, p=[0.5, 0.2, 0.15, 0.1, 0.05]),
+        'ÜMG': pd.Series(kategori).str.cat(umg_no.astype(str), sep=" ").to_numpy(dtype=object),
+        'Marka ': rng.choice(MARKALAR, sku_sayisi),
+    })
+
+
+def trading_raporu_uret(urun: pd.DataFrame, tohum: int = 42) -> pd.DataFrame:
+    """Ürün tablosundan 'mtd' sayfası: kategori satırları + Total"""
+    rng = np.random.default_rng(tohum)
+
+    satis = (urun['TW Adet'].fillna(0) + urun['LW Adet'].fillna(0)) / 2
+    stok = urun['Anlık Depo Stok Adet'] + urun['Anlık Mğz Stok Adet']
+    ozet = pd.DataFrame({'kategori': urun['Kategori '], 'satis': satis, 'stok': stok}) \
+        .groupby('kategori').sum()
+    # Rapordaki sıra: kategori listesindeki sıra
+    sira = [k for k in kategori_adlari(len(ozet) + len(KATEGORILER)) if k in ozet.index]
+    ozet = ozet.loc[sira + [k for k in ozet.index if k not in sira]]
+    n = len(ozet)
+
+    trading = pd.DataFrame({
+        'Satır Etiketleri': ozet.index.to_numpy(dtype=object),
+        'Achieved TY Sales Budget Value TRY': np.round(rng.normal(-0.05, 0.2, n), 3),
+        'LFL Sales Value TYvsLY LC%': np.round(rng.normal(0.03, 0.12, n), 3),
+        'TY Store Back Cover': np.round(ozet['stok'].to_numpy() / np.maximum(ozet['satis'].to_numpy(), 1), 1),
+        'TY Gross Margin TRY': np.round(rng.normal(0.3, 0.15, n), 3),
+    })
+    toplam = pd.DataFrame({
+        'Satır Etiketleri': ['Total'],
+        'Achieved TY Sales Budget Value TRY': [0.0],
+        'LFL Sales Value TYvsLY LC%': [0.0],
+        'TY Store Back Cover': [round(float(ozet['stok'].sum() / max(ozet['satis'].sum(), 1)), 1)],
+        'TY Gross Margin TRY': [0.0],
+    })
+    return pd.concat([trading, toplam], ignore_index=True)
+
+# =============================================================================
+# ÇALIŞMA KİTAPLARI
+# =============================================================================
+
+def _boyut_ekle(yol: str, satir: int, kolon: int) -> None:
+    """Sayfa XML'ine <dimension> ekle
+    
+    openpyxl yazma modu boyut yazmaz; Excel'in kaydettiği dosyalarda boyut
+    vardır ve okuyucular boyutsuz sayfayı belirgin şekilde yavaş okur.
+    Sayfa XML'i parça parça kopyalanır, sadece baş kısmı değişir.
+    """
+    from openpyxl.utils import get_column_letter
+
+    etiket = f'<dimension ref="A1:{get_column_letter(kolon)}{satir}" />'.encode()
+    gecici = yol + ".boyut"
+    with zipfile.ZipFile(yol) as kaynak, \
+            zipfile.ZipFile(gecici, "w", zipfile.ZIP_DEFLATED) as hedef:
+        for bilgi in kaynak.infolist():
+            with kaynak.open(bilgi) as girdi, hedef.open(bilgi, "w", force_zip64=True) as cikti:
+                if bilgi.filename.startswith("xl/worksheets/sheet"):
+                    bas = girdi.read(1 << 16)
+                    bas = bas.replace(b"</sheetPr>", b"</sheetPr>" + etiket, 1)
+                    cikti.write(bas)
+                shutil.copyfileobj(girdi, cikti, 1 << 20)
+    os.replace(gecici, yol)
+
+
+def _sayfa_yaz(df: pd.DataFrame, yol: str, sayfa: str) -> None:
+    """openpyxl yazma modunda (satır satır, sabit bellek), atomik"""
+    from openpyxl import Workbook
+
+    kitap = Workbook(write_only=True)
+    ws = kitap.create_sheet(sayfa)
+    ws.append(list(df.columns))
+    for bas in range(0, len(df), 100_000):
+        parca = df.iloc[bas:bas + 100_000]
+        kolonlar = [
+            [None if pd.isna(d) else d for d in parca[k].tolist()] if parca[k].hasnans else parca[k].tolist()
+            for k in parca.columns
+        ]
+        for satir in zip(*kolonlar):
+            ws.append(satir)
+
+    gecici = yol + ".tmp"
+    kitap.save(gecici)
+    _boyut_ekle(gecici, len(df) + 1, len(df.columns))
+    os.replace(gecici, yol)
+
+
+def calisma_kitaplari_yaz(sku_sayisi: int, kategori_sayisi: int = 5, umg_sayisi: int = 5,
+                          tohum: int = 42, dizin: Optional[str] = None) -> Tuple[str, str]:
+    """(trading yolu, ürün yolu) - aynı parametrelerle üretilmişse yeniden üretilmez"""
+    if sku_sayisi > EXCEL_SATIR_LIMITI:
+        raise ValueError(f"{sku_sayisi:,} SKU bir Excel sayfasına sığmaz (en fazla {EXCEL_SATIR_LIMITI:,})")
+
+    dizin = dizin or URETICI_AYARLARI["dizin"]
+    os.makedirs(dizin, exist_ok=True)
+    ek = f"{sku_sayisi}_{kategori_sayisi}_{umg_sayisi}_{tohum}"
+    trading_yolu = os.path.join(dizin, f"trading_{ek}.xlsx")
+    urun_yolu = os.path.join(dizin, f"urun_{ek}.xlsx")
+
+    if not (os.path.exists(trading_yolu) and os.path.exists(urun_yolu)):
+        urun = urun_raporu_uret(sku_sayisi, kategori_sayisi, umg_sayisi, tohum)
+        _sayfa_yaz(trading_raporu_uret(urun, tohum), trading_yolu, 'mtd')
+        _sayfa_yaz(urun, urun_yolu, 'Sheet1')
+    return trading_yolu, urun_yolu
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    sku = int(sys.argv[1])
+    kategori = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    umg = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    dizin = sys.argv[4] if len(sys.argv) > 4 else None
+    for yol in calisma_kitaplari_yaz(sku, kategori, umg, dizin=dizin):
+        print(yol)